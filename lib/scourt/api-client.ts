@@ -23,7 +23,13 @@
  */
 
 import { getVisionCaptchaSolver } from '../google/vision-captcha-solver';
-import { solveCaptchaWithModel, isModelAvailable, shouldUseVisionAPI } from './captcha-solver';
+import {
+  solveCaptchaWithConfidence,
+  isModelAvailable,
+  shouldUseVisionAPI,
+  reportCaptchaFeedback,
+  MIN_CAPTCHA_CONFIDENCE,
+} from './captcha-solver';
 import { COURT_CODES, getCourtCodeByName, getCourtCodeByNameAndCategory } from './court-codes';
 import { getCaseTypeCodeByName, getCaseCategoryByTypeName } from './case-type-codes';
 import { getCaseLevel } from './case-relations';
@@ -1424,13 +1430,21 @@ export class ScourtApiClient {
       try {
         let captchaText: string | null = null;
         let confidence = 0;
+        let solvedBy: 'model' | 'vision' = 'model';
+        let modelResult: Awaited<ReturnType<typeof solveCaptchaWithConfidence>> | null = null;
 
         // 1. 학습된 모델 시도
         if (isModelAvailable()) {
-          captchaText = await solveCaptchaWithModel(captchaData.image);
+          modelResult = await solveCaptchaWithConfidence(captchaData.image);
+          captchaText = modelResult.text;
+          confidence = modelResult.confidence;
           if (captchaText) {
-            confidence = 0.95; // 모델 인식 성공시 높은 신뢰도
-            console.log(`  🤖 모델 인식: "${captchaText}" (학습된 CNN 모델)`);
+            console.log(`  🤖 모델 인식: "${captchaText}" (학습된 CNN 모델, 신뢰도: ${(confidence * 100).toFixed(1)}%)`);
+            // 신뢰도가 낮으면 제출하지 않고 새 캡챠로 재시도 (마지막 시도는 그대로 제출)
+            if (confidence < MIN_CAPTCHA_CONFIDENCE && attempt < this.maxCaptchaRetries) {
+              console.log(`  ⚠️ 신뢰도 낮음 (< ${(MIN_CAPTCHA_CONFIDENCE * 100).toFixed(0)}%), 새 캡챠로 재시도...`);
+              continue;
+            }
           }
         }
 
@@ -1440,6 +1454,7 @@ export class ScourtApiClient {
           const captchaResult = await solver.solveCaptcha(captchaData.image);
           captchaText = captchaResult.text;
           confidence = captchaResult.confidence || 0;
+          solvedBy = 'vision';
           console.log(`  👁️ Vision API 인식: "${captchaText}" (신뢰도: ${(confidence * 100).toFixed(1)}%)`);
         }
 
@@ -1455,11 +1470,13 @@ export class ScourtApiClient {
 
         if (!searchResult.success) {
           if (searchResult.error?.includes('캡챠') || searchResult.error?.includes('자동입력')) {
+            this.reportCaptcha(captchaData.image, captchaText, false, solvedBy, modelResult);
             console.log('  ⚠️ 캡챠 오류, 재시도...');
             continue;
           }
           return { searchResult };
         }
+        this.reportCaptcha(captchaData.image, captchaText, true, solvedBy, modelResult);
 
         console.log('✅ 검색 성공!');
 
@@ -1940,14 +1957,22 @@ export class ScourtApiClient {
       try {
         let captchaText: string | null = null;
         let confidence = 0;
+        let solvedBy: 'model' | 'vision' = 'model';
+        let modelResult: Awaited<ReturnType<typeof solveCaptchaWithConfidence>> | null = null;
         const useVisionFirst = shouldUseVisionAPI(captchaData.image);
 
         if (!useVisionFirst && isModelAvailable()) {
           // RGBA 이미지 (API 캡챠) - CNN 모델 우선 (98.47% 정확도)
-          captchaText = await solveCaptchaWithModel(captchaData.image);
+          modelResult = await solveCaptchaWithConfidence(captchaData.image);
+          captchaText = modelResult.text;
+          confidence = modelResult.confidence;
           if (captchaText) {
-            confidence = 0.98;
-            console.log(`  🤖 CNN 모델 인식: "${captchaText}" (RGBA 이미지)`);
+            console.log(`  🤖 CNN 모델 인식: "${captchaText}" (RGBA 이미지, 신뢰도: ${(confidence * 100).toFixed(1)}%)`);
+            // 신뢰도가 낮으면 제출하지 않고 새 캡챠로 재시도 (마지막 시도는 그대로 제출)
+            if (confidence < MIN_CAPTCHA_CONFIDENCE && attempt < this.maxCaptchaRetries) {
+              console.log(`  ⚠️ 신뢰도 낮음 (< ${(MIN_CAPTCHA_CONFIDENCE * 100).toFixed(0)}%), 새 캡챠로 재시도...`);
+              continue;
+            }
           }
         }
 
@@ -1957,6 +1982,7 @@ export class ScourtApiClient {
           const visionResult = await solver.solveCaptcha(captchaData.image);
           captchaText = visionResult.text;
           confidence = visionResult.confidence || 0;
+          solvedBy = 'vision';
           console.log(`  👁️ Vision API 인식: "${captchaText}" (신뢰도: ${(confidence * 100).toFixed(1)}%)`);
         }
 
@@ -1971,6 +1997,7 @@ export class ScourtApiClient {
         const result = await this.searchCase(params, captchaResult.text);
 
         if (result.success) {
+          this.reportCaptcha(captchaData.image, captchaResult.text, true, solvedBy, modelResult);
           console.log('✅ 검색 성공!');
           // 민사사건용 captchaAnswer 반환 (답변 + 토큰 결합)
           const combinedCaptchaAnswer = captchaResult.text + captchaData.token;
@@ -1979,6 +2006,7 @@ export class ScourtApiClient {
 
         // 캡챠 오류인 경우 재시도
         if (result.error?.includes('캡챠') || result.error?.includes('captcha') || result.error?.includes('자동입력')) {
+          this.reportCaptcha(captchaData.image, captchaResult.text, false, solvedBy, modelResult);
           console.log('  ⚠️ 캡챠 오류, 재시도...');
           continue;
         }
@@ -1999,6 +2027,28 @@ export class ScourtApiClient {
     };
   }
 
+  /**
+   * 캡챠 답 통과/거절 피드백 기록 (기다리지 않음, 실패해도 검색에는 영향 없음)
+   * 모델 답이 아니면 모델 신뢰도/버전은 보내지 않음
+   */
+  private reportCaptcha(
+    image: Buffer,
+    text: string,
+    accepted: boolean,
+    solver: 'model' | 'vision',
+    modelResult: Awaited<ReturnType<typeof solveCaptchaWithConfidence>> | null
+  ): void {
+    const fromModel = solver === 'model' && modelResult !== null;
+    void reportCaptchaFeedback({
+      image,
+      text,
+      accepted,
+      solver,
+      confidences: fromModel ? modelResult.confidences : undefined,
+      modelVersion: fromModel ? modelResult.modelVersion : undefined,
+    });
+  }
+
   /**
    * 세션 정보 반환
    */
@@ -11,8 +11,25 @@
  * - 정확도: 98.47% (6자리 전체 일치, RGBA 학습 데이터 기준)
  * - 입력: 160x50 grayscale (RGBA Alpha 채널에서 추출)
  *
+ * 추론 엔진:
+ * - CAPTCHA_SERVER_URL 이 설정되어 있으면 상주 추론 서버(scripts/captcha_server.py) 우선
+ *   (모델 재로드 없음, 결과 캐시, 실패하면 아래 방식으로 fallback)
+ * - cbam_multihead_v2_final.npz 가 있으면 scripts/numpy_inference.py (torch import 없음, 빠른 시작)
+ *   (npz 가 현재 .pth 에서 export 된 것이 아니면 에러 로그 후 PyTorch 로 fallback, 파일이 바뀔 때까지 기억)
+ * - 없으면 PyTorch (.pth)
+ *
+ * 신뢰도:
+ * - 6자리 softmax 신뢰도의 곱 (scripts/calibrate_multihead.py 로 head 별 temperature 보정 시 calibrated)
+ * - MIN_CAPTCHA_CONFIDENCE 미만이면 호출자가 새 캡챠를 받아 재시도
+ *
+ * 피드백:
+ * - reportCaptchaFeedback: SCOURT 가 캡챠 답을 받아들였는지를 추론 서버 POST /feedback 으로 보냄
+ *   (서버가 없거나 실패하면 data/captcha-feedback/spool.jsonl 에 기록 → scripts/feedback_store.py --ingest-spool)
+ *
  * 주의: CNN 모델은 RGBA Alpha 채널 이미지에 최적화됨.
  *       실제 브라우저 캡챠(RGB)에는 Vision API가 더 정확함.
+ *       단, RGB 도 함께 학습한 모델(train_multihead_v2.py --rgb-dirs)이 model_info.json 에
+ *       실제 RGB 검증 정확도 RGB_ACCURACY_BAR 이상을 기록했으면 RGB 도 모델로 처리.
  */
 
 import * as path from 'path';
@@ -21,6 +38,36 @@ import { spawn } from 'child_process';
 
 const MODEL_PATH = path.join(process.cwd(), 'data', 'captcha-model', 'cbam_multihead_v2_final.pth');
 const MODEL_SCRIPT_PATH = path.join(process.cwd(), 'scripts', 'cbam_multihead_v2.py');
+const NUMPY_MODEL_PATH = path.join(process.cwd(), 'data', 'captcha-model', 'cbam_multihead_v2_final.npz');
+const NUMPY_SCRIPT_PATH = path.join(process.cwd(), 'scripts', 'numpy_inference.py');
+const NUMPY_STALE_EXIT_CODE = 3;
+const MODEL_INFO_PATH = path.join(process.cwd(), 'data', 'captcha-model', 'model_info.json');
+const CAPTCHA_SERVER_URL = process.env.CAPTCHA_SERVER_URL || '';
+const CAPTCHA_SERVER_TIMEOUT_MS = 3000;
+const FEEDBACK_SPOOL_PATH = path.join(process.cwd(), 'data', 'captcha-feedback', 'spool.jsonl');
+
+/**
+ * 1 이면 예측마다 추론 경로(server / numpy / torch)와 소요 시간을 JSON 한 줄로 출력
+ * (python3 spawn 경로는 인터프리터 시작 + 모델 로드 포함, 서버 내부 단계별 지연은 /metrics)
+ */
+const CAPTCHA_TIMING_LOG = process.env.CAPTCHA_TIMING_LOG === '1';
+
+/**
+ * RGB(브라우저) 캡챠를 모델로 처리하기 위한 최소 검증 정확도 (CAPTCHA_RGB_ACCURACY_BAR 로 조정)
+ */
+const RGB_ACCURACY_BAR = parseFloat(process.env.CAPTCHA_RGB_ACCURACY_BAR || '0.95');
+
+/**
+ * 이 값보다 캡챠 신뢰도가 낮으면 제출하지 않고 새 캡챠로 재시도 (CAPTCHA_MIN_CONFIDENCE 로 조정)
+ */
+export const MIN_CAPTCHA_CONFIDENCE = parseFloat(process.env.CAPTCHA_MIN_CONFIDENCE || '0.3');
+
+interface ModelPrediction {
+  text: string;
+  confidence: number;
+  confidences?: number[];
+  modelVersion?: string;
+}
 
 /**
  * 이미지가 RGBA인지 확인 (CNN 모델에 적합한지)
@@ -42,12 +89,39 @@ function isRGBAImage(imageBuffer: Buffer): boolean {
  * RGB 이미지는 Vision API를 사용하는 것이 더 정확함
  */
 export async function solveCaptchaWithModel(imageBuffer: Buffer): Promise<string | null> {
+  const prediction = await predictWithModel(imageBuffer);
+  return prediction ? prediction.text : null;
+}
+
+/**
+ * 모델 예측 (텍스트 + 캡챠 신뢰도)
+ */
+async function predictWithModel(imageBuffer: Buffer): Promise<ModelPrediction | null> {
+  const startedAt = Date.now();
+  if (CAPTCHA_SERVER_URL) {
+    const served = await runServerPredict(imageBuffer);
+    if (served) {
+      logTiming('server', startedAt, served);
+      return served;
+    }
+  }
+
   // 임시 파일로 저장
   const tempPath = path.join('/tmp', `captcha_${Date.now()}.png`);
   fs.writeFileSync(tempPath, imageBuffer);
 
   try {
+    if (isNumpyModelAvailable()) {
+      const spawnedAt = Date.now();
+      const result = await runNumpyPredict(tempPath);
+      if (!isNumpyModelStale()) {
+        logTiming('numpy', spawnedAt, result, spawnedAt - startedAt);
+        return result;
+      }
+    }
+    const spawnedAt = Date.now();
     const result = await runPythonPredict(tempPath);
+    logTiming('torch', spawnedAt, result, spawnedAt - startedAt);
     return result;
   } finally {
     // 임시 파일 삭제
@@ -57,20 +131,89 @@ export async function solveCaptchaWithModel(imageBuffer: Buffer): Promise<string
   }
 }
 
+function logTiming(
+  engine: string,
+  startedAt: number,
+  prediction: ModelPrediction | null,
+  fallbackMs = 0
+): void {
+  if (!CAPTCHA_TIMING_LOG) {
+    return;
+  }
+  console.log(JSON.stringify({
+    event: 'captcha_predict',
+    engine,
+    elapsed_ms: Date.now() - startedAt,
+    fallback_ms: fallbackMs,
+    ok: prediction !== null,
+  }));
+}
+
+/**
+ * 상주 추론 서버로 예측 (POST /predict, body: PNG 바이트)
+ * 서버 오류/타임아웃이면 null → python3 spawn 으로 fallback
+ */
+async function runServerPredict(imageBuffer: Buffer): Promise<ModelPrediction | null> {
+  const controller = new AbortController();
+  const timer = setTimeout(() => controller.abort(), CAPTCHA_SERVER_TIMEOUT_MS);
+  try {
+    const response = await fetch(`${CAPTCHA_SERVER_URL.replace(/\/$/, '')}/predict`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'image/png' },
+      body: imageBuffer,
+      signal: controller.signal,
+    });
+    if (!response.ok) {
+      console.error('캡챠 서버 응답 오류:', response.status);
+      return null;
+    }
+    const result = await response.json();
+    if (!/^\d{6}$/.test(String(result.text))) {
+      return null;
+    }
+    return {
+      text: String(result.text),
+      confidence: Number(result.confidence),
+      confidences: Array.isArray(result.confidences) ? result.confidences.map(Number) : undefined,
+      modelVersion: result.model_version ? String(result.model_version) : undefined,
+    };
+  } catch (err) {
+    console.error('캡챠 서버 연결 실패:', err);
+    return null;
+  } finally {
+    clearTimeout(timer);
+  }
+}
+
+/**
+ * NumPy 엔진으로 캡챠 예측 실행 (torch 불필요)
+ * 전처리는 runPythonPredict 와 동일 (scripts/captcha_image.py)
+ * npz 가 MODEL_PATH 에서 export 된 것이 아니면 stale 로 기록 (호출자가 PyTorch 로 fallback)
+ */
+function runNumpyPredict(imagePath: string): Promise<ModelPrediction | null> {
+  return runPython([NUMPY_SCRIPT_PATH, '--json', '--source', MODEL_PATH, imagePath], (code) => {
+    if (code === NUMPY_STALE_EXIT_CODE) {
+      staleNumpyModel = modelMtimes();
+      console.error('NumPy 모델(npz)이 현재 .pth 와 다릅니다. PyTorch 로 fallback:', NUMPY_MODEL_PATH);
+    }
+  });
+}
+
 /**
  * PyTorch 모델로 캡챠 예측 실행
  *
- * 전처리 파이프라인:
- * 1. RGBA Alpha 채널 추출 (캡챠 텍스트가 Alpha에 저장됨)
- * 2. 색상 반전 (255 - img)
- * 3. 160x50 리사이즈
+ * 전처리 파이프라인 (scripts/captcha_image.py, 학습과 동일한 경로):
+ * 1. cv2.imdecode(IMREAD_UNCHANGED) 로 디코딩
+ * 2. RGBA: Alpha 채널 반전 / RGB: 배경·글씨 색 추정으로 Alpha 와 같은 텍스트 평면 복원 (canonicalize)
+ * 3. 모델 입력 해상도로 리사이즈 (기본 160x50, 체크포인트 config)
  * 4. [0, 1] 정규화
+ * (체크포인트에 preprocess_variant 가 있으면 preprocess_v2 의 그 전처리 변형을 대신 사용)
  */
-function runPythonPredict(imagePath: string): Promise<string | null> {
-  return new Promise((resolve) => {
-    const pythonCode = `
+function runPythonPredict(imagePath: string): Promise<ModelPrediction | null> {
+  const pythonCode = `
 import sys
 import os
+import json
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -78,54 +221,34 @@ warnings.filterwarnings('ignore')
 sys.path.insert(0, '${path.join(process.cwd(), 'scripts')}')
 
 import torch
-import numpy as np
-from PIL import Image
-import cv2
 
-# 모델 정의 임포트
-from cbam_multihead_v2 import CBAM_MultiHead_V2
+# 모델 정의 / 전처리 임포트
+from cbam_multihead_v2 import load_multihead
+from captcha_image import preprocess_batch
+from captcha_server import model_version
 
 MODEL_PATH = '${MODEL_PATH}'
-IMG_WIDTH = 160
-IMG_HEIGHT = 50
 
 try:
-    # 이미지 로드 및 전처리
-    pil_img = Image.open('${imagePath}')
-
-    # RGBA 이미지 (학습 데이터): Alpha 채널에 텍스트가 있음 → 반전 필요
-    # RGB 이미지 (실제 캡챠): 검정 텍스트 on 흰 배경 → 반전 불필요
-    if pil_img.mode == 'RGBA':
-        _, _, _, alpha = pil_img.split()
-        img = np.array(alpha)
-        # Alpha 채널은 흰색 텍스트이므로 반전
-        img = 255 - img
-    else:
-        # RGB/Grayscale 이미지는 이미 검정 텍스트 on 흰 배경
-        # 반전하지 않음 (학습 데이터와 동일한 형태)
-        img = np.array(pil_img.convert('L'))
-
-    # 리사이즈 (160x50)
-    resized = cv2.resize(img, (IMG_WIDTH, IMG_HEIGHT))
-
-    # 4. 정규화 [0, 1]
-    normalized = resized.astype(np.float32) / 255.0
+    # 모델 로드 (체크포인트 config 로 구조/입력 해상도 복원)
+    model = load_multihead(MODEL_PATH)
 
-    # 텐서 변환 (batch, channel, height, width)
-    tensor = torch.FloatTensor(normalized).unsqueeze(0).unsqueeze(0)
+    # 이미지 로드 및 전처리 (학습 데이터와 동일한 형태: 검정 글씨 on 흰 배경,
+    # 체크포인트에 preprocess_variant 가 있으면 그 변형으로 학습된 모델이므로 같은 변형 적용)
+    batch = preprocess_batch(['${imagePath}'], (model.img_width, model.img_height),
+                             variant=model.preprocess_variant)
 
-    # 모델 로드
-    model = CBAM_MultiHead_V2()
-    model.load_state_dict(torch.load(MODEL_PATH, map_location='cpu', weights_only=True))
-    model.eval()
+    # 텐서 변환 (batch, channel, height, width)
+    tensor = torch.from_numpy(batch)
 
-    # 예측
+    # 예측 (체크포인트에 calibration temperature 가 있으면 적용된 신뢰도)
     with torch.no_grad():
-        outputs = model(tensor)
-        predictions = [torch.argmax(out, dim=1).item() for out in outputs]
+        predictions, confidences = model.predict_with_confidence(tensor)
 
-    result = ''.join(map(str, predictions))
-    print(result)
+    result = ''.join(map(str, predictions[0].tolist()))
+    print(json.dumps({'text': result, 'confidences': [round(c, 4) for c in confidences[0].tolist()],
+                      'confidence': round(confidences[0].prod().item(), 6),
+                      'model_version': model_version(MODEL_PATH)}))
 
 except Exception as e:
     print(f'ERROR: {e}', file=sys.stderr)
@@ -134,7 +257,18 @@ except Exception as e:
     print('')
 `;
 
-    const python = spawn('python3', ['-c', pythonCode]);
+  return runPython(['-c', pythonCode]);
+}
+
+/**
+ * python3 실행 후 stdout JSON ({text, confidence, confidences, model_version}) 파싱, 6자리 숫자가 아니면 null
+ */
+function runPython(
+  args: string[],
+  onClose?: (code: number | null) => void
+): Promise<ModelPrediction | null> {
+  return new Promise((resolve) => {
+    const python = spawn('python3', args, { cwd: process.cwd() });
     let output = '';
     let error = '';
 
@@ -146,12 +280,29 @@ except Exception as e:
       error += data.toString();
     });
 
-    python.on('close', (_code) => {
+    python.on('close', (code) => {
+      onClose?.(code);
+      if (code === NUMPY_STALE_EXIT_CODE) {
+        resolve(null);
+        return;
+      }
       const result = output.trim();
+      let prediction: ModelPrediction | null = null;
+      try {
+        const parsed = JSON.parse(result);
+        prediction = {
+          text: String(parsed.text),
+          confidence: Number(parsed.confidence),
+          confidences: Array.isArray(parsed.confidences) ? parsed.confidences.map(Number) : undefined,
+          modelVersion: parsed.model_version ? String(parsed.model_version) : undefined,
+        };
+      } catch {
+        prediction = null;
+      }
 
       // 6자리 숫자인지 확인
-      if (/^\d{6}$/.test(result)) {
-        resolve(result);
+      if (prediction && /^\d{6}$/.test(prediction.text)) {
+        resolve(prediction);
       } else {
         console.error('캡챠 인식 실패:', error || result);
         resolve(null);
@@ -169,27 +320,156 @@ except Exception as e:
  * 모델 사용 가능 여부 확인
  */
 export function isModelAvailable(): boolean {
-  return fs.existsSync(MODEL_PATH) && fs.existsSync(MODEL_SCRIPT_PATH);
+  return !!CAPTCHA_SERVER_URL
+    || isNumpyModelAvailable()
+    || (fs.existsSync(MODEL_PATH) && fs.existsSync(MODEL_SCRIPT_PATH));
+}
+
+/**
+ * NumPy 엔진용 가중치(npz) 존재 여부 (stale 로 확인된 npz 는 제외)
+ */
+function isNumpyModelAvailable(): boolean {
+  return fs.existsSync(NUMPY_MODEL_PATH) && fs.existsSync(NUMPY_SCRIPT_PATH) && !isNumpyModelStale();
+}
+
+/**
+ * numpy_inference.py 가 stale 이라고 보고한 시점의 (npz, pth) mtime
+ */
+let staleNumpyModel: { npzMtimeMs: number; pthMtimeMs: number } | null = null;
+
+function modelMtimes(): { npzMtimeMs: number; pthMtimeMs: number } | null {
+  try {
+    return {
+      npzMtimeMs: fs.statSync(NUMPY_MODEL_PATH).mtimeMs,
+      pthMtimeMs: fs.statSync(MODEL_PATH).mtimeMs,
+    };
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * 마지막으로 stale 판정을 받은 뒤 npz / pth 가 그대로인지 (재export 하면 다시 NumPy 사용)
+ */
+function isNumpyModelStale(): boolean {
+  if (!staleNumpyModel) {
+    return false;
+  }
+  const current = modelMtimes();
+  return !!current
+    && current.npzMtimeMs === staleNumpyModel.npzMtimeMs
+    && current.pthMtimeMs === staleNumpyModel.pthMtimeMs;
+}
+
+interface ModelInfo {
+  domains?: Record<string, { accuracy: number; samples: number }>;
+  rgb_source?: 'real' | 'synthetic' | null;
+}
+
+let modelInfoCache: { mtimeMs: number; info: ModelInfo | null } | null = null;
+
+/**
+ * 학습 스크립트가 기록한 domain 별 검증 정확도 (파일이 바뀌면 다시 읽음)
+ */
+function readModelInfo(): ModelInfo | null {
+  try {
+    const { mtimeMs } = fs.statSync(MODEL_INFO_PATH);
+    if (!modelInfoCache || modelInfoCache.mtimeMs !== mtimeMs) {
+      modelInfoCache = { mtimeMs, info: JSON.parse(fs.readFileSync(MODEL_INFO_PATH, 'utf-8')) };
+    }
+    return modelInfoCache.info;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * 모델이 실제 RGB 캡챠 검증에서 RGB_ACCURACY_BAR 이상인지
+ * (합성 RGB 로만 검증한 경우는 신뢰하지 않음)
+ */
+function isRGBModelQualified(): boolean {
+  const info = readModelInfo();
+  const rgb = info?.domains?.rgb;
+  return !!rgb && info?.rgb_source === 'real' && rgb.accuracy >= RGB_ACCURACY_BAR;
 }
 
 /**
  * 이미지 타입에 따라 적절한 인식 방식 권장
  * - RGBA: CNN 모델 사용 가능 (학습 데이터와 동일)
- * - RGB: Vision API 권장 (실제 브라우저 캡챠)
+ * - RGB: RGB 정확도 기준을 넘은 모델이 있으면 모델, 아니면 Vision API (실제 브라우저 캡챠)
  */
 export function shouldUseVisionAPI(imageBuffer: Buffer): boolean {
-  // RGB 이미지(실제 브라우저 캡챠)는 Vision API가 더 정확
-  return !isRGBAImage(imageBuffer);
+  if (isRGBAImage(imageBuffer)) {
+    return false;
+  }
+  return !(isModelAvailable() && isRGBModelQualified());
 }
 
 /**
  * 캡챠 인식 결과와 신뢰도 반환
+ * confidence: 6자리 신뢰도의 곱 (calibration 된 모델이면 6자리 전체 정답 확률 추정치)
  */
-export async function solveCaptchaWithConfidence(imageBuffer: Buffer): Promise<{ text: string | null; confidence: number }> {
-  const text = await solveCaptchaWithModel(imageBuffer);
-  // PyTorch 모델은 98.47% 정확도
+export async function solveCaptchaWithConfidence(imageBuffer: Buffer): Promise<{
+  text: string | null;
+  confidence: number;
+  confidences?: number[];
+  modelVersion?: string;
+}> {
+  const prediction = await predictWithModel(imageBuffer);
   return {
-    text,
-    confidence: text ? 0.98 : 0
+    text: prediction ? prediction.text : null,
+    confidence: prediction ? prediction.confidence : 0,
+    confidences: prediction?.confidences,
+    modelVersion: prediction?.modelVersion,
+  };
+}
+
+export interface CaptchaFeedback {
+  image: Buffer;
+  text: string;
+  accepted: boolean;
+  solver: 'model' | 'vision';
+  confidences?: number[];
+  modelVersion?: string;
+}
+
+/**
+ * SCOURT 가 캡챠 답을 받아들였는지 기록 (학습/평가용, 실패해도 검색 흐름에는 영향 없음)
+ */
+export async function reportCaptchaFeedback(feedback: CaptchaFeedback): Promise<void> {
+  const record = {
+    image: feedback.image.toString('base64'),
+    text: feedback.text,
+    accepted: feedback.accepted,
+    solver: feedback.solver,
+    confidences: feedback.confidences,
+    model_version: feedback.modelVersion,
   };
+
+  if (CAPTCHA_SERVER_URL) {
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), CAPTCHA_SERVER_TIMEOUT_MS);
+    try {
+      const response = await fetch(`${CAPTCHA_SERVER_URL.replace(/\/$/, '')}/feedback`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(record),
+        signal: controller.signal,
+      });
+      if (response.ok) {
+        return;
+      }
+    } catch {
+      // spool 로 fallback
+    } finally {
+      clearTimeout(timer);
+    }
+  }
+
+  try {
+    await fs.promises.mkdir(path.dirname(FEEDBACK_SPOOL_PATH), { recursive: true });
+    await fs.promises.appendFile(FEEDBACK_SPOOL_PATH, JSON.stringify(record) + '\n');
+  } catch (err) {
+    console.error('캡챠 피드백 기록 실패:', err);
+  }
 }
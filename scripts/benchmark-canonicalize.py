@@ -0,0 +1,162 @@
+"""
+RGB canonicalize 전처리 벤치마크: 비용 + 출처(source)별 정확도
+
+출처:
+- rgba:      학습 데이터 그대로 (Alpha 반전)
+- rgb_synth: 학습 데이터를 흰 배경에 합성한 RGB (브라우저 화면과 같은 형태, 정답 Alpha 평면과 비교 가능)
+- rgb_real:  --rgb-dirs 의 라벨된 브라우저 캡챠 (있을 때만)
+
+측정:
+- 배치 / 단일 전처리 시간 (ms/이미지, PNG 디코딩 포함): rgba, rgb grayscale 그대로, rgb canonicalize
+- rgb_synth 의 Alpha 평면 대비 평균 픽셀 오차 (0~255): grayscale 그대로 vs canonicalize
+- --model 이 있으면 출처별 6자리 정확도 (grayscale 그대로 vs canonicalize)
+
+사용법:
+    python scripts/benchmark-canonicalize.py
+    python scripts/benchmark-canonicalize.py --model ./data/captcha-model/cbam_multihead_v2_final.pth
+    python scripts/benchmark-canonicalize.py --rgb-dirs ./data/captcha-training-rgb --max-samples 2000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import cv2
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from captcha_image import decode_image, render_on_white, preprocess, preprocess_batch
+from cbam_multihead_v2 import load_multihead, calculate_accuracy
+from train_multihead_v2 import list_samples, DATA_DIR, MODEL_DIR, REPORT_DIR
+
+MODEL_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_final.pth')
+
+
+def encode_png(img):
+    """디코딩 비용까지 포함해 측정하도록 PNG 바이트로 인코딩"""
+    _, buf = cv2.imencode('.png', img)
+    return buf.tobytes()
+
+
+def time_batch(sources, canonical, repeats=3):
+    """배치 전처리 (repeats 회 중 최소, ms/이미지)"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        preprocess_batch(sources, canonical=canonical)
+        best = min(best, time.perf_counter() - start)
+    return best / len(sources) * 1000
+
+
+def time_single(sources, canonical, limit=200):
+    """단일 이미지 전처리 (서빙 경로, 중앙값 ms)"""
+    times = []
+    for source in sources[:limit]:
+        start = time.perf_counter()
+        preprocess(source, canonical=canonical)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+
+def evaluate(model, sources, labels, canonical):
+    """6자리 전체 정확도"""
+    images = torch.from_numpy(preprocess_batch(sources, (model.img_width, model.img_height),
+                                               canonical=canonical))
+    outputs = []
+    with torch.no_grad():
+        for batch in torch.split(images, 256):
+            outputs.append(torch.stack(model(batch), dim=1))
+    outputs = torch.cat(outputs)
+    acc, _ = calculate_accuracy(list(outputs.unbind(1)), labels)
+    return acc
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RGB canonicalize 전처리 벤치마크')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--rgb-dirs', nargs='*', default=[], help='라벨된 RGB(브라우저) 캡챠 폴더')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--max-samples', type=int, default=1000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("RGB Canonicalize 벤치마크")
+    print("=" * 60)
+
+    paths, labels = list_samples(args.data_dir)
+    if not paths:
+        print(f"데이터 폴더가 없습니다: {args.data_dir}")
+        return 1
+    paths, labels = paths[:args.max_samples], labels[:args.max_samples]
+
+    decoded = [decode_image(p) for p in paths]
+    sources = {
+        'rgba': ([encode_png(img) for img in decoded], labels),
+        'rgb_synth': ([encode_png(render_on_white(img)) for img in decoded], labels),
+    }
+    real_paths, real_labels = [], []
+    for rgb_dir in args.rgb_dirs:
+        dir_paths, dir_labels = list_samples(rgb_dir)
+        real_paths += dir_paths
+        real_labels.append(dir_labels)
+    if real_paths:
+        sources['rgb_real'] = ([open(p, 'rb').read() for p in real_paths], torch.cat(real_labels))
+    print("샘플: " + ', '.join(f'{name} {len(s)}개' for name, (s, _) in sources.items()))
+
+    # 비용
+    print(f"\n{'출처':10s} {'전처리':14s} {'배치(ms)':>9s} {'단일(ms)':>9s}")
+    print("-" * 46)
+    timing = []
+    for name, (srcs, _) in sources.items():
+        modes = [False] if name == 'rgba' else [False, True]
+        for canonical in modes:
+            row = {
+                'source': name,
+                'canonical': canonical,
+                'batch_ms': time_batch(srcs, canonical),
+                'single_ms': time_single(srcs, canonical),
+            }
+            timing.append(row)
+            mode = 'canonicalize' if canonical else ('alpha' if name == 'rgba' else 'grayscale')
+            print(f"{name:10s} {mode:14s} {row['batch_ms']:9.3f} {row['single_ms']:9.3f}")
+
+    # Alpha 평면 대비 오차 (합성 RGB 는 정답 평면이 있음)
+    reference = preprocess_batch(sources['rgba'][0])
+    fidelity = {
+        mode: float(np.abs(preprocess_batch(sources['rgb_synth'][0], canonical=canonical)
+                           - reference).mean() * 255)
+        for mode, canonical in (('grayscale', False), ('canonicalize', True))
+    }
+    print(f"\nrgb_synth Alpha 평면 대비 평균 오차: grayscale {fidelity['grayscale']:.2f}, "
+          f"canonicalize {fidelity['canonicalize']:.2f} (0~255)")
+
+    # 출처별 정확도
+    accuracy = None
+    if os.path.exists(args.model):
+        model = load_multihead(args.model)
+        accuracy = {}
+        print(f"\n정확도 ({args.model})")
+        print(f"  {'출처':10s} {'grayscale':>10s} {'canonicalize':>13s}")
+        for name, (srcs, lbls) in sources.items():
+            accuracy[name] = {mode: evaluate(model, srcs, lbls, canonical)
+                              for mode, canonical in (('grayscale', False), ('canonicalize', True))}
+            print(f"  {name:10s} {accuracy[name]['grayscale']*100:9.2f}% "
+                  f"{accuracy[name]['canonicalize']*100:12.2f}%")
+    else:
+        print(f"\n모델이 없어 정확도는 생략: {args.model}")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f'canonicalize_{datetime.now():%Y%m%d_%H%M%S}.json')
+    with open(report_path, 'w') as f:
+        json.dump({'samples': {name: len(s) for name, (s, _) in sources.items()}, 'timing': timing,
+                   'fidelity': fidelity, 'accuracy': accuracy, 'model': args.model}, f, indent=2)
+    print(f"\n리포트 저장: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
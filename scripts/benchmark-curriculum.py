@@ -0,0 +1,115 @@
+"""
+학습 curriculum 벤치마크 (progressive resizing / hard example mining)
+
+같은 epoch 수, 같은 초기 가중치로 baseline(목표 해상도 고정 + uniform shuffle),
+PROGRESSIVE_SCHEDULE, HardExampleSampler 를 학습해
+목표 정확도까지 걸린 epoch 수 / 학습 시간(wall-clock, 검증 제외)과 최종 정확도를 비교한다.
+(hard mining 의 샘플별 loss 계산/가중치 갱신 비용은 학습 시간에 포함)
+
+사용법:
+    python scripts/benchmark-curriculum.py
+    python scripts/benchmark-curriculum.py --epochs 40 --target-acc 0.95
+    python scripts/benchmark-curriculum.py --runs baseline hard-mining
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import CBAM_MultiHead_V2, BACKBONE_VARIANTS
+from captcha_image import preprocess_batch
+from train_multihead_v2 import (
+    train_short, list_samples, split_samples, time_to_target, PROGRESSIVE_SCHEDULE, HARD_MINING,
+    DATA_DIR, REPORT_DIR, IMG_WIDTH, IMG_HEIGHT, NUM_DIGITS, NUM_CLASSES
+)
+
+# 이름 → train_short 옵션
+RUNS = {
+    'baseline': {},
+    'progressive': {'schedule': PROGRESSIVE_SCHEDULE},
+    'hard-mining': {'hard_mining': True},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='학습 curriculum 벤치마크')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--backbone', default='default', choices=sorted(BACKBONE_VARIANTS))
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--target-acc', type=float, default=0.9)
+    parser.add_argument('--runs', nargs='+', default=list(RUNS), choices=list(RUNS),
+                        help='비교할 실행 (첫 번째가 기준)')
+    parser.add_argument('--limit', type=int, default=None, help='앞에서부터 이 개수만 사용')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("학습 Curriculum 벤치마크")
+    print("=" * 60)
+
+    paths, labels = list_samples(args.data_dir)
+    if not paths:
+        print(f"데이터 폴더가 없습니다: {args.data_dir}")
+        return 1
+    if args.limit:
+        paths, labels = paths[:args.limit], labels[:args.limit]
+    train_idx, val_idx = split_samples(labels)
+
+    target_size = (IMG_WIDTH, IMG_HEIGHT)
+    sizes = {target_size}
+    if 'progressive' in args.runs:
+        sizes |= {tuple(p['img_size']) for p in PROGRESSIVE_SCHEDULE}
+    images = {size: torch.from_numpy(preprocess_batch(paths, size)) for size in sizes}
+    print(f"샘플: {len(paths)}개, {args.epochs} epochs, 목표 정확도 {args.target_acc*100:.1f}%")
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    rows = []
+    for name in args.runs:
+        print(f"\n[{name}]")
+        history = []
+        torch.manual_seed(42)  # 모든 실행이 같은 초기 가중치에서 시작
+        model = CBAM_MultiHead_V2(num_digits=NUM_DIGITS, num_classes=NUM_CLASSES,
+                                  backbone=BACKBONE_VARIANTS[args.backbone])
+        best_acc, _, _ = train_short(model, images, labels, train_idx, val_idx, args.epochs, device,
+                                     history=history, **RUNS[name])
+        for row in history:
+            hard = row.get('hard_mining')
+            detail = (f" | strength {hard['strength']:.2f}, 고유 {hard['unique']*100:3.0f}%, "
+                      f"틀림 {hard['wrong']*100:4.1f}%") if hard else ''
+            print(f"  Epoch {row['epoch']:3d} | {row['img_size'][0]}x{row['img_size'][1]} "
+                  f"b{row['batch_size']:<3d} | Acc: {row['val_acc']*100:5.1f}% | {row['elapsed']:.1f}s{detail}")
+
+        epoch, seconds = time_to_target(history, args.target_acc)
+        rows.append({'name': name, 'best_acc': best_acc, 'total_time': history[-1]['elapsed'],
+                     'target_epoch': epoch, 'time_to_target': seconds, 'history': history})
+
+    print(f"\n{'':12s} {'최종 정확도':>10s} {'총 학습(s)':>10s} {'목표 epoch':>10s} {'목표 도달(s)':>12s}")
+    print("-" * 60)
+    for row in rows:
+        epoch = str(row['target_epoch']) if row['target_epoch'] is not None else '-'
+        target = f"{row['time_to_target']:.1f}" if row['time_to_target'] is not None else '-'
+        print(f"{row['name']:12s} {row['best_acc']*100:9.2f}% {row['total_time']:10.1f} "
+              f"{epoch:>10s} {target:>12s}")
+
+    base = rows[0]
+    for row in rows[1:]:
+        print(f"\n{row['name']} / {base['name']}: epoch 당 학습 시간 {row['total_time'] / base['total_time']:.2f}x")
+        if base['time_to_target'] and row['time_to_target']:
+            print(f"  목표 도달 epoch: {base['target_epoch']} → {row['target_epoch']}, "
+                  f"시간 {base['time_to_target'] / row['time_to_target']:.2f}x 빠름")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f'curriculum_{datetime.now():%Y%m%d_%H%M%S}.json')
+    with open(report_path, 'w') as f:
+        json.dump({'epochs': args.epochs, 'target_acc': args.target_acc, 'samples': len(paths),
+                   'schedule': PROGRESSIVE_SCHEDULE, 'hard_mining': HARD_MINING, 'rows': rows}, f, indent=2)
+    print(f"\n리포트 저장: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
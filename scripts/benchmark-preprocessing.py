@@ -0,0 +1,199 @@
+"""
+전처리 변형 벤치마크 + 서빙 전처리 자동 선택
+
+- PREPROCESS_VARIANTS 의 모든 변형(모폴로지 v1/v2, 보간 방식, alpha/gray)에 대해
+  배치 단위 전처리 시간(ms/이미지) 측정
+- 변형별로 CBAM_MultiHead_V2 를 짧게 학습해 검증 정확도(6자리 전체 일치) 측정
+- TrainAugmentation(회전/밝기) 비용도 함께 측정 (학습 시에만 쓰이므로 정확도 없음)
+- 시간-정확도 Pareto 표 출력
+- --write-config: 정확도 기준(--min-acc)을 만족하는 가장 빠른 변형과, 그 정확도를 낸
+  벤치마크 모델(cbam_multihead_v2_{변형}.pth, 체크포인트에 preprocess_variant 포함)을
+  preprocess_config.json 에 기록
+  → 변형마다 입력 분포가 다르므로 서빙은 전처리만 바꾸지 않고 이 모델로 교체한다
+    (captcha_server.py --model / numpy_inference.py export 가 체크포인트의 변형으로 전처리,
+     InferencePreprocessor(variant='auto') 는 설정의 변형 선택)
+
+사용법:
+    python scripts/benchmark-preprocessing.py
+    python scripts/benchmark-preprocessing.py --variants alpha,gray_morph_v1 --epochs 10
+    python scripts/benchmark-preprocessing.py --epochs 0          # 시간만 측정
+    python scripts/benchmark-preprocessing.py --min-acc 0.95 --write-config
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from preprocess_v2 import (
+    CaptchaPreprocessor, TrainAugmentation, PREPROCESS_VARIANTS, PREPROCESS_CONFIG_PATH
+)
+from cbam_multihead_v2 import CBAM_MultiHead_V2, save_multihead
+from train_multihead_v2 import (
+    train_short, list_samples, split_samples, DATA_DIR, MODEL_DIR, REPORT_DIR, NUM_DIGITS, NUM_CLASSES
+)
+
+
+def time_variant(name, paths, repeats=3):
+    """배치 전처리 시간 (repeats 회 중 최소, ms/이미지)"""
+    preprocessor = CaptchaPreprocessor.from_variant(name)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        preprocessor.process_batch(paths)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(paths)
+
+
+def time_augmentation(paths, repeats=3):
+    """TrainAugmentation 단계별 비용 (ms/이미지)"""
+    images = CaptchaPreprocessor.from_variant('alpha', normalize=False).process_batch(paths)
+    images = images.numpy()[:, 0].astype(np.uint8)
+
+    rows = []
+    for name, kwargs in [
+        ('augment_rotation', dict(use_rotation=True, use_brightness=False)),
+        ('augment_brightness', dict(use_rotation=False, use_brightness=True)),
+        ('augment_both', dict(use_rotation=True, use_brightness=True)),
+    ]:
+        augment = TrainAugmentation(**kwargs)
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for img in images:
+                augment(img)
+            best = min(best, time.perf_counter() - start)
+        rows.append({'variant': name, 'ms_per_image': best * 1000 / len(images), 'accuracy': None})
+    return rows
+
+
+def evaluate_variant(name, paths, labels, epochs, device, lr=1e-3, seed=42):
+    """변형으로 전처리한 데이터로 짧게 학습 → 검증 정확도 (6자리 전체, 자리별), 최고 정확도 모델 (CPU)"""
+    images = CaptchaPreprocessor.from_variant(name).process_batch(paths)
+    train_idx, val_idx = split_samples(labels)
+
+    torch.manual_seed(seed)  # 변형마다 같은 초기 가중치
+    model = CBAM_MultiHead_V2(num_digits=NUM_DIGITS, num_classes=NUM_CLASSES)
+    best_acc, best_pos, model = train_short(model, images, labels, train_idx, val_idx, epochs, device,
+                                            lr=lr, seed=seed)
+    model.preprocess_variant = name
+    return best_acc, best_pos, model
+
+
+def pareto_front(rows):
+    """시간이 더 짧으면서 정확도도 같거나 높은 변형이 없는 행"""
+    scored = [r for r in rows if r['accuracy'] is not None]
+    front = set()
+    for r in scored:
+        dominated = any(
+            o['ms_per_image'] <= r['ms_per_image'] and o['accuracy'] >= r['accuracy']
+            and (o['ms_per_image'] < r['ms_per_image'] or o['accuracy'] > r['accuracy'])
+            for o in scored
+        )
+        if not dominated:
+            front.add(r['variant'])
+    return front
+
+
+def select_variant(rows, min_acc):
+    """정확도 기준을 만족하는 가장 빠른 변형"""
+    eligible = [r for r in rows if r['accuracy'] is not None and r['accuracy'] >= min_acc
+                and r['variant'] in PREPROCESS_VARIANTS]
+    return min(eligible, key=lambda r: r['ms_per_image']) if eligible else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='전처리 변형 벤치마크')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--variants', default=','.join(PREPROCESS_VARIANTS),
+                        help='쉼표로 구분한 변형 이름')
+    parser.add_argument('--samples', type=int, default=None, help='사용할 최대 샘플 수')
+    parser.add_argument('--epochs', type=int, default=5, help='변형별 학습 epoch (0 이면 시간만)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--min-acc', type=float, default=0.95)
+    parser.add_argument('--write-config', action='store_true')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("전처리 변형 벤치마크")
+    print("=" * 60)
+
+    variants = [v.strip() for v in args.variants.split(',') if v.strip()]
+    paths, labels = list_samples(args.data_dir)
+    if args.samples:
+        paths, labels = paths[:args.samples], labels[:args.samples]
+    if not paths:
+        print(f"데이터 폴더가 없습니다: {args.data_dir}")
+        return
+    print(f"샘플: {len(paths)}개, 변형: {len(variants)}개, 학습: {args.epochs} epochs")
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+    rows = []
+    models = {}  # 변형 → 벤치마크 모델 (--write-config 로 선택된 변형의 모델 저장)
+    for name in variants:
+        ms = time_variant(name, paths, args.repeats)
+        row = {'variant': name, 'ms_per_image': ms, 'accuracy': None, 'pos_accs': None}
+        if args.epochs > 0:
+            acc, pos_accs, model = evaluate_variant(name, paths, labels, args.epochs, device)
+            row['accuracy'], row['pos_accs'] = acc, pos_accs
+            if args.write_config:
+                models[name] = model
+        rows.append(row)
+        acc_str = f"{row['accuracy']*100:5.1f}%" if row['accuracy'] is not None else '    -'
+        print(f"  {name:24s} {ms:7.4f} ms/img  acc {acc_str}")
+
+    rows.extend(time_augmentation(paths[:min(len(paths), 1000)], args.repeats))
+
+    # Pareto 표
+    front = pareto_front(rows)
+    print(f"\n{'변형':24s} {'ms/img':>8s} {'정확도':>8s}  Pareto")
+    print("-" * 52)
+    for row in sorted(rows, key=lambda r: r['ms_per_image']):
+        acc_str = f"{row['accuracy']*100:7.1f}%" if row['accuracy'] is not None else '       -'
+        mark = '  ★' if row['variant'] in front else ''
+        print(f"{row['variant']:24s} {row['ms_per_image']:8.4f} {acc_str}{mark}")
+
+    # 리포트 저장
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f'preprocessing_{datetime.now():%Y%m%d_%H%M%S}.json')
+    with open(report_path, 'w') as f:
+        json.dump({'samples': len(paths), 'epochs': args.epochs, 'rows': rows,
+                   'pareto': sorted(front)}, f, indent=2)
+    print(f"\n리포트 저장: {report_path}")
+
+    # 서빙 전처리 선택
+    if args.epochs > 0:
+        chosen = select_variant(rows, args.min_acc)
+        if chosen is None:
+            print(f"\n정확도 {args.min_acc*100:.1f}% 이상인 변형이 없습니다.")
+        else:
+            print(f"\n선택: {chosen['variant']} ({chosen['ms_per_image']:.4f} ms/img, "
+                  f"{chosen['accuracy']*100:.1f}%)")
+            if args.write_config:
+                os.makedirs(MODEL_DIR, exist_ok=True)
+                model_path = os.path.join(MODEL_DIR, f"cbam_multihead_v2_{chosen['variant']}.pth")
+                save_multihead(models[chosen['variant']], model_path)
+                with open(PREPROCESS_CONFIG_PATH, 'w') as f:
+                    json.dump({
+                        'variant': chosen['variant'],
+                        'model': model_path,
+                        'ms_per_image': chosen['ms_per_image'],
+                        'accuracy': chosen['accuracy'],
+                        'epochs': args.epochs,
+                        'min_acc': args.min_acc,
+                        'report': report_path,
+                    }, f, indent=2)
+                print(f"모델 저장: {model_path} (전처리 {chosen['variant']} 로 {args.epochs} epochs 학습)")
+                print(f"설정 저장: {PREPROCESS_CONFIG_PATH}")
+                print(f"서빙: python scripts/captcha_server.py --model {model_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+신뢰도 Calibration: 자리(head)별 temperature scaling
+
+- 검증 split(train_multihead_v2.split_samples, 학습과 같은 검증 샘플)을 라벨 해시로 다시 나눠
+  fit 쪽에서 head 별 temperature T 를 NLL 최소화로 학습하고, report 쪽(--report-ratio)에서 ECE 보고
+  (--report-ratio 0 이면 검증 split 전체로 학습하고 같은 샘플로 보고 → in-sample 로 표시)
+- 자리 신뢰도 = softmax(logits / T) 최대값, 캡챠 신뢰도 = 6자리 신뢰도의 곱
+- calibration 전/후 자리/캡챠 단위 ECE 와 신뢰도 구간별 정확도 출력
+- temperature 는 체크포인트에 함께 저장 (load_multihead → predict_with_confidence 에 자동 적용,
+  numpy_inference.py export 시 npz meta 로 전달)
+- 저장 경로 옆에 npz 가 있으면 다시 export (NumPy 엔진이 이전 temperature 로 서빙하지 않도록)
+
+사용법:
+    python scripts/calibrate_multihead.py
+    python scripts/calibrate_multihead.py --model ./data/captcha-model/student_8_16_32_48.pth
+    python scripts/calibrate_multihead.py --output ./data/captcha-model/cbam_multihead_v2_calibrated.pth
+    python scripts/calibrate_multihead.py --report-ratio 0.3
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import load_multihead, save_multihead
+from captcha_image import preprocess_batch
+from train_multihead_v2 import DATA_DIR, MODEL_DIR, SPLIT_SEED, list_samples, split_samples, validation_mask
+from numpy_inference import export_checkpoint
+
+MODEL_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_final.pth')
+NUM_BINS = 15
+
+# 검증 split 중 ECE 보고용 비율 (temperature 학습에 쓰지 않음). 검증 split 을 정한 seed 와
+# 같은 seed 면 해시가 이미 VAL_RATIO 미만이라 전부 한쪽으로 가므로 다른 seed 사용
+REPORT_RATIO = 0.5
+REPORT_SEED = SPLIT_SEED + 1
+
+
+def collect_logits(model, paths, batch_size=256):
+    """(N, 6, 10) logits (temperature 미적용)"""
+    images = torch.from_numpy(preprocess_batch(paths, (model.img_width, model.img_height),
+                                               variant=model.preprocess_variant))
+    logits = []
+    with torch.no_grad():
+        for batch in torch.split(images, batch_size):
+            logits.append(torch.stack(model(batch), dim=1))
+    return torch.cat(logits)
+
+
+def fit_temperatures(logits, labels, steps=100):
+    """head 별 temperature (6,). log T 를 최적화해서 T > 0 유지"""
+    log_t = torch.zeros(logits.shape[1], requires_grad=True)
+    optimizer = torch.optim.LBFGS([log_t], lr=0.1, max_iter=steps, line_search_fn='strong_wolfe')
+
+    def closure():
+        optimizer.zero_grad()
+        scaled = logits / log_t.exp()[None, :, None]
+        loss = F.cross_entropy(scaled.flatten(0, 1), labels.flatten())
+        loss.backward()
+        return loss
+
+    optimizer.step(closure)
+    return log_t.detach().exp()
+
+
+def expected_calibration_error(confidences, correct, num_bins=NUM_BINS):
+    """ECE 와 구간별 (평균 신뢰도, 정확도, 개수)"""
+    confidences = np.asarray(confidences, dtype=np.float64)
+    correct = np.asarray(correct, dtype=np.float64)
+    edges = np.linspace(0, 1, num_bins + 1)
+    bins = np.clip(np.digitize(confidences, edges[1:-1]), 0, num_bins - 1)
+
+    ece, table = 0.0, []
+    for b in range(num_bins):
+        mask = bins == b
+        if not mask.any():
+            continue
+        conf, acc = confidences[mask].mean(), correct[mask].mean()
+        ece += mask.mean() * abs(conf - acc)
+        table.append({'low': float(edges[b]), 'high': float(edges[b + 1]),
+                      'confidence': float(conf), 'accuracy': float(acc), 'count': int(mask.sum())})
+    return float(ece), table
+
+
+def calibration_stats(logits, labels, temperatures=None):
+    """자리/캡챠 단위 ECE, NLL"""
+    if temperatures is not None:
+        logits = logits / temperatures[None, :, None]
+    probs = F.softmax(logits, dim=-1)
+    conf, pred = probs.max(dim=-1)
+    digit_ok = pred == labels
+
+    digit_ece, digit_table = expected_calibration_error(conf.flatten().numpy(), digit_ok.flatten().numpy())
+    seq_ece, seq_table = expected_calibration_error(conf.prod(dim=1).numpy(), digit_ok.all(dim=1).numpy())
+    return {
+        'nll': float(F.cross_entropy(logits.flatten(0, 1), labels.flatten())),
+        'digit_ece': digit_ece,
+        'sequence_ece': seq_ece,
+        'sequence_accuracy': float(digit_ok.all(dim=1).float().mean()),
+        'mean_sequence_confidence': float(conf.prod(dim=1).mean()),
+        'sequence_bins': seq_table,
+        'digit_bins': digit_table,
+    }
+
+
+def print_bins(table):
+    print(f"  {'신뢰도 구간':>13s} {'평균 신뢰도':>10s} {'정확도':>8s} {'개수':>6s}")
+    for row in table:
+        print(f"  {row['low']:5.2f} - {row['high']:5.2f} {row['confidence']*100:9.1f}% "
+              f"{row['accuracy']*100:7.1f}% {row['count']:6d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='head 별 temperature scaling calibration')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--output', default=None, help='저장 경로 (기본: --model 덮어쓰기)')
+    parser.add_argument('--report-ratio', type=float, default=REPORT_RATIO,
+                        help='검증 split 중 ECE 보고용 비율 (0 이면 in-sample 보고)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("신뢰도 Calibration (temperature scaling)")
+    print("=" * 60)
+
+    if not os.path.exists(args.model):
+        print(f"모델이 없습니다: {args.model}")
+        return 1
+
+    model = load_multihead(args.model)
+    paths, labels = list_samples(args.data_dir)
+    if not paths:
+        print(f"데이터 폴더가 없습니다: {args.data_dir}")
+        return 1
+
+    _, val_idx = split_samples(labels)
+    val_idx = val_idx.tolist()
+    val_labels = labels[val_idx]
+    report = validation_mask(val_labels, args.report_ratio, REPORT_SEED)
+    in_sample = not report.any() or report.all()
+    if in_sample:
+        report[:] = True
+        fit = report
+        print(f"검증: {len(val_idx)}개 (temperature 학습과 보고에 같은 샘플 사용 → in-sample)")
+    else:
+        fit = ~report
+        print(f"검증: {len(val_idx)}개 (temperature 학습 {int(fit.sum())}개, 보고 {int(report.sum())}개)")
+
+    logits = collect_logits(model, [paths[i] for i in val_idx])
+    report_logits, report_labels = logits[report], val_labels[report]
+    before = calibration_stats(report_logits, report_labels)
+    temperatures = fit_temperatures(logits[fit], val_labels[fit])
+    after = calibration_stats(report_logits, report_labels, temperatures)
+
+    print(f"\nTemperature: {', '.join(f'{t:.3f}' for t in temperatures.tolist())}")
+    print(f"\n{'in-sample (temperature 학습 샘플로 측정)' if in_sample else 'held-out'} 보고:")
+    print(f"\n{'':12s} {'NLL':>8s} {'자리 ECE':>9s} {'캡챠 ECE':>9s} {'평균 캡챠 신뢰도':>14s}")
+    for name, stats in (('before', before), ('after', after)):
+        print(f"{name:12s} {stats['nll']:8.4f} {stats['digit_ece']*100:8.2f}% "
+              f"{stats['sequence_ece']*100:8.2f}% {stats['mean_sequence_confidence']*100:13.2f}%")
+    print(f"\n캡챠 정확도: {after['sequence_accuracy']*100:.2f}%")
+    print("\n캡챠 신뢰도 구간별 정확도 (calibration 후):")
+    print_bins(after['sequence_bins'])
+
+    # 기존 체크포인트의 부가 정보 (val_acc 등) 유지
+    checkpoint = torch.load(args.model, map_location='cpu', weights_only=True)
+    extra = {k: v for k, v in checkpoint.items()
+             if k not in ('config', 'model_state_dict', 'temperatures', 'calibration')} \
+        if 'model_state_dict' in checkpoint else {}
+
+    model.temperatures = temperatures.tolist()
+    output = args.output or args.model
+    save_multihead(model, output, **extra,
+                   calibration={'before': before, 'after': after, 'val_size': len(val_idx),
+                                'fit_size': int(fit.sum()), 'report_size': int(report.sum()),
+                                'in_sample': in_sample})
+    print(f"\n저장: {output}")
+
+    npz_path = os.path.splitext(output)[0] + '.npz'
+    if os.path.exists(npz_path):
+        export_checkpoint(output, npz_path)
+        print(f"NumPy 가중치 재export: {npz_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
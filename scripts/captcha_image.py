@@ -0,0 +1,281 @@
+"""
+캡챠 이미지 디코딩/전처리 (학습·서빙 공통 경로)
+
+CBAM_MultiHead_V2 학습(train_multihead_v2.py), 서빙(captcha-solver.ts),
+CaptchaPreprocessor(preprocess_v2.py) 가 모두 이 모듈로 이미지를 읽는다.
+
+- PNG 바이트를 cv2.imdecode(IMREAD_UNCHANGED) 로 한 번에 디코딩
+  (PIL open → split() 의 채널별 복사 없음, Alpha 채널은 배열 view 로 접근)
+- 텍스트 평면: 배경 흰색(255), 글씨 검정(0)
+    RGBA / LA: Alpha 채널(글씨=255)을 반전
+    RGB / L:   grayscale 그대로 (이미 검정 글씨 on 흰 배경)
+    ※ 원래 학습 전처리(train_multihead_v2.preprocess_image)는 모든 모드를 반전했다.
+      RGB / L 입력은 이제 반전하지 않으므로 그 결과가 예전과 반대 극성이다
+      (학습 데이터는 전부 RGBA 라 학습 입력은 그대로, test-captcha-image-golden.py 가 둘 다 확인)
+- domain: 'rgba' (API 응답 캡챠, 학습 데이터) / 'rgb' (브라우저 화면 캡챠)
+- 반전 → 리사이즈 → [0, 1] 정규화 (정규화는 LUT 한 번으로 출력 버퍼에 바로 기록)
+- canonicalize (preprocess 기본값): RGB 는 원본 해상도에서 배경 추정 + Otsu 임계값 + 주변 글씨 색으로
+  Alpha 와 같은 텍스트 마스크를 복원한 뒤 리사이즈 → 두 형식이 같은 입력 분포가 됨
+  (배치는 같은 원본 크기끼리 묶어 벡터화)
+"""
+
+import os
+import glob
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+IMG_WIDTH = 160
+IMG_HEIGHT = 50
+
+BATCH_WORKERS = min(8, os.cpu_count() or 1)
+
+# uint8 → float32 [0, 1]. x.astype(np.float32) / 255.0 과 비트 단위로 동일
+NORMALIZE_LUT = np.arange(256, dtype=np.float32) / np.float32(255.0)
+
+ImageSource = Union[bytes, bytearray, memoryview, str, Path, np.ndarray]
+
+DOMAINS = ('rgba', 'rgb')
+
+
+def labeled_files(directory: Union[str, Path]) -> List[Tuple[str, str]]:
+    """{라벨}[_접미사].png → [(경로, 6자리 라벨)] (파일명 순, 라벨 없는 이미지는 제외)"""
+    files = []
+    for img_path in sorted(glob.glob(os.path.join(str(directory), '*.png'))):
+        label = os.path.basename(img_path)[:-4].split('_')[0]
+        if len(label) == 6 and label.isdigit():
+            files.append((img_path, label))
+    return files
+
+
+def decode_image(source: ImageSource) -> np.ndarray:
+    """
+    이미지 디코딩 (채널 유지)
+
+    Returns:
+        (H, W) grayscale, (H, W, 3) BGR, 또는 (H, W, 4) BGRA uint8
+        (cv2 는 LA PNG 도 BGRA 로 디코딩)
+    """
+    if isinstance(source, np.ndarray) and source.ndim >= 2:
+        return source
+
+    if isinstance(source, (str, Path)):
+        buf = np.fromfile(str(source), dtype=np.uint8)
+    else:
+        buf = np.frombuffer(source, dtype=np.uint8)
+
+    img = cv2.imdecode(buf, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError("이미지를 디코딩할 수 없습니다")
+
+    if img.dtype == np.uint16:
+        # 16-bit PNG → 8-bit
+        img = (img >> 8).astype(np.uint8)
+    return img
+
+
+def has_alpha(img: np.ndarray) -> bool:
+    """Alpha 채널 포함 여부 (RGBA / LA)"""
+    return img.ndim == 3 and img.shape[2] in (2, 4)
+
+
+def image_domain(img: np.ndarray) -> str:
+    """'rgba' (Alpha 채널 캡챠) 또는 'rgb' (브라우저 화면 캡챠)"""
+    return 'rgba' if has_alpha(img) else 'rgb'
+
+
+def render_on_white(img: np.ndarray) -> np.ndarray:
+    """
+    RGBA 캡챠를 흰 배경에 합성한 BGR 이미지 (브라우저가 화면에 그린 캡챠와 같은 형태)
+
+    RGB 학습 데이터가 부족할 때 RGBA 학습 데이터로 'rgb' domain 샘플을 만드는 데 사용.
+    """
+    alpha = img[:, :, -1:].astype(np.float32) / 255.0
+    color = img[:, :, :3] if img.shape[2] == 4 else np.repeat(img[:, :, :1], 3, axis=2)
+    return (color * alpha + 255.0 * (1.0 - alpha)).round().astype(np.uint8)
+
+
+def to_gray(img: np.ndarray) -> np.ndarray:
+    """grayscale 변환 (Alpha 무시). PIL convert('L') 과는 반올림 차이로 일부 픽셀이 ±1 다름"""
+    if img.ndim == 2:
+        return img
+    channels = img.shape[2]
+    if channels == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    if channels == 3:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return img[:, :, 0]
+
+
+def text_plane(img: np.ndarray) -> np.ndarray:
+    """
+    텍스트 평면 추출 (글씨 검정, 배경 흰색)
+
+    RGBA/LA 는 Alpha 채널에 글씨가 흰색(255)으로 있으므로 반전한다.
+    RGB/L 은 반전하지 않는다 (원래 학습 전처리와 다름, 모듈 docstring 참고).
+    """
+    if has_alpha(img):
+        # Alpha view 에서 바로 반전 (복사는 반전 결과 한 번뿐)
+        return 255 - img[:, :, -1]
+    return to_gray(img)
+
+
+def otsu_thresholds(gray: np.ndarray) -> np.ndarray:
+    """
+    이미지별 Otsu 임계값 (cv2.THRESH_OTSU 와 동일, 배치 한 번에 계산)
+
+    Args:
+        gray: (N, H, W) uint8
+    Returns:
+        (N,) int, 임계값 이하가 글씨 쪽
+    """
+    n = gray.shape[0]
+    offsets = (np.arange(n) * 256)[:, np.newaxis]
+    hist = np.bincount((gray.reshape(n, -1) + offsets).ravel(), minlength=n * 256)
+    hist = hist.reshape(n, 256).astype(np.float64)
+
+    # 임계값 t 에서 두 클래스(≤t, >t) 사이 분산 σ²(t) ∝ (μ·w0 - m0)² / (w0·w1)
+    w0 = np.cumsum(hist, axis=1)
+    m0 = np.cumsum(hist * np.arange(256), axis=1)
+    total = w0[:, -1:]
+    w1 = total - w0
+    mean = m0[:, -1:] / total
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mean * w0 - m0) ** 2 / (w0 * w1)
+    between[(w0 == 0) | (w1 == 0)] = -1
+    return between.argmax(axis=1)
+
+
+def _min_filter(x: np.ndarray, k: int) -> np.ndarray:
+    """(N, H, W) 배치의 k×k 최소값 필터 (가로/세로 분리, 가장자리 복제)"""
+    r = k // 2
+    height, width = x.shape[1:]
+    padded = np.pad(x, ((0, 0), (r, r), (r, r)), mode='edge')
+    rows = padded[:, :, :width].copy()
+    for d in range(1, k):
+        np.minimum(rows, padded[:, :, d:d + width], out=rows)
+    out = rows[:, :height].copy()
+    for d in range(1, k):
+        np.minimum(out, rows[:, d:d + height], out=out)
+    return out
+
+
+def canonicalize(gray: np.ndarray) -> np.ndarray:
+    """
+    흰 배경 RGB 캡챠의 grayscale → Alpha 반전과 같은 텍스트 평면 (배치 벡터화)
+
+    흰 배경에 합성된 픽셀은 gray = ink·α + 배경·(1-α) 이므로 α 를 거꾸로 추정한다.
+    1. Otsu 임계값 t 로 글씨/배경 분리 (preprocess_v2.apply_morphology 와 같은 기준)
+    2. 배경 밝기 = t 보다 밝은 픽셀의 중앙값
+    3. ink = 주변(높이의 약 1/10 크기 창) 최소 밝기, 단 t/2 이하로 제한
+       (글자마다 색이 달라서 0 ~ 약 64, 안티에일리어싱 가장자리는 가까운 획의 색을 사용)
+    4. α = (배경 - gray) / (배경 - ink) 를 [0, 1] 로 자름 → 255·(1 - α)
+
+    Args:
+        gray: (N, H, W) uint8
+    Returns:
+        (N, H, W) uint8
+    """
+    thresholds = otsu_thresholds(gray)
+    n, height = gray.shape[:2]
+    flat = gray.reshape(n, -1)
+
+    # 배경 중앙값: 임계값 위 픽셀의 히스토그램 누적이 절반을 넘는 밝기
+    offsets = (np.arange(n) * 256)[:, np.newaxis]
+    hist = np.bincount((flat + offsets).ravel(), minlength=n * 256).reshape(n, 256)
+    hist[np.arange(256)[np.newaxis, :] <= thresholds[:, np.newaxis]] = 0
+    cumulative = np.cumsum(hist, axis=1)
+    background = (cumulative >= (cumulative[:, -1:] + 1) // 2).argmax(axis=1)
+
+    kernel = max(3, round(height / 10)) | 1
+    ink = np.minimum(_min_filter(gray, kernel).astype(np.float32),
+                     (thresholds / 2.0).astype(np.float32)[:, np.newaxis, np.newaxis])
+    background = background.astype(np.float32)[:, np.newaxis, np.newaxis]
+    alpha = (background - gray) / np.maximum(background - ink, 1.0)
+    np.clip(alpha, 0.0, 1.0, out=alpha)
+    return (255.0 * (1.0 - alpha) + 0.5).astype(np.uint8)
+
+
+def preprocess(
+    source: ImageSource,
+    size: Tuple[int, int] = (IMG_WIDTH, IMG_HEIGHT),
+    out: Optional[np.ndarray] = None,
+    canonical: bool = True
+) -> np.ndarray:
+    """
+    모델 입력 전처리
+
+    Args:
+        source: PNG 바이트 / 파일 경로 / 디코딩된 배열
+        size: (width, height)
+        out: (height, width) float32 출력 버퍼 (없으면 새로 할당)
+        canonical: RGB 이미지를 canonicalize (False 면 grayscale 그대로)
+
+    Returns:
+        (height, width) float32 [0, 1]
+    """
+    img = decode_image(source)
+    plane = text_plane(img)
+    if canonical and not has_alpha(img):
+        plane = canonicalize(plane[np.newaxis])[0]
+    resized = cv2.resize(plane, size)
+    if out is None:
+        out = np.empty((size[1], size[0]), dtype=np.float32)
+    np.take(NORMALIZE_LUT, resized, out=out)
+    return out
+
+
+def preprocess_batch(
+    sources: List[ImageSource],
+    size: Tuple[int, int] = (IMG_WIDTH, IMG_HEIGHT),
+    num_workers: Optional[int] = None,
+    canonical: bool = True,
+    variant: Optional[str] = None
+) -> np.ndarray:
+    """
+    배치 전처리 → (N, 1, height, width) float32
+
+    각 이미지는 미리 할당한 버퍼의 자기 위치에 바로 기록된다.
+    cv2 디코딩/리사이즈는 GIL 을 해제하므로 스레드 풀로 병렬화한다.
+    RGB 이미지는 디코딩만 해두고, 원본 크기가 같은 것끼리 묶어 한 번에 canonicalize 후 리사이즈.
+
+    variant: preprocess_v2.PREPROCESS_VARIANTS 이름. 그 변형으로 학습한 모델(체크포인트의
+             preprocess_variant)은 CaptchaPreprocessor 로 같은 전처리를 적용 (torch 필요)
+    """
+    if variant is not None:
+        from preprocess_v2 import CaptchaPreprocessor  # preprocess_v2 가 이 모듈을 import
+        preprocessor = CaptchaPreprocessor.from_variant(variant, target_size=size, use_mean_std=False)
+        return preprocessor.process_batch(list(sources), num_workers=num_workers).numpy()
+
+    width, height = size
+    batch = np.empty((len(sources), 1, height, width), dtype=np.float32)
+    pending = {}  # 인덱스 → canonicalize 대기 중인 RGB grayscale
+
+    def work(i):
+        img = decode_image(sources[i])
+        if canonical and not has_alpha(img):
+            pending[i] = to_gray(img)
+        else:
+            np.take(NORMALIZE_LUT, cv2.resize(text_plane(img), size), out=batch[i, 0])
+
+    workers = num_workers or BATCH_WORKERS
+    if workers > 1 and len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(work, range(len(sources))))
+    else:
+        for i in range(len(sources)):
+            work(i)
+
+    by_shape = {}
+    for i, plane in pending.items():
+        by_shape.setdefault(plane.shape, []).append(i)
+    for indices in by_shape.values():
+        planes = canonicalize(np.stack([pending[i] for i in indices]))
+        for i, plane in zip(indices, planes):
+            np.take(NORMALIZE_LUT, cv2.resize(plane, size), out=batch[i, 0])
+
+    return batch
@@ -0,0 +1,181 @@
+"""
+캡챠 추론 계측: 단계별 지연 히스토그램 / 카운터 + 요청별 JSON line 로그
+
+- Metrics: 카운터, 히스토그램(누적 bucket), Prometheus text 형식 렌더링 (/metrics)
+- TraceLog: 요청 1건 = JSON 한 줄 (파일 또는 '-' 이면 stdout)
+- enabled=False 면 observe/inc 가 바로 반환 (락, 딕셔너리 접근 없음)
+
+단계 (captcha_server.py):
+    decode      PNG 디코딩 (요청 스레드)
+    queue_wait  micro-batch 큐 대기
+    preprocess  배치 전처리 (텍스트 평면, 리사이즈, 정규화)
+    forward     모델 forward
+    postprocess 숫자/신뢰도 변환
+    total       요청 수신 → 응답 직전
+"""
+
+import sys
+import json
+import time
+import threading
+from bisect import bisect_left
+
+# 초 단위. 0.5ms ~ 5s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram:
+    """고정 bucket 히스토그램 (bucket 별 개수는 누적하지 않고 저장, 렌더링 때 누적)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """bucket 상한 기준 근사 분위수"""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """스레드 안전 카운터/히스토그램 모음"""
+
+    def __init__(self, enabled=True, prefix='captcha'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.help = {}
+        self.counters = {}     # (name, labels) → 값
+        self.histograms = {}   # (name, labels) → Histogram
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_stages(self, timings, name='stage_seconds'):
+        """{'decode_ms': ..., ...} → stage 라벨별 히스토그램 (ms → 초)"""
+        if not self.enabled:
+            return
+        with self.lock:
+            for stage, ms in timings.items():
+                key = (name, (('stage', stage[:-3]),))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(LATENCY_BUCKETS)
+                histogram.observe(ms / 1000)
+
+    def summary(self, name='stage_seconds'):
+        """라벨별 count / 평균 / p50 / p99 (ms), /stats 용"""
+        with self.lock:
+            return {
+                dict(labels).get('stage', _labels(labels)): {
+                    'count': h.count,
+                    'mean_ms': h.sum / h.count * 1000 if h.count else 0.0,
+                    'p50_ms': h.quantile(0.5) * 1000,
+                    'p99_ms': h.quantile(0.99) * 1000,
+                }
+                for (metric, labels), h in self.histograms.items() if metric == name
+            }
+
+    def render(self, extra=()):
+        """
+        Prometheus text exposition
+
+        Args:
+            extra: 다른 곳에서 관리하는 값 [(name, 'counter' | 'gauge', labels dict, value), ...]
+                   (캐시 통계, 모델 버전 등 렌더링 시점에 읽음)
+        """
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda kv: kv[0])
+            histograms = [(key, h.buckets, list(h.counts), h.sum, h.count) for key, h in histograms]
+
+        def header(name, kind, seen):
+            if name in seen:
+                return
+            seen.add(name)
+            full = f'{self.prefix}_{name}'
+            if name in self.help:
+                lines.append(f'# HELP {full} {self.help[name]}')
+            lines.append(f'# TYPE {full} {kind}')
+
+        seen = set()
+        for (name, labels), value in counters:
+            header(name, 'counter', seen)
+            lines.append(f'{self.prefix}_{name}{_labels(labels)} {_number(value)}')
+
+        for (name, labels), buckets, counts, total, count in histograms:
+            header(name, 'histogram', seen)
+            full, cumulative = f'{self.prefix}_{name}', 0
+            for bound, n in zip(buckets + (float('inf'),), counts):
+                cumulative += n
+                lines.append(f'{full}_bucket{_labels(labels + (("le", _number(bound)),))} {cumulative}')
+            lines.append(f'{full}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{full}_count{_labels(labels)} {count}')
+
+        for name, kind, labels, value in extra:
+            header(name, kind, seen)
+            lines.append(f'{self.prefix}_{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class TraceLog:
+    """요청별 JSON line 기록 (path='-' 이면 stdout)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = sys.stdout if path == '-' else open(path, 'a', buffering=1, encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps({'ts': round(time.time(), 3), **record}, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + '\n')
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
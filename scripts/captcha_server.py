@@ -0,0 +1,713 @@
+"""
+캡챠 추론 서버 (상주 프로세스)
+
+captcha-solver.ts 는 요청마다 python3 를 띄워 모델을 다시 로드한다. 이 서버는 모델을 한 번만
+로드해 두고 HTTP 로 예측한다 (CAPTCHA_SERVER_URL 이 설정되면 captcha-solver.ts 가 먼저 사용).
+
+- POST /predict   body: PNG 바이트 → {"text", "confidences", "confidence", "cached", "model_version"}
+- GET  /stats     캐시 hit/miss/eviction, 모델 버전
+- 동시에 들어온 요청은 micro-batch 로 묶어 한 번의 전처리/forward 로 처리
+- 결과 캐시: PNG 원본 바이트의 blake2b 해시 → (숫자, 자리별 신뢰도)
+    항목 수 + 바이트 상한 LRU, hit 이면 디코딩/forward 모두 생략
+    항목은 모델 버전(가중치 파일 해시)에 묶여 있어 버전이 바뀌면 자동으로 비워짐
+- 모델: .pth (load_multihead, calibration temperature 포함) 또는 .npz (numpy_inference)
+    체크포인트에 preprocess_variant 가 있으면 그 전처리 변형으로, 없으면 captcha_image 기본 전처리로 입력을 만든다
+- 모델 레지스트리(--registry): 폴더의 최신 모델 = primary, shadow/ 하위 최신 모델 = shadow 후보
+    쓰기가 끝난(크기/mtime 이 한 polling 간격 동안 그대로인) 파일만 백그라운드에서 로드 + warm-up 후
+    교체하므로 요청 처리가 멈추지 않고, 반쯤 쓰인 파일을 읽지 않는다
+    --publish 로 게시하면 임시 파일 복사 후 os.replace (원자적)
+- Shadow 평가: 후보 모델을 micro-batch 의 일부(--shadow-fraction)에 primary 와 같은 전처리 결과로
+    실행해 6자리/자리별 일치율 집계 (/stats, 주기적 로그). 응답은 항상 primary 결과
+    승격: shadow/ 의 파일을 레지스트리 폴더로 옮기면 primary 로 교체되고 shadow 는 꺼짐
+- 계측 (captcha_metrics.py): 요청별 단계 지연(decode, queue_wait, preprocess, forward, postprocess, total)과
+    배치 크기 히스토그램, 요청/오류/캐시 카운터, 모델 버전을 GET /metrics (Prometheus text) 로 노출
+    --trace-log 를 주면 요청마다 JSON 한 줄 기록, --no-metrics 면 계측 생략
+- 피드백 (--feedback-dir, feedback_store.py): POST /feedback 으로 api-client.ts 가 보낸 캡챠 답의
+    통과/거절 결과를 저장 (JSON: image(base64 PNG), text, accepted, confidences, model_version, solver)
+
+사용법:
+    python scripts/captcha_server.py
+    python scripts/captcha_server.py --model ./data/captcha-model/cbam_multihead_v2_final.npz --port 8765
+    python scripts/captcha_server.py --registry ./data/captcha-model/registry --shadow-fraction 0.2
+    python scripts/captcha_server.py --registry ./data/captcha-model/registry --publish new_model.pth --publish-shadow
+    python scripts/captcha_server.py --trace-log ./data/captcha-model/trace.jsonl
+    curl --data-binary @captcha.png http://127.0.0.1:8765/predict
+    curl http://127.0.0.1:8765/metrics
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import base64
+import binascii
+import shutil
+import signal
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from captcha_image import decode_image, preprocess_batch
+from captcha_metrics import BATCH_SIZE_BUCKETS, Metrics, TraceLog
+from feedback_store import FeedbackStore
+
+MODEL_PATH = './data/captcha-model/cbam_multihead_v2_final.pth'
+REGISTRY_DIR = './data/captcha-model/registry'
+MODEL_EXTENSIONS = ('.pth', '.npz')
+HOST = '127.0.0.1'
+PORT = 8765
+
+CACHE_MAX_ENTRIES = 10000
+CACHE_MAX_BYTES = 4 * 1024 * 1024
+MAX_BATCH = 32
+MAX_WAIT_MS = 5.0
+
+POLL_SECONDS = 5.0
+SHADOW_FRACTION = 0.1
+SHADOW_LOG_EVERY = 100
+
+# 피드백은 드물게 오므로 작은 묶음으로 기록 (종료 시 나머지 flush)
+FEEDBACK_FLUSH_EVERY = 8
+
+
+def content_hash(data):
+    """PNG 원본 바이트 해시 (캐시 키)"""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def model_version(path):
+    """가중치 파일 내용 해시 앞 12자리"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+# ============================================================
+# 결과 캐시
+# ============================================================
+class ResultCache:
+    """
+    항목 수 + 바이트 상한 LRU. 값은 (text, confidences).
+    모든 항목은 하나의 모델 버전에 속하며, 다른 버전으로 조회/저장하면 먼저 전부 비운다.
+    """
+
+    ENTRY_OVERHEAD = 64  # OrderedDict 노드 등 고정 비용 (근사)
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def entry_size(cls, key, value):
+        text, confidences = value
+        return len(key) + len(text) + 8 * len(confidences) + cls.ENTRY_OVERHEAD
+
+    def _sync_version(self, version):
+        if version != self.version:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.bytes = 0
+            self.version = version
+
+    def get(self, key, version):
+        with self.lock:
+            self._sync_version(version)
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version):
+        size = self.entry_size(key, value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self.lock:
+            self._sync_version(version)
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= self.entry_size(key, old)
+            self.entries[key] = value
+            self.bytes += size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                old_key, old_value = self.entries.popitem(last=False)
+                self.bytes -= self.entry_size(old_key, old_value)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'version': self.version,
+            }
+
+
+# ============================================================
+# 모델
+# ============================================================
+class Engine:
+    """.pth / .npz 공통 인터페이스: predict((N, 1, H, W) float32) → (N, 6) 숫자, (N, 6) 신뢰도"""
+
+    def __init__(self, path):
+        self.path = path
+        self.version = model_version(path)
+        if path.endswith('.npz'):
+            from numpy_inference import NumpyCBAMMultiHead
+            self.model = NumpyCBAMMultiHead(path)
+            self.torch = None
+        else:
+            import torch
+            from cbam_multihead_v2 import load_multihead
+            self.model = load_multihead(path)
+            self.torch = torch
+        self.img_width = self.model.img_width
+        self.img_height = self.model.img_height
+        # 모델이 학습된 전처리 변형 (benchmark-preprocessing.py --write-config 로 저장된 모델)
+        self.preprocess_variant = self.model.preprocess_variant
+
+    def preprocess(self, sources):
+        """PNG 바이트 리스트 → (N, 1, H, W) float32 (모델의 입력 해상도/전처리 변형)"""
+        return preprocess_batch(sources, (self.img_width, self.img_height), variant=self.preprocess_variant)
+
+    def predict(self, images):
+        if self.torch is None:
+            return self.model.predict_with_confidence(images)
+        with self.torch.inference_mode():
+            digits, confidences = self.model.predict_with_confidence(self.torch.from_numpy(images))
+        return digits.numpy(), confidences.numpy()
+
+    def warmup(self, batch_sizes=(1, MAX_BATCH)):
+        """교체 전 첫 요청 지연(메모리 할당, 커널 선택)을 미리 치름"""
+        for size in batch_sizes:
+            self.predict(np.zeros((size, 1, self.img_height, self.img_width), dtype=np.float32))
+
+
+class ShadowEvaluator:
+    """
+    후보 모델을 트래픽의 fraction 만큼 primary 와 같은 micro-batch / 전처리 결과로 실행해 일치율 집계.
+    응답에는 영향이 없고, primary 응답을 보낸 뒤 실행된다.
+    """
+
+    def __init__(self, engine, fraction=SHADOW_FRACTION, log_every=SHADOW_LOG_EVERY, seed=None):
+        self.engine = engine
+        self.fraction = fraction
+        self.log_every = log_every
+        self.rng = np.random.default_rng(seed)
+        self.compared = 0
+        self.sequence_agree = 0
+        self.digit_agree = 0
+        self.primary_confidence = 0.0
+        self.shadow_confidence = 0.0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def observe(self, sources, images, primary, results):
+        """sources/images: primary 배치 입력, results: primary 의 [(text, confidences), ...]"""
+        idx = np.nonzero(self.rng.random(len(sources)) < self.fraction)[0]
+        if not len(idx):
+            return
+        try:
+            if ((self.engine.img_width, self.engine.img_height, self.engine.preprocess_variant)
+                    == (primary.img_width, primary.img_height, primary.preprocess_variant)):
+                shadow_images = images[idx]
+            else:
+                shadow_images = self.engine.preprocess([sources[i] for i in idx])
+            digits, confidences = self.engine.predict(shadow_images)
+        except Exception as e:
+            with self.lock:
+                self.errors += 1
+            print(f"[shadow] 예측 실패: {e}")
+            return
+
+        with self.lock:
+            before = self.compared // self.log_every
+            for i, row, conf in zip(idx, digits, confidences):
+                text, primary_conf = results[i]
+                shadow_text = ''.join(map(str, row.tolist()))
+                self.compared += 1
+                self.sequence_agree += shadow_text == text
+                self.digit_agree += sum(a == b for a, b in zip(shadow_text, text))
+                self.primary_confidence += float(np.prod(primary_conf))
+                self.shadow_confidence += float(np.prod(conf))
+            if self.compared // self.log_every > before:
+                stats = self._stats()
+                print(f"[shadow] {primary.version} vs {self.engine.version}: {stats['compared']}건, "
+                      f"6자리 일치 {stats['sequence_agreement']*100:.2f}%, "
+                      f"자리 일치 {stats['digit_agreement']*100:.2f}%")
+
+    def _stats(self):
+        n = max(self.compared, 1)
+        return {
+            'model': self.engine.path,
+            'model_version': self.engine.version,
+            'fraction': self.fraction,
+            'compared': self.compared,
+            'sequence_agreement': self.sequence_agree / n,
+            'digit_agreement': self.digit_agree / (n * 6),
+            'mean_confidence': {'primary': self.primary_confidence / n, 'shadow': self.shadow_confidence / n},
+            'errors': self.errors,
+        }
+
+    def stats(self):
+        with self.lock:
+            return self._stats()
+
+
+class MicroBatcher:
+    """요청 큐에서 최대 max_batch 개 / max_wait_ms 까지 모아 한 번에 추론하는 워커 스레드"""
+
+    def __init__(self, engine, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, metrics=None):
+        self.engine = engine
+        self.shadow = None
+        self.metrics = metrics or Metrics(enabled=False)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, image):
+        """디코딩된 이미지 (또는 PNG 바이트) → Future[(text, confidences, model_version, timings)]"""
+        future = Future()
+        self.requests.put((image, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        try:
+            while len(batch) < self.max_batch:
+                batch.append(self.requests.get(timeout=self.max_wait))
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            self._predict(self._collect())
+
+    def _predict(self, batch):
+        # 배치 도중 모델이 교체되어도 이 배치는 처음 잡은 모델로 끝까지 처리
+        engine = self.engine
+        sources = [image for image, _, _ in batch]
+        start = time.perf_counter()
+        try:
+            images = engine.preprocess(sources)
+            preprocessed = time.perf_counter()
+            digits, confidences = engine.predict(images)
+            forwarded = time.perf_counter()
+        except Exception as e:
+            # 디코딩 실패 등: 한 장 때문에 배치 전체가 실패하지 않도록 한 장씩 다시 처리
+            if len(batch) > 1:
+                for item in batch:
+                    self._predict([item])
+            else:
+                batch[0][1].set_exception(e)
+            return
+        results = [(''.join(map(str, row.tolist())), [float(c) for c in conf])
+                   for row, conf in zip(digits, confidences)]
+        done = time.perf_counter()
+
+        stages = {
+            'preprocess_ms': (preprocessed - start) * 1000,
+            'forward_ms': (forwarded - preprocessed) * 1000,
+            'postprocess_ms': (done - forwarded) * 1000,
+            'batch_size': len(batch),
+        }
+        self.metrics.observe('batch_size', len(batch), BATCH_SIZE_BUCKETS)
+        for (_, future, enqueued), (text, conf) in zip(batch, results):
+            future.set_result((text, conf, engine.version,
+                               {'queue_wait_ms': (start - enqueued) * 1000, **stages}))
+
+        shadow = self.shadow
+        if shadow is not None:
+            shadow.observe(sources, images, engine, results)
+
+
+class CaptchaService:
+    """캐시 → (miss 면) micro-batch 추론 → 캐시 저장"""
+
+    def __init__(self, engine, cache=None, metrics=None, trace=None, feedback=None, **batch_args):
+        self.engine = engine
+        self.cache = cache or ResultCache()
+        self.feedback = feedback
+        self.metrics = metrics or Metrics(enabled=False)
+        self.trace = trace
+        self.timed = self.metrics.enabled or trace is not None
+        self.batcher = MicroBatcher(engine, metrics=self.metrics, **batch_args)
+        self.metrics.describe('requests_total', '처리한 /predict 요청 수')
+        self.metrics.describe('errors_total', '실패한 /predict 요청 수 (HTTP status 별)')
+        self.metrics.describe('stage_seconds', '요청별 단계 지연')
+        self.metrics.describe('batch_size', 'micro-batch 크기')
+        self.metrics.describe('feedback_total', 'SCOURT 통과/거절 피드백 수')
+
+    def solve(self, data):
+        start = time.perf_counter() if self.timed else 0.0
+        key = content_hash(data)
+        version = self.engine.version
+        cached = self.cache.get(key, version)
+        timings = {}
+        if cached is not None:
+            text, confidences = cached
+        else:
+            # 디코딩은 요청 스레드에서 (요청끼리 병렬, 잘못된 이미지는 큐에 넣기 전에 400)
+            decode_start = time.perf_counter() if self.timed else 0.0
+            image = decode_image(data)
+            if self.timed:
+                timings['decode_ms'] = (time.perf_counter() - decode_start) * 1000
+            text, confidences, version, batch_timings = self.batcher.submit(image).result()
+            timings.update(batch_timings)
+            self.cache.put(key, (text, confidences), version)
+
+        if self.timed:
+            timings['total_ms'] = (time.perf_counter() - start) * 1000
+            self._record(cached is not None, version, timings)
+        return {
+            'text': text,
+            'confidences': [round(c, 4) for c in confidences],
+            'confidence': round(float(np.prod(confidences)), 6),
+            'cached': cached is not None,
+            'model_version': version,
+        }
+
+    def add_feedback(self, payload):
+        """POST /feedback: SCOURT 가 캡챠 답을 받아들였는지 기록"""
+        if self.feedback is None:
+            raise RuntimeError("피드백 저장소가 설정되지 않았습니다 (--feedback-dir)")
+        if not isinstance(payload, dict) or 'image' not in payload or 'accepted' not in payload:
+            raise ValueError("image, accepted 가 필요합니다")
+        try:
+            image = base64.b64decode(payload['image'], validate=True)
+        except (binascii.Error, TypeError) as e:
+            raise ValueError(f"image 가 base64 가 아닙니다: {e}")
+        added = self.feedback.add(
+            image, payload.get('text'), bool(payload['accepted']), payload.get('confidences'),
+            payload.get('model_version'), payload.get('solver', 'model')
+        )
+        self.metrics.inc('feedback_total', accepted=str(bool(payload['accepted'])).lower())
+        return {'added': added, 'records': len(self.feedback)}
+
+    def _record(self, cached, version, timings):
+        batch_size = timings.pop('batch_size', None)
+        self.metrics.inc('requests_total', cached=str(cached).lower())
+        self.metrics.observe_stages(timings)
+        if self.trace is not None:
+            self.trace.write({'status': 200, 'cached': cached, 'model_version': version,
+                              'batch_size': batch_size, **{k: round(v, 3) for k, v in timings.items()}})
+
+    def record_error(self, status, error):
+        self.metrics.inc('errors_total', status=str(status))
+        if self.trace is not None:
+            self.trace.write({'status': status, 'error': str(error), 'model_version': self.engine.version})
+
+    def render_metrics(self):
+        """GET /metrics: 계측 + 캐시 통계 + 모델 버전 (+ shadow 일치율)"""
+        cache = self.cache.stats()
+        extra = [
+            ('cache_hits_total', 'counter', {}, cache['hits']),
+            ('cache_misses_total', 'counter', {}, cache['misses']),
+            ('cache_evictions_total', 'counter', {}, cache['evictions']),
+            ('cache_invalidations_total', 'counter', {}, cache['invalidations']),
+            ('cache_entries', 'gauge', {}, cache['entries']),
+            ('cache_bytes', 'gauge', {}, cache['bytes']),
+            ('model_info', 'gauge', {'version': self.engine.version, 'role': 'primary'}, 1),
+        ]
+        shadow = self.batcher.shadow
+        if shadow is not None:
+            stats = shadow.stats()
+            extra += [
+                ('model_info', 'gauge', {'version': stats['model_version'], 'role': 'shadow'}, 1),
+                ('shadow_compared_total', 'counter', {}, stats['compared']),
+                ('shadow_sequence_agreement', 'gauge', {}, stats['sequence_agreement']),
+                ('shadow_digit_agreement', 'gauge', {}, stats['digit_agreement']),
+            ]
+        return self.metrics.render(extra)
+
+    def swap(self, engine):
+        """warm-up 이 끝난 모델로 교체 (다음 배치부터 적용, 캐시는 버전이 바뀌어 자동으로 비워짐)"""
+        old = self.engine
+        self.engine = engine
+        self.batcher.engine = engine
+        print(f"모델 교체: {old.version} → {engine.version} ({engine.path})")
+
+    def set_shadow(self, engine, fraction=SHADOW_FRACTION):
+        """shadow 후보 설정 (None 이면 끔)"""
+        self.batcher.shadow = ShadowEvaluator(engine, fraction) if engine is not None else None
+        if engine is not None:
+            print(f"Shadow 평가 시작: {engine.version} ({engine.path}), 트래픽 {fraction*100:.0f}%")
+        else:
+            print("Shadow 평가 종료")
+
+    def stats(self):
+        shadow = self.batcher.shadow
+        return {
+            'model': self.engine.path,
+            'model_version': self.engine.version,
+            'cache': self.cache.stats(),
+            'shadow': shadow.stats() if shadow is not None else None,
+            'latency': self.metrics.summary() if self.metrics.enabled else None,
+        }
+
+
+# ============================================================
+# 모델 레지스트리
+# ============================================================
+def newest_model(directory):
+    """폴더의 최신(mtime) 모델 파일 (path, size, mtime). 숨김/임시 파일 제외"""
+    if not os.path.isdir(directory):
+        return None
+    candidates = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith('.') or not name.endswith(MODEL_EXTENSIONS) or not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        candidates.append((stat.st_mtime, path, stat.st_size))
+    if not candidates:
+        return None
+    mtime, path, size = max(candidates)
+    return path, size, mtime
+
+
+def publish_model(src, registry_dir=REGISTRY_DIR, shadow=False):
+    """레지스트리에 원자적으로 게시 (같은 폴더의 임시 파일에 복사 후 os.replace)"""
+    target_dir = os.path.join(registry_dir, 'shadow') if shadow else registry_dir
+    os.makedirs(target_dir, exist_ok=True)
+    name = f"{datetime.now():%Y%m%d_%H%M%S}_{os.path.basename(src)}"
+    tmp_path = os.path.join(target_dir, f'.{name}.tmp')
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, os.path.join(target_dir, name))
+    return os.path.join(target_dir, name)
+
+
+class ModelRegistry:
+    """
+    레지스트리 폴더 감시 스레드
+    - 폴더의 최신 모델 = primary, shadow/ 의 최신 모델 = shadow 후보
+    - 새 파일은 다음 polling 때도 크기/mtime 이 같을 때만 로드 (쓰는 중인 파일 무시)
+    - 로드 + warm-up 은 감시 스레드에서 하고 끝나면 교체 → 요청 처리는 멈추지 않음
+    - 로드 실패한 파일은 내용(크기/mtime)이 바뀔 때까지 다시 시도하지 않음
+    """
+
+    def __init__(self, directory, service, poll_seconds=POLL_SECONDS, shadow_fraction=SHADOW_FRACTION):
+        self.directory = directory
+        self.service = service
+        self.poll_seconds = poll_seconds
+        self.shadow_fraction = shadow_fraction
+        self.loaded = {'primary': None, 'shadow': None}
+        self.pending = {'primary': None, 'shadow': None}
+        self.failed = set()
+
+    def poll(self):
+        dirs = {'primary': self.directory, 'shadow': os.path.join(self.directory, 'shadow')}
+        for role, directory in dirs.items():
+            candidate = newest_model(directory)
+            if candidate is None:
+                if role == 'shadow' and self.loaded['shadow'] is not None:
+                    # shadow/ 가 비었음 (승격 또는 철회)
+                    self.loaded['shadow'] = None
+                    self.service.set_shadow(None)
+                continue
+            if candidate == self.loaded[role] or candidate in self.failed:
+                continue
+            if candidate != self.pending[role]:
+                self.pending[role] = candidate  # 다음 polling 까지 그대로면 로드
+                continue
+            self.pending[role] = None
+
+            try:
+                engine = Engine(candidate[0])
+                engine.warmup((1, self.service.batcher.max_batch))
+            except Exception as e:
+                self.failed.add(candidate)
+                print(f"모델 로드 실패 ({role}): {candidate[0]}: {e}")
+                continue
+
+            self.loaded[role] = candidate
+            if role == 'primary':
+                self.service.swap(engine)
+            else:
+                self.service.set_shadow(engine, self.shadow_fraction)
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"레지스트리 감시 오류: {e}")
+            time.sleep(self.poll_seconds)
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+
+# ============================================================
+# HTTP
+# ============================================================
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path == '/feedback':
+                self._handle_feedback()
+                return
+            if self.path != '/predict':
+                self._send_json(404, {'error': 'not found'})
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            if length <= 0:
+                self._send_json(400, {'error': '이미지가 없습니다'})
+                return
+            try:
+                self._send_json(200, service.solve(self.rfile.read(length)))
+            except ValueError as e:
+                service.record_error(400, e)
+                self._send_json(400, {'error': str(e)})
+            except Exception as e:
+                service.record_error(500, e)
+                self._send_json(500, {'error': str(e)})
+
+        def _handle_feedback(self):
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b'null')
+                self._send_json(200, service.add_feedback(payload))
+            except ValueError as e:  # JSONDecodeError 포함
+                self._send_json(400, {'error': str(e)})
+            except RuntimeError as e:
+                self._send_json(404, {'error': str(e)})
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = service.render_metrics().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif self.path == '/stats':
+                self._send_json(200, service.stats())
+            elif self.path == '/health':
+                self._send_json(200, {'ok': True, 'model_version': service.engine.version})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='캡챠 추론 서버')
+    parser.add_argument('--model', default=MODEL_PATH, help='.pth 또는 .npz')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--cache-entries', type=int, default=CACHE_MAX_ENTRIES, help='0 이면 캐시 끔')
+    parser.add_argument('--cache-bytes', type=int, default=CACHE_MAX_BYTES)
+    parser.add_argument('--registry', default=None, help=f'감시할 모델 레지스트리 폴더 (예: {REGISTRY_DIR})')
+    parser.add_argument('--poll-seconds', type=float, default=POLL_SECONDS)
+    parser.add_argument('--shadow', default=None, help='고정 shadow 후보 모델 (레지스트리 없이)')
+    parser.add_argument('--shadow-fraction', type=float, default=SHADOW_FRACTION)
+    parser.add_argument('--publish', default=None, help='모델을 --registry 에 게시하고 종료')
+    parser.add_argument('--publish-shadow', action='store_true', help='shadow/ 에 게시')
+    parser.add_argument('--trace-log', default=None, help="요청별 JSON line 기록 파일 ('-' 이면 stdout)")
+    parser.add_argument('--no-metrics', action='store_true', help='단계별 지연 계측 끄기')
+    parser.add_argument('--feedback-dir', default=None, help='POST /feedback 저장 폴더 (예: ./data/captcha-feedback)')
+    args = parser.parse_args()
+
+    if args.publish:
+        path = publish_model(args.publish, args.registry or REGISTRY_DIR, shadow=args.publish_shadow)
+        print(f"게시: {path}")
+        return 0
+
+    print("=" * 60)
+    print("캡챠 추론 서버")
+    print("=" * 60)
+
+    # 레지스트리에 모델이 있으면 최신 모델로 시작
+    initial = newest_model(args.registry) if args.registry else None
+    model_path = initial[0] if initial else args.model
+    if not os.path.exists(model_path):
+        print(f"모델이 없습니다: {model_path}")
+        return 1
+
+    engine = Engine(model_path)
+    engine.warmup((1, args.max_batch))
+    service = CaptchaService(
+        engine, ResultCache(args.cache_entries, args.cache_bytes),
+        metrics=Metrics(enabled=not args.no_metrics),
+        trace=TraceLog(args.trace_log) if args.trace_log else None,
+        feedback=FeedbackStore(args.feedback_dir, flush_every=FEEDBACK_FLUSH_EVERY) if args.feedback_dir else None,
+        max_batch=args.max_batch, max_wait_ms=args.max_wait_ms
+    )
+    if args.shadow:
+        service.set_shadow(Engine(args.shadow), args.shadow_fraction)
+    if args.registry:
+        registry = ModelRegistry(args.registry, service, args.poll_seconds, args.shadow_fraction)
+        registry.loaded['primary'] = initial
+        registry.start()
+        print(f"레지스트리 감시: {args.registry} ({args.poll_seconds:g}s 간격)")
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"모델: {model_path} (버전 {engine.version}, 입력 {engine.img_width}x{engine.img_height}, "
+          f"전처리 {engine.preprocess_variant or '기본'})")
+    print(f"캐시: 최대 {args.cache_entries}개 / {args.cache_bytes:,} bytes")
+    print(f"http://{args.host}:{args.port}/predict 대기 중")
+    # SIGTERM 도 KeyboardInterrupt 와 같이 정리 (피드백 flush, trace 로그 닫기)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if service.trace is not None:
+            service.trace.close()
+        if service.feedback is not None:
+            service.feedback.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
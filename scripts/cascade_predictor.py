@@ -0,0 +1,221 @@
+"""
+신뢰도 기반 Cascade 추론: 작은 모델 먼저, 확신이 없을 때만 전체 모델
+
+- fast 모델(TinyMultiHead / pruned 등)의 자리별 최대 softmax 중 최소값이 threshold 미만이면
+  full 모델(CBAM_MultiHead_V2, 여러 개면 softmax 평균 앙상블)로 다시 예측
+- softmax 는 체크포인트의 calibration temperature(calibrate_multihead.py)를 적용한 확률
+  (captcha_server / predict_with_confidence 와 같은 신뢰도 척도)
+- tune: 검증 split(train_multihead_v2.split_samples)에서 목표 정확도를 만족하면서 평균 지연이 최소인 threshold 탐색,
+  escalation 비율과 함께 cascade_config.json 에 저장
+- 이미지는 한 번만 디코딩하고, 전처리는 입력 해상도/전처리 변형이 같은 모델끼리 공유
+
+사용법:
+    python scripts/cascade_predictor.py tune --fast ./data/captcha-model/student_8_16_32_48.pth \\
+        --full ./data/captcha-model/cbam_multihead_v2_final.pth --target-acc 0.98
+    python scripts/cascade_predictor.py predict image.png [image2.png ...]
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import load_multihead
+from captcha_image import decode_image, preprocess_batch
+from train_multihead_v2 import DATA_DIR, MODEL_DIR, list_samples, split_samples
+from distill_multihead import measure_latency
+
+CASCADE_CONFIG_PATH = os.path.join(MODEL_DIR, 'cascade_config.json')
+FULL_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_final.pth')
+
+
+def predict_probs(models, sources, batch_size=256):
+    """
+    (N, 6, 10) softmax (head 별 temperature 적용). 여러 모델이면 평균 (앙상블)
+
+    sources 는 decode_image 결과를 넘기면 다시 디코딩하지 않는다.
+    """
+    decoded = [decode_image(s) for s in sources]
+    inputs = {}  # (width, height, 전처리 변형) → 전처리 결과
+    total = None
+    for model in models:
+        key = (model.img_width, model.img_height, model.preprocess_variant)
+        if key not in inputs:
+            inputs[key] = torch.from_numpy(preprocess_batch(decoded, key[:2], variant=key[2]))
+        temperatures = (torch.tensor(model.temperatures, dtype=torch.float32)[:, None]
+                        if model.temperatures is not None else None)
+        outputs = []
+        with torch.no_grad():
+            for batch in torch.split(inputs[key], batch_size):
+                logits = torch.stack(model(batch), dim=1)  # (B, 6, 10)
+                if temperatures is not None:
+                    logits = logits / temperatures
+                outputs.append(F.softmax(logits, dim=-1))
+        probs = torch.cat(outputs)
+        total = probs if total is None else total + probs
+    return total / len(models)
+
+
+class CascadePredictor:
+    """fast → (min 자리 신뢰도 < threshold 인 샘플만) full"""
+
+    def __init__(self, fast, full, threshold):
+        self.fast = fast.eval()
+        self.full = [m.eval() for m in (full if isinstance(full, (list, tuple)) else [full])]
+        self.threshold = threshold
+
+    @classmethod
+    def from_config(cls, path=CASCADE_CONFIG_PATH):
+        with open(path) as f:
+            config = json.load(f)
+        return cls(load_multihead(config['fast']), [load_multihead(p) for p in config['full']],
+                   config['threshold'])
+
+    def predict(self, sources):
+        """
+        Returns:
+            digits (N, 6), confidences (N, 6), escalated (N,) bool
+        """
+        sources = [decode_image(s) for s in sources]  # fast / full 이 같은 디코딩 결과 사용
+        probs = predict_probs([self.fast], sources)
+        confidences, digits = probs.max(dim=-1)
+        escalated = confidences.min(dim=1).values < self.threshold
+
+        if escalated.any():
+            hard = [s for s, e in zip(sources, escalated.tolist()) if e]
+            full_conf, full_digits = predict_probs(self.full, hard).max(dim=-1)
+            digits[escalated] = full_digits
+            confidences[escalated] = full_conf
+
+        return digits, confidences, escalated
+
+
+def tune_threshold(fast_probs, full_probs, labels, fast_ms, full_ms, target_acc):
+    """
+    threshold 후보(fast 의 min 자리 신뢰도 값들)마다 cascade 정확도/평균 지연 계산.
+    목표 정확도를 만족하는 것 중 평균 지연 최소, 없으면 정확도 최대.
+    """
+    fast_conf = fast_probs.max(dim=-1).values.min(dim=1).values.numpy()
+    fast_ok = (fast_probs.argmax(-1) == labels).all(dim=1).numpy()
+    full_ok = (full_probs.argmax(-1) == labels).all(dim=1).numpy()
+
+    # fast_conf 오름차순 정렬 후 누적합: threshold 를 k번째 값 바로 위로 두면 하위 k개가 escalation
+    order = np.argsort(fast_conf)
+    n = len(order)
+    full_prefix = np.concatenate([[0], np.cumsum(full_ok[order])])
+    fast_suffix = np.concatenate([np.cumsum(fast_ok[order][::-1])[::-1], [0]])
+    escalated = np.arange(n + 1)
+    accuracy = (full_prefix + fast_suffix) / n
+    latency = fast_ms + escalated / n * full_ms
+    thresholds = np.concatenate([[0.0], np.nextafter(fast_conf[order], np.inf)])
+
+    # 같은 신뢰도 값(예: 1.0)은 threshold 로 나눌 수 없으므로 값이 바뀌는 경계만 후보
+    sorted_conf = fast_conf[order]
+    valid = np.ones(n + 1, dtype=bool)
+    valid[1:n] = sorted_conf[:-1] < sorted_conf[1:]
+
+    eligible = np.nonzero(valid & (accuracy >= target_acc))[0]
+    if len(eligible):
+        best = eligible[np.argmin(latency[eligible])]
+    else:
+        best = int(np.argmax(np.where(valid, accuracy, -1)))
+
+    candidates = np.nonzero(valid)[0]
+    curve_idx = candidates[np.linspace(0, len(candidates) - 1, min(len(candidates), 21)).astype(int)]
+    return {
+        'threshold': float(thresholds[best]),
+        'accuracy': float(accuracy[best]),
+        'escalation_rate': float(escalated[best] / n),
+        'avg_latency_ms': float(latency[best]),
+        'fast_accuracy': float(fast_ok.mean()),
+        'full_accuracy': float(full_ok.mean()),
+        'fast_ms': fast_ms,
+        'full_ms': full_ms,
+        'target_met': bool(len(eligible)),
+        'curve': [{'threshold': float(thresholds[i]), 'accuracy': float(accuracy[i]),
+                   'escalation_rate': float(escalated[i] / n)}
+                  for i in curve_idx],
+    }
+
+
+def tune(args):
+    print("=" * 60)
+    print("Cascade threshold 튜닝")
+    print("=" * 60)
+
+    fast = load_multihead(args.fast)
+    full = [load_multihead(p) for p in args.full]
+
+    paths, labels = list_samples(args.data_dir)
+    _, val_idx = split_samples(labels)  # 모델 학습과 같은 검증 샘플
+    val_idx = val_idx.tolist()
+    val_images = [decode_image(paths[i]) for i in val_idx]  # fast / full 이 같은 디코딩 결과 사용
+    val_labels = labels[val_idx]
+    print(f"검증: {len(val_images)}개, full 모델: {len(full)}개")
+
+    fast_probs = predict_probs([fast], val_images)
+    full_probs = predict_probs(full, val_images)
+    fast_ms = measure_latency(fast)
+    full_ms = sum(measure_latency(m) for m in full)
+
+    result = tune_threshold(fast_probs, full_probs, val_labels, fast_ms, full_ms, args.target_acc)
+
+    print(f"\n  fast: {result['fast_accuracy']*100:.2f}% ({fast_ms:.2f} ms)")
+    print(f"  full: {result['full_accuracy']*100:.2f}% ({full_ms:.2f} ms)")
+    print(f"\n  {'threshold':>10s} {'정확도':>8s} {'escalation':>11s}")
+    for point in result['curve']:
+        print(f"  {point['threshold']:10.4f} {point['accuracy']*100:7.2f}% {point['escalation_rate']*100:10.1f}%")
+
+    status = '' if result['target_met'] else f" (목표 {args.target_acc*100:.1f}% 미달 → 최고 정확도 선택)"
+    print(f"\n선택: threshold {result['threshold']:.4f}{status}")
+    print(f"  정확도 {result['accuracy']*100:.2f}%, escalation {result['escalation_rate']*100:.1f}%, "
+          f"평균 지연 {result['avg_latency_ms']:.2f} ms ({full_ms / result['avg_latency_ms']:.2f}x vs full)")
+
+    config = {'fast': args.fast, 'full': args.full, 'target_acc': args.target_acc,
+              **{k: v for k, v in result.items() if k != 'curve'}}
+    with open(args.config, 'w') as f:
+        json.dump(config, f, indent=2)
+    print(f"\n설정 저장: {args.config}")
+    return 0
+
+
+def predict(args):
+    predictor = CascadePredictor.from_config(args.config)
+    digits, confidences, escalated = predictor.predict(args.images)
+    for path, row, conf, esc in zip(args.images, digits.tolist(), confidences, escalated.tolist()):
+        text = ''.join(map(str, row))
+        if args.json:
+            print(json.dumps({'path': path, 'text': text, 'confidences': [round(c, 4) for c in conf.tolist()],
+                              'escalated': esc}))
+        else:
+            print(text)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='신뢰도 기반 cascade 추론')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    tune_parser = sub.add_parser('tune', help='검증 split 에서 threshold 튜닝')
+    tune_parser.add_argument('--fast', required=True)
+    tune_parser.add_argument('--full', nargs='+', default=[FULL_PATH], help='여러 개면 앙상블')
+    tune_parser.add_argument('--data-dir', default=DATA_DIR)
+    tune_parser.add_argument('--target-acc', type=float, default=0.98)
+    tune_parser.add_argument('--config', default=CASCADE_CONFIG_PATH)
+
+    predict_parser = sub.add_parser('predict', help='cascade 예측')
+    predict_parser.add_argument('images', nargs='+')
+    predict_parser.add_argument('--config', default=CASCADE_CONFIG_PATH)
+    predict_parser.add_argument('--json', action='store_true')
+
+    args = parser.parse_args()
+    return tune(args) if args.command == 'tune' else predict(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
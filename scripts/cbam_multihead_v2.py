@@ -3,6 +3,8 @@ CBAM + Multi-Head CNN 캡챠 인식 모델 v2
 - Position-Aware Pooling: 위치 정보 보존
 - 6개 독립 분류 헤드 (각 자리별)
 - CrossEntropy Loss
+- backbone spec: 채널 폭, depthwise-separable conv, 블록별 CBAM on/off, reduction
+- 체크포인트에 config 를 함께 저장 → load_multihead 가 구조를 자동 복원
 """
 
 import torch
@@ -10,16 +12,66 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 
+# 기본 backbone (학습된 cbam_multihead_v2_final.pth 와 동일한 구조)
+DEFAULT_BACKBONE = {
+    'channels': [32, 64, 128, 256],
+    'dropout': [0.1, 0.15, 0.2, 0.25],
+    'separable': False,  # bool 또는 블록별 list
+    'cbam': True,        # bool 또는 블록별 list
+    'reduction': 16,
+}
+
+# sweep-backbones.py 에서 비교하는 변형
+BACKBONE_VARIANTS = {
+    'default': DEFAULT_BACKBONE,
+    'no_cbam': {'cbam': False},
+    'cbam_last2': {'cbam': [False, False, True, True]},
+    'separable': {'separable': [False, True, True, True]},
+    'separable_no_cbam': {'separable': [False, True, True, True], 'cbam': False},
+    'half': {'channels': [16, 32, 64, 128]},
+    'half_separable': {'channels': [16, 32, 64, 128], 'separable': [False, True, True, True],
+                       'cbam': [False, False, True, True], 'reduction': 8},
+    'narrow_3block': {'channels': [24, 48, 96], 'dropout': [0.1, 0.15, 0.2]},
+}
+
+
+def normalize_backbone(spec=None):
+    """부분 spec → 블록별 list 로 채운 전체 spec (DEFAULT_BACKBONE 기준)"""
+    spec = {**DEFAULT_BACKBONE, **(spec or {})}
+    channels = [int(c) for c in spec['channels']]
+    num_blocks = len(channels)
+
+    def per_block(value, name):
+        if isinstance(value, (list, tuple)):
+            if len(value) != num_blocks:
+                raise ValueError(f"backbone '{name}' 길이({len(value)})가 블록 수({num_blocks})와 다릅니다")
+            return list(value)
+        return [value] * num_blocks
+
+    dropout = spec['dropout']
+    if isinstance(dropout, (list, tuple)) and len(dropout) != num_blocks:
+        dropout = DEFAULT_BACKBONE['dropout'][-1]
+
+    return {
+        'channels': channels,
+        'dropout': [float(d) for d in per_block(dropout, 'dropout')],
+        'separable': [bool(v) for v in per_block(spec['separable'], 'separable')],
+        'cbam': [bool(v) for v in per_block(spec['cbam'], 'cbam')],
+        'reduction': int(spec['reduction']),
+    }
+
+
 class ChannelAttention(nn.Module):
     """Channel Attention Module"""
     def __init__(self, channels, reduction=16):
         super().__init__()
         self.avg_pool = nn.AdaptiveAvgPool2d(1)
         self.max_pool = nn.AdaptiveMaxPool2d(1)
+        hidden = max(1, channels // reduction)
         self.fc = nn.Sequential(
-            nn.Linear(channels, channels // reduction, bias=False),
+            nn.Linear(channels, hidden, bias=False),
             nn.ReLU(inplace=True),
-            nn.Linear(channels // reduction, channels, bias=False)
+            nn.Linear(hidden, channels, bias=False)
         )
         self.sigmoid = nn.Sigmoid()
 
@@ -59,15 +111,33 @@ class CBAM(nn.Module):
         return x
 
 
+class SeparableConv2d(nn.Module):
+    """Depthwise 3x3 + Pointwise 1x1 (nn.Conv2d(in, out, 3, padding=1) 대체)"""
+    def __init__(self, in_channels, out_channels):
+        super().__init__()
+        self.depthwise = nn.Conv2d(in_channels, in_channels, 3, padding=1, groups=in_channels, bias=False)
+        self.pointwise = nn.Conv2d(in_channels, out_channels, 1)
+
+    def forward(self, x):
+        return self.pointwise(self.depthwise(x))
+
+
+def conv3x3(in_channels, out_channels, separable=False):
+    # 입력이 1채널이면 depthwise 가 의미 없으므로 일반 conv
+    if separable and in_channels > 1:
+        return SeparableConv2d(in_channels, out_channels)
+    return nn.Conv2d(in_channels, out_channels, 3, padding=1)
+
+
 class ConvBlock(nn.Module):
     """Conv + BN + ReLU + CBAM + MaxPool + Dropout"""
-    def __init__(self, in_channels, out_channels, dropout=0.25):
+    def __init__(self, in_channels, out_channels, dropout=0.25, separable=False, use_cbam=True, reduction=16):
         super().__init__()
-        self.conv1 = nn.Conv2d(in_channels, out_channels, 3, padding=1)
+        self.conv1 = conv3x3(in_channels, out_channels, separable)
         self.bn1 = nn.BatchNorm2d(out_channels)
-        self.conv2 = nn.Conv2d(out_channels, out_channels, 3, padding=1)
+        self.conv2 = conv3x3(out_channels, out_channels, separable)
         self.bn2 = nn.BatchNorm2d(out_channels)
-        self.cbam = CBAM(out_channels)
+        self.cbam = CBAM(out_channels, reduction) if use_cbam else nn.Identity()
         self.pool = nn.MaxPool2d(2, 2)
         self.dropout = nn.Dropout2d(dropout)
 
@@ -99,7 +169,7 @@ class CBAM_MultiHead_V2(nn.Module):
     """
     CBAM + Multi-Head CNN for 6-digit CAPTCHA (Position-Aware)
 
-    Architecture:
+    Architecture (기본 backbone):
         Input (1, 50, 160)
             ↓
         ConvBlock1 (32) + CBAM → (32, 25, 80)
@@ -110,26 +180,41 @@ class CBAM_MultiHead_V2(nn.Module):
         Position-Aware Pooling → (256, 1, 6)  ★ 위치 정보 보존!
             ↓
         6 x DigitHead (각각 다른 위치의 feature 사용)
+
+    backbone: DEFAULT_BACKBONE 형식의 (부분) spec. 블록 이름은 conv1..convN 으로
+              기본 구조의 state_dict 키와 호환된다.
     """
-    def __init__(self, img_height=50, img_width=160, num_digits=6, num_classes=10):
+    def __init__(self, img_height=50, img_width=160, num_digits=6, num_classes=10, backbone=None):
         super().__init__()
 
+        self.img_height = img_height
+        self.img_width = img_width
         self.num_digits = num_digits
         self.num_classes = num_classes
+        self.backbone = normalize_backbone(backbone)
+        self.temperatures = None  # head 별 calibration temperature (calibrate_multihead.py)
+        self.preprocess_variant = None  # preprocess_v2.PREPROCESS_VARIANTS 이름 (None 이면 captcha_image 기본 전처리)
 
         # CNN Backbone with CBAM
-        self.conv1 = ConvBlock(1, 32, dropout=0.1)
-        self.conv2 = ConvBlock(32, 64, dropout=0.15)
-        self.conv3 = ConvBlock(64, 128, dropout=0.2)
-        self.conv4 = ConvBlock(128, 256, dropout=0.25)
+        spec = self.backbone
+        self.block_names = []
+        in_channels = 1
+        for i, out_channels in enumerate(spec['channels']):
+            name = f'conv{i + 1}'
+            setattr(self, name, ConvBlock(
+                in_channels, out_channels, dropout=spec['dropout'][i],
+                separable=spec['separable'][i], use_cbam=spec['cbam'][i], reduction=spec['reduction']
+            ))
+            self.block_names.append(name)
+            in_channels = out_channels
 
         # Position-Aware Pooling: height=1, width=6 (하나의 열이 하나의 digit)
         self.position_pool = nn.AdaptiveAvgPool2d((1, num_digits))
 
         # 6 Independent Classification Heads
-        # 각 Head는 256 features를 받음 (해당 위치의 pooled features)
+        # 각 Head는 마지막 블록 채널 수만큼 features를 받음 (해당 위치의 pooled features)
         self.heads = nn.ModuleList([
-            DigitHead(256, num_classes, hidden_dim=128)
+            DigitHead(in_channels, num_classes, hidden_dim=128)
             for _ in range(num_digits)
         ])
 
@@ -150,12 +235,16 @@ class CBAM_MultiHead_V2(nn.Module):
                 if m.bias is not None:
                     nn.init.constant_(m.bias, 0)
 
+    def config(self):
+        """모델 재생성용 설정 (체크포인트와 함께 저장)"""
+        return {'arch': 'cbam_multihead_v2', 'backbone': self.backbone,
+                'img_height': self.img_height, 'img_width': self.img_width,
+                'num_digits': self.num_digits, 'num_classes': self.num_classes}
+
     def forward(self, x):
-        # CNN Backbone
-        x = self.conv1(x)  # (batch, 32, 25, 80)
-        x = self.conv2(x)  # (batch, 64, 12, 40)
-        x = self.conv3(x)  # (batch, 128, 6, 20)
-        x = self.conv4(x)  # (batch, 256, 3, 10)
+        # CNN Backbone (기본: (batch, 32, 25, 80) → ... → (batch, 256, 3, 10))
+        for name in self.block_names:
+            x = getattr(self, name)(x)
 
         # Position-Aware Pooling (MPS 호환을 위해 CPU fallback)
         device = x.device
@@ -179,11 +268,13 @@ class CBAM_MultiHead_V2(nn.Module):
         return torch.stack(predictions, dim=1)  # (batch, 6)
 
     def predict_with_confidence(self, x):
-        """Get predictions with confidence scores"""
+        """Get predictions with confidence scores (temperatures 가 있으면 calibration 적용)"""
         outputs = self.forward(x)
         predictions = []
         confidences = []
-        for out in outputs:
+        for i, out in enumerate(outputs):
+            if self.temperatures is not None:
+                out = out / self.temperatures[i]
             probs = F.softmax(out, dim=1)
             conf, pred = torch.max(probs, dim=1)
             predictions.append(pred)
@@ -191,6 +282,127 @@ class CBAM_MultiHead_V2(nn.Module):
         return torch.stack(predictions, dim=1), torch.stack(confidences, dim=1)
 
 
+class SeparableBlock(nn.Module):
+    """Depthwise 3x3 + Pointwise 1x1 (+ BN + ReLU) + MaxPool"""
+    def __init__(self, in_channels, out_channels):
+        super().__init__()
+        self.depthwise = nn.Conv2d(in_channels, in_channels, 3, padding=1, groups=in_channels, bias=False)
+        self.bn1 = nn.BatchNorm2d(in_channels)
+        self.pointwise = nn.Conv2d(in_channels, out_channels, 1, bias=False)
+        self.bn2 = nn.BatchNorm2d(out_channels)
+        self.pool = nn.MaxPool2d(2, 2)
+
+    def forward(self, x):
+        x = F.relu(self.bn1(self.depthwise(x)))
+        x = F.relu(self.bn2(self.pointwise(x)))
+        return self.pool(x)
+
+
+class TinyMultiHead(nn.Module):
+    """
+    지식 증류용 경량 student 모델 (CBAM_MultiHead_V2 와 같은 입출력)
+
+    Architecture:
+        Input (1, 50, 160)
+            ↓
+        Stem Conv 3x3 stride 2 (c0) → (c0, 25, 80)
+        SeparableBlock (c1) → (c1, 12, 40)
+        SeparableBlock (c2) → (c2, 6, 20)
+        SeparableBlock (c3) → (c3, 3, 10)
+            ↓
+        Position-Aware Pooling → (c3, 1, 6)
+            ↓
+        6 x DigitHead
+    """
+    def __init__(self, channels=(16, 32, 48, 64), hidden_dim=64, img_height=50, img_width=160,
+                 num_digits=6, num_classes=10):
+        super().__init__()
+
+        self.img_height = img_height
+        self.img_width = img_width
+        self.channels = tuple(channels)
+        self.hidden_dim = hidden_dim
+        self.temperatures = None
+        self.preprocess_variant = None
+        self.num_digits = num_digits
+        self.num_classes = num_classes
+
+        c0 = self.channels[0]
+        self.stem = nn.Sequential(
+            nn.Conv2d(1, c0, 3, stride=2, padding=1, bias=False),
+            nn.BatchNorm2d(c0),
+            nn.ReLU(inplace=True)
+        )
+        self.blocks = nn.Sequential(*[
+            SeparableBlock(cin, cout)
+            for cin, cout in zip(self.channels[:-1], self.channels[1:])
+        ])
+        self.position_pool = nn.AdaptiveAvgPool2d((1, num_digits))
+        self.heads = nn.ModuleList([
+            DigitHead(self.channels[-1], num_classes, hidden_dim=hidden_dim)
+            for _ in range(num_digits)
+        ])
+
+        CBAM_MultiHead_V2._init_weights(self)
+
+    def config(self):
+        """student 재생성용 설정 (체크포인트와 함께 저장)"""
+        return {'arch': 'tiny', 'channels': list(self.channels), 'hidden_dim': self.hidden_dim,
+                'img_height': self.img_height, 'img_width': self.img_width,
+                'num_digits': self.num_digits, 'num_classes': self.num_classes}
+
+    def forward(self, x):
+        x = self.blocks(self.stem(x))
+        x = self.position_pool(x).squeeze(2)  # (batch, c3, 6)
+        return [head(x[:, :, i]) for i, head in enumerate(self.heads)]
+
+    predict = CBAM_MultiHead_V2.predict
+    predict_with_confidence = CBAM_MultiHead_V2.predict_with_confidence
+
+
+ARCHITECTURES = {
+    'cbam_multihead_v2': CBAM_MultiHead_V2,
+    'tiny': TinyMultiHead,
+}
+
+
+def build_multihead(config=None):
+    """config (model.config()) → 모델. config 가 없으면 기본 CBAM_MultiHead_V2"""
+    config = dict(config or {})
+    arch = config.pop('arch', 'cbam_multihead_v2')
+    if arch not in ARCHITECTURES:
+        raise ValueError(f"알 수 없는 모델 구조: {arch}")
+    return ARCHITECTURES[arch](**config)
+
+
+def save_multihead(model, path, **extra):
+    """state_dict + config (+ calibration temperature, 전처리 변형) 저장 (load_multihead 로 구조 자동 복원)"""
+    checkpoint = {'config': model.config(), 'model_state_dict': model.state_dict(), **extra}
+    if model.temperatures is not None:
+        checkpoint['temperatures'] = [float(t) for t in model.temperatures]
+    if model.preprocess_variant is not None:
+        checkpoint['preprocess_variant'] = model.preprocess_variant
+    torch.save(checkpoint, path)
+
+
+def load_multihead(path, map_location='cpu'):
+    """
+    체크포인트 → eval 모드 모델
+    - {'config', 'model_state_dict'} 형식: config 로 구조 복원
+    - state_dict 만 있는 이전 형식: 기본 CBAM_MultiHead_V2
+    """
+    checkpoint = torch.load(path, map_location=map_location, weights_only=True)
+    if 'model_state_dict' in checkpoint:
+        model = build_multihead(checkpoint.get('config'))
+        model.load_state_dict(checkpoint['model_state_dict'])
+        model.temperatures = checkpoint.get('temperatures')
+        model.preprocess_variant = checkpoint.get('preprocess_variant')
+    else:
+        model = build_multihead()
+        model.load_state_dict(checkpoint)
+    return model.eval()
+
+
 class MultiHeadLoss(nn.Module):
     """Combined loss for all 6 digit heads"""
     def __init__(self, label_smoothing=0.1):
@@ -0,0 +1,269 @@
+"""
+NumPy CTC 디코더 (TensorFlow 문자열 연산 불필요)
+
+- (N, T, C) 확률 배열을 배치 단위로 한 번에 디코딩
+- argmax / 중복 제거 / blank 제거를 모두 배열 연산으로 처리
+- blank 인덱스와 어휘 오프셋 설정 가능
+- 길이 고정(6자리) Prefix Beam Search: 배치 단위, top-k 후보와 점수 반환
+
+어휘 배치 (debug-ctc-training.py 참고):
+    StringLookup 레이아웃: 0=[UNK], 1-10='0'-'9', 11=extra, 12=blank
+        → vocab_offset=1, blank_index=-1 (마지막 클래스)
+    captcha_ctc_inference.keras (test-unet-ctc-pipeline.py): 0-9='0'-'9', 10=blank
+        → vocab_offset=0, blank_index=10
+"""
+
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+CHARACTERS = "0123456789"
+
+# StringLookup(vocabulary=list(CHARACTERS), mask_token=None) 기준
+STRINGLOOKUP_OFFSET = 1
+STRINGLOOKUP_BLANK = -1
+
+# SCOURT 캡챠는 항상 6자리
+CAPTCHA_LENGTH = 6
+LOG_EPSILON = 1e-12
+
+
+def ctc_greedy_decode(
+    probs: np.ndarray,
+    blank_index: int = STRINGLOOKUP_BLANK,
+    vocab_offset: int = STRINGLOOKUP_OFFSET,
+    characters: str = CHARACTERS,
+    max_length: Optional[int] = None
+) -> Tuple[List[str], List[np.ndarray]]:
+    """
+    Greedy CTC 디코딩 (배치)
+
+    Args:
+        probs: (N, T, C) softmax 출력
+        blank_index: CTC blank 클래스 인덱스 (음수면 뒤에서부터)
+        vocab_offset: characters[0] 에 해당하는 클래스 인덱스
+        characters: 어휘 문자열 (ASCII)
+        max_length: 지정 시 앞에서부터 max_length 글자만 사용
+
+    Returns:
+        texts: 디코딩된 문자열 N개
+        confidences: 글자별 신뢰도 배열 N개 (같은 글자가 이어진 구간의 최대 확률)
+    """
+    probs = np.asarray(probs)
+    n, t, c = probs.shape
+    blank = blank_index % c
+
+    indices = probs.argmax(axis=-1)  # (N, T)
+    step_conf = np.take_along_axis(probs, indices[..., np.newaxis], axis=-1)[..., 0]
+
+    # 같은 클래스가 이어진 구간(run)의 시작 위치. t=0 은 항상 새 구간이므로
+    # 평탄화해도 구간이 샘플 경계를 넘지 않는다.
+    new_run = np.ones((n, t), dtype=bool)
+    new_run[:, 1:] = indices[:, 1:] != indices[:, :-1]
+
+    char_idx = indices - vocab_offset
+    valid = (char_idx >= 0) & (char_idx < len(characters)) & (indices != blank)
+    keep = new_run & valid
+
+    if max_length is not None:
+        keep &= np.cumsum(keep, axis=1) <= max_length
+    lengths = keep.sum(axis=1)
+
+    # 글자별 신뢰도: 구간 내 최대 확률
+    run_starts = np.flatnonzero(new_run)
+    run_conf = np.maximum.reduceat(step_conf.ravel(), run_starts)
+    kept_conf = run_conf[keep.ravel()[run_starts]]
+    confidences = np.split(kept_conf, np.cumsum(lengths)[:-1])
+
+    # 남길 글자를 각 행의 앞쪽으로 모은 뒤 ASCII 코드 → 고정폭 바이트 문자열
+    order = np.argsort(~keep, axis=1, kind='stable')
+    compact = np.take_along_axis(char_idx, order, axis=1)
+    filled = np.arange(t) < lengths[:, np.newaxis]
+    lut = np.frombuffer(characters.encode('ascii'), dtype=np.uint8)
+    codes = np.where(filled, lut[np.clip(compact, 0, len(lut) - 1)], 0).astype(np.uint8)
+    codes = np.ascontiguousarray(codes)
+    texts = [s.decode('ascii') for s in codes.view(f'S{t}').ravel()]
+
+    return texts, confidences
+
+
+def _segment_logsumexp(keys, *values):
+    """같은 key 끼리 log-sum-exp 로 합침 (keys 기준 정렬 결과 반환)"""
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    merged = [np.logaddexp.reduceat(v[order], starts) for v in values]
+    return keys[starts], order[starts], merged
+
+
+def ctc_beam_search_fixed_length(
+    probs: np.ndarray,
+    length: int = CAPTCHA_LENGTH,
+    beam_width: int = 16,
+    top_k: int = 3,
+    blank_index: int = STRINGLOOKUP_BLANK,
+    vocab_offset: int = STRINGLOOKUP_OFFSET,
+    characters: str = CHARACTERS
+) -> Tuple[List[List[str]], np.ndarray]:
+    """
+    출력 길이가 정확히 length 인 CTC Prefix Beam Search (배치)
+
+    - length 를 넘는 prefix, 남은 timestep 으로 length 에 도달할 수 없는 prefix 는 제거
+    - 배치 전체의 beam 을 (샘플, prefix) 키로 평탄화해 한 번에 병합/정렬
+    - blank 와 어휘 밖 클래스([UNK], extra)는 글자를 내보내지 않음
+      (어휘 밖 클래스의 확률은 어떤 경로에도 더해지지 않음)
+
+    Args:
+        probs: (N, T, C) softmax 출력
+        length: 출력 글자 수
+        beam_width: 샘플당 유지할 prefix 수
+        top_k: 반환할 후보 수
+
+    Returns:
+        texts: 샘플별 후보 문자열 리스트 (점수 내림차순, 최대 top_k개)
+        scores: (N, top_k) 후보별 log 확률 (후보가 없으면 -inf)
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    n, t, c = probs.shape
+    vocab = len(characters)
+    blank = blank_index % c
+
+    log_probs = np.log(probs + LOG_EPSILON)
+    blank_lp = log_probs[:, :, blank]                                # (N, T)
+    char_lp = log_probs[:, :, vocab_offset:vocab_offset + vocab]     # (N, T, V)
+
+    # prefix 는 맨 앞에 1 을 붙인 vocab 진법 정수로 표현 (길이가 달라도 충돌 없음)
+    code_space = vocab ** (length + 1)
+    sample_ids = np.arange(n)
+
+    # beam 상태 (N, B): prefix 코드, 길이, 마지막 글자, log P(blank 로 끝남), log P(글자로 끝남)
+    code = np.ones((n, 1), dtype=np.int64)
+    plen = np.zeros((n, 1), dtype=np.int64)
+    last = np.full((n, 1), -1, dtype=np.int64)
+    lpb = np.zeros((n, 1))
+    lpnb = np.full((n, 1), -np.inf)
+
+    for step in range(t):
+        remaining = t - step - 1
+        beams = code.shape[1]
+        total = np.logaddexp(lpb, lpnb)
+        step_char = char_lp[:, step]                                   # (N, V)
+
+        # 1) prefix 유지: blank 를 내보내거나 마지막 글자를 반복
+        last_lp = np.take_along_axis(step_char, np.maximum(last, 0), axis=1)
+        same_pb = total + blank_lp[:, step, np.newaxis]
+        same_pnb = np.where(last >= 0, lpnb + last_lp, -np.inf)
+        same_ok = np.isfinite(total) & (plen + remaining >= length)
+
+        # 2) prefix 확장: 새 글자 추가 (마지막 글자와 같으면 blank 를 거쳐야 함)
+        chars = np.arange(vocab)
+        ext_code = code[:, :, np.newaxis] * vocab + chars              # (N, B, V)
+        ext_base = np.where(chars == last[:, :, np.newaxis],
+                            lpb[:, :, np.newaxis], total[:, :, np.newaxis])
+        ext_pnb = ext_base + step_char[:, np.newaxis, :]
+        ext_len = plen[:, :, np.newaxis] + 1
+        ext_ok = (np.isfinite(total)[:, :, np.newaxis]
+                  & (ext_len <= length) & (ext_len + remaining >= length))
+        ext_ok = np.broadcast_to(ext_ok, ext_code.shape)
+
+        owner = np.broadcast_to(sample_ids[:, np.newaxis], (n, beams))
+        keys = np.concatenate([
+            (owner * code_space + code)[same_ok],
+            (owner[:, :, np.newaxis] * code_space + ext_code)[ext_ok],
+        ])
+        cand_pb = np.concatenate([same_pb[same_ok], np.full(ext_ok.sum(), -np.inf)])
+        cand_pnb = np.concatenate([same_pnb[same_ok], ext_pnb[ext_ok]])
+        cand_len = np.concatenate([plen[same_ok],
+                                   np.broadcast_to(ext_len, ext_code.shape)[ext_ok]])
+        cand_last = np.concatenate([last[same_ok],
+                                    np.broadcast_to(chars, ext_code.shape)[ext_ok]])
+
+        keys, first, (m_pb, m_pnb) = _segment_logsumexp(keys, cand_pb, cand_pnb)
+        owners = keys // code_space
+        score = np.logaddexp(m_pb, m_pnb)
+
+        # 샘플별 상위 beam_width 개 선택
+        order = np.lexsort((-score, owners))
+        counts = np.bincount(owners, minlength=n)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        rank = np.arange(len(order)) - starts[owners[order]]
+        sel = order[rank < beam_width]
+        rows, cols = owners[sel], rank[rank < beam_width]
+
+        width = min(beam_width, max(int(counts.max()), 1))
+        code = np.ones((n, width), dtype=np.int64)
+        plen = np.zeros((n, width), dtype=np.int64)
+        last = np.full((n, width), -1, dtype=np.int64)
+        lpb = np.full((n, width), -np.inf)
+        lpnb = np.full((n, width), -np.inf)
+        code[rows, cols] = keys[sel] % code_space
+        plen[rows, cols] = cand_len[first[sel]]
+        last[rows, cols] = cand_last[first[sel]]
+        lpb[rows, cols] = m_pb[sel]
+        lpnb[rows, cols] = m_pnb[sel]
+
+    # 길이가 정확히 length 인 prefix 만 남기고 상위 top_k
+    final = np.where(plen == length, np.logaddexp(lpb, lpnb), -np.inf)
+    order = np.argsort(-final, axis=1, kind='stable')[:, :top_k]
+    scores = np.take_along_axis(final, order, axis=1)
+    codes = np.take_along_axis(code, order, axis=1)
+
+    # prefix 코드 → 글자 인덱스 → 문자열
+    powers = vocab ** np.arange(length - 1, -1, -1)
+    digits = (codes[..., np.newaxis] // powers) % vocab                # (N, k, L)
+    lut = np.frombuffer(characters.encode('ascii'), dtype=np.uint8)
+    strings = np.ascontiguousarray(lut[digits]).view(f'S{length}')[..., 0]
+
+    texts = []
+    for row_strings, row_scores in zip(strings, scores):
+        texts.append([s.decode('ascii') for s, sc in zip(row_strings, row_scores)
+                      if np.isfinite(sc)])
+
+    if scores.shape[1] < top_k:
+        pad = np.full((n, top_k - scores.shape[1]), -np.inf)
+        scores = np.concatenate([scores, pad], axis=1)
+
+    return texts, scores
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("NumPy CTC Greedy Decoder Test")
+    print("=" * 60)
+
+    # debug-ctc-training.py 의 "완벽한 예측" 시뮬레이션과 동일한 입력
+    perfect = np.zeros((2, 30, 13), dtype=np.float32)
+    for row, label in enumerate(["123456", "112233"]):
+        for pos, digit in enumerate(label):
+            start = pos * 5
+            perfect[row, start:start + 4, int(digit) + STRINGLOOKUP_OFFSET] = 1.0
+            perfect[row, start + 4, 12] = 1.0
+    perfect = perfect + 1e-8
+    perfect = perfect / perfect.sum(axis=-1, keepdims=True)
+
+    texts, confs = ctc_greedy_decode(perfect)
+    for text, conf in zip(texts, confs):
+        print(f"  '{text}' (len={len(text)}) conf={np.round(conf, 3).tolist()}")
+
+    # 랜덤 배치 처리 속도
+    import time
+    batch = np.random.rand(1000, 30, 13).astype(np.float32)
+    batch /= batch.sum(axis=-1, keepdims=True)
+    start = time.perf_counter()
+    texts, _ = ctc_greedy_decode(batch, max_length=6)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"\n1000개 배치 디코딩: {elapsed:.1f}ms")
+
+    # 길이 고정 beam search
+    print("\n--- 6자리 고정 Beam Search ---")
+    texts, scores = ctc_beam_search_fixed_length(perfect, top_k=2)
+    for cands, sc in zip(texts, scores):
+        print(f"  {cands} scores={np.round(sc, 3).tolist()}")
+
+    start = time.perf_counter()
+    ctc_beam_search_fixed_length(batch[:1])
+    single = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    ctc_beam_search_fixed_length(batch[:300])
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  단일 샘플: {single:.1f}ms, 300개 배치: {elapsed:.1f}ms")
@@ -0,0 +1,253 @@
+"""
+지식 증류: CBAM_MultiHead_V2 (또는 Keras Attention 모델) → 경량 TinyMultiHead
+
+- Teacher 의 6개 head 출력을 soft target 으로 사용 (temperature T, KL * T^2)
+- 라벨 있는 데이터(data/captcha-training)는 CE + KD, 라벨 없는 수집 캡챠는 KD 만
+- Teacher 예측은 학습 전에 한 번만 계산 (teacher 는 매 epoch 다시 돌리지 않음)
+- 여러 student 설정을 학습하고 정확도 vs CPU 단일 이미지 지연 표 출력
+
+사용법:
+    python scripts/distill_multihead.py
+    python scripts/distill_multihead.py --teacher ./data/captcha-model/captcha_attention_best.keras
+    python scripts/distill_multihead.py --students "8,16,32,48;16,32,48,64" --epochs 60
+    python scripts/distill_multihead.py --unlabeled-dir ./temp/captcha-samples
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+import torch.optim as optim
+from torch.utils.data import TensorDataset, DataLoader
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import TinyMultiHead, calculate_accuracy, load_multihead, save_multihead
+from captcha_image import preprocess_batch
+from train_multihead_v2 import (
+    DATA_DIR, MODEL_DIR, NUM_DIGITS, NUM_CLASSES, BATCH_SIZE, list_samples, split_samples
+)
+
+TEACHER_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_final.pth')
+UNLABELED_DIR = './temp/captcha-samples'
+STUDENTS = '8,16,32,48;16,32,48,64'
+
+
+# ============================================================
+# Teacher
+# ============================================================
+def load_teacher_logits(teacher_path, paths, images, device):
+    """
+    Teacher 의 head 별 logits (N, 6, 10). Keras 모델은 softmax 출력의 log 사용
+
+    images: student 입력 (N, 1, H, W). teacher 의 입력 해상도/전처리 변형이 다르면 teacher 기준으로 다시 전처리
+    """
+    if teacher_path.endswith('.keras'):
+        from PIL import Image
+        from tensorflow import keras
+
+        model = keras.models.load_model(teacher_path, compile=False)
+        height, width = model.input_shape[1:3]
+        # train-attention-real.py load_data 와 동일한 입력
+        inputs = np.stack([
+            np.array(Image.open(p).convert('L').resize((width, height))) / 255.0
+            for p in paths
+        ])[..., np.newaxis].astype(np.float32)
+        probs = np.stack(model.predict(inputs, batch_size=256, verbose=0), axis=1)
+        return torch.from_numpy(np.log(np.clip(probs, 1e-7, 1.0))).float()
+
+    model = load_multihead(teacher_path).to(device)
+    if tuple(images.shape[-2:]) != (model.img_height, model.img_width) or model.preprocess_variant is not None:
+        images = torch.from_numpy(preprocess_batch(paths, (model.img_width, model.img_height),
+                                                   variant=model.preprocess_variant))
+
+    logits = []
+    with torch.no_grad():
+        for batch in torch.split(images, 256):
+            logits.append(torch.stack(model(batch.to(device)), dim=1).cpu())
+    return torch.cat(logits)
+
+
+# ============================================================
+# 증류
+# ============================================================
+def distillation_loss(outputs, teacher_logits, labels, temperature, alpha):
+    """
+    Args:
+        outputs: List of 6 tensors, each (batch, 10)
+        teacher_logits: (batch, 6, 10)
+        labels: (batch, 6), 라벨 없으면 -1
+    """
+    student = torch.stack(outputs, dim=1)  # (batch, 6, 10)
+    kd = F.kl_div(
+        F.log_softmax(student / temperature, dim=-1),
+        F.log_softmax(teacher_logits / temperature, dim=-1),
+        reduction='batchmean', log_target=True
+    ) * temperature ** 2
+
+    labeled = labels[:, 0] >= 0
+    if not labeled.any():
+        return kd
+    ce = F.cross_entropy(student[labeled].flatten(0, 1), labels[labeled].flatten()) * NUM_DIGITS
+    return alpha * kd + (1 - alpha) * ce
+
+
+def evaluate(model, images, labels, device):
+    """6자리 전체 정확도, 자리별 정확도"""
+    model.eval()
+    outputs = []
+    with torch.no_grad():
+        for batch in torch.split(images, 512):
+            outputs.append(torch.stack(model(batch.to(device)), dim=1).cpu())
+    outputs = torch.cat(outputs)
+    return calculate_accuracy(list(outputs.unbind(1)), labels)
+
+
+def train_student(channels, images, labels, teacher_logits, train_idx, val_idx, device, args):
+    torch.manual_seed(args.seed)
+    model = TinyMultiHead(channels, num_digits=NUM_DIGITS, num_classes=NUM_CLASSES).to(device)
+
+    train_loader = DataLoader(
+        TensorDataset(images[train_idx], labels[train_idx], teacher_logits[train_idx]),
+        batch_size=BATCH_SIZE, shuffle=True,
+        generator=torch.Generator().manual_seed(args.seed)
+    )
+    optimizer = optim.AdamW(model.parameters(), lr=args.lr, weight_decay=1e-4)
+    scheduler = optim.lr_scheduler.OneCycleLR(
+        optimizer, max_lr=args.lr, epochs=args.epochs, steps_per_epoch=len(train_loader),
+        pct_start=0.1, anneal_strategy='cos'
+    )
+
+    best_acc, best_state = -1.0, None
+    for epoch in range(1, args.epochs + 1):
+        model.train()
+        total_loss = 0
+        for batch_images, batch_labels, batch_teacher in train_loader:
+            optimizer.zero_grad()
+            outputs = model(batch_images.to(device))
+            loss = distillation_loss(outputs, batch_teacher.to(device), batch_labels.to(device),
+                                     args.temperature, args.alpha)
+            loss.backward()
+            optimizer.step()
+            scheduler.step()
+            total_loss += loss.item()
+
+        val_acc, _ = evaluate(model, images[val_idx], labels[val_idx], device)
+        if val_acc >= best_acc:
+            best_acc = val_acc
+            best_state = {k: v.detach().cpu().clone() for k, v in model.state_dict().items()}
+        if epoch % 10 == 0 or epoch == args.epochs:
+            print(f"    Epoch {epoch:3d} | Loss: {total_loss / len(train_loader):.4f} | "
+                  f"Val Acc: {val_acc*100:5.1f}%")
+
+    model.load_state_dict(best_state)
+    return model.cpu().eval()
+
+
+def measure_latency(model, runs=200):
+    """CPU 단일 스레드, 단일 이미지 추론 시간 (ms, 중앙값)"""
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    model = model.cpu().eval()
+    x = torch.rand(1, 1, model.img_height, model.img_width)
+    times = []
+    with torch.inference_mode():
+        for _ in range(20):
+            model(x)
+        for _ in range(runs):
+            start = time.perf_counter()
+            model(x)
+            times.append(time.perf_counter() - start)
+    torch.set_num_threads(threads)
+    return float(np.median(times) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CBAM_MultiHead_V2 → TinyMultiHead 지식 증류')
+    parser.add_argument('--teacher', default=TEACHER_PATH, help='.pth 또는 .keras')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--unlabeled-dir', default=UNLABELED_DIR)
+    parser.add_argument('--students', default=STUDENTS, help='세미콜론으로 구분한 채널 설정')
+    parser.add_argument('--epochs', type=int, default=60)
+    parser.add_argument('--lr', type=float, default=3e-3)
+    parser.add_argument('--temperature', type=float, default=4.0)
+    parser.add_argument('--alpha', type=float, default=0.7, help='KD 비중 (라벨 있는 샘플)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("지식 증류: CBAM_MultiHead_V2 → TinyMultiHead")
+    print("=" * 60)
+
+    if not os.path.exists(args.teacher):
+        print(f"Teacher 모델이 없습니다: {args.teacher}")
+        return 1
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+    paths, labels = list_samples(args.data_dir, args.unlabeled_dir)
+    labeled = (labels[:, 0] >= 0).nonzero().squeeze(1)
+    unlabeled = (labels[:, 0] < 0).nonzero().squeeze(1)
+    print(f"라벨: {len(labeled)}개, 라벨 없음: {len(unlabeled)}개")
+
+    images = torch.from_numpy(preprocess_batch(paths))
+
+    print(f"\nTeacher 예측: {args.teacher}")
+    teacher_logits = load_teacher_logits(args.teacher, paths, images, device)
+
+    # 검증은 라벨 있는 데이터만 (train_multihead_v2 와 같은 split → teacher 가 학습하지 않은 샘플)
+    train_idx, val_idx = split_samples(labels)
+
+    teacher_acc, _ = calculate_accuracy(list(teacher_logits[val_idx].unbind(1)), labels[val_idx])
+    teacher = load_multihead(args.teacher) if args.teacher.endswith('.pth') else None
+    rows = [{
+        'model': 'teacher',
+        'channels': None,
+        'parameters': sum(p.numel() for p in teacher.parameters()) if teacher else None,
+        'accuracy': teacher_acc,
+        'latency_ms': measure_latency(teacher) if teacher else None,
+    }]
+
+    for spec in args.students.split(';'):
+        channels = tuple(int(c) for c in spec.split(','))
+        print(f"\nStudent {channels}")
+        student = train_student(channels, images, labels, teacher_logits,
+                                train_idx, val_idx, device, args)
+        acc, pos_accs = evaluate(student, images[val_idx], labels[val_idx], 'cpu')
+
+        name = 'student_' + '_'.join(map(str, channels))
+        save_path = os.path.join(MODEL_DIR, f'{name}.pth')
+        save_multihead(student, save_path)
+
+        rows.append({
+            'model': name,
+            'channels': list(channels),
+            'parameters': sum(p.numel() for p in student.parameters()),
+            'accuracy': acc,
+            'pos_accs': pos_accs,
+            'latency_ms': measure_latency(student),
+            'path': save_path,
+        })
+
+    print(f"\n{'모델':24s} {'파라미터':>10s} {'정확도':>8s} {'지연(ms)':>9s}")
+    print("-" * 56)
+    for row in rows:
+        params = f"{row['parameters']:,}" if row['parameters'] else '-'
+        latency = f"{row['latency_ms']:.3f}" if row['latency_ms'] is not None else '-'
+        print(f"{row['model']:24s} {params:>10s} {row['accuracy']*100:7.2f}% {latency:>9s}")
+
+    report_path = os.path.join(MODEL_DIR, f'distill_report_{datetime.now():%Y%m%d_%H%M%S}.json')
+    with open(report_path, 'w') as f:
+        json.dump({'teacher': args.teacher, 'labeled': len(labeled), 'unlabeled': len(unlabeled),
+                   'temperature': args.temperature, 'alpha': args.alpha, 'rows': rows}, f, indent=2)
+    print(f"\n리포트 저장: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
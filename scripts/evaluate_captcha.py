@@ -0,0 +1,420 @@
+"""
+캡챠 모델 통합 평가: 모든 모델 계열을 같은 데이터 / 같은 지표로 배치 평가
+
+모델 계열 (MODEL_FAMILIES, 경로로 자동 선택 또는 --family):
+    multihead  .pth    CBAM_MultiHead_V2 / TinyMultiHead (captcha_image 전처리)
+    numpy      .npz    NumpyCBAMMultiHead (torch 없이)
+    attention  .keras  6-head softmax (captcha_attention_best.keras)
+    ctc        .keras  CTC 출력 (captcha_ctc_inference.keras, greedy 디코딩)
+    unet_ctc   .keras  U-Net + CTC 통합 모델 (unet_ctc_fused.keras, 그래프 내 디코딩)
+    Keras 모델 입력은 학습 스크립트와 같은 grayscale 리사이즈 / 255
+
+지표 (예측을 (N, 자리) 숫자 배열, 빈 자리 -1 로 맞춘 뒤 배열 연산으로 계산):
+- 6자리 전체 정확도, 자리별 정확도, 예측 길이 분포
+- 자리별 10x10 confusion matrix (np.bincount 한 번), 상위 혼동 패턴
+- 처리량: 전체 images/s (모델 로드 포함 wall-clock), 이미지당 전처리 / 추론 시간
+- JSON 리포트: data/captcha-model/benchmarks/eval_{시각}.json
+
+--workers N: 샘플을 N 개 shard 로 나눠 프로세스별로 모델을 로드해 평가
+    (지표는 모두 count 의 합이라 shard 결과를 더하면 한 번에 평가한 것과 같음)
+
+사용법:
+    python scripts/evaluate_captcha.py
+    python scripts/evaluate_captcha.py --model ./data/captcha-model/student_8_16_32_48.pth \\
+        ./data/captcha-model/captcha_attention_best.keras ./data/captcha-model/unet_ctc_fused.keras
+    python scripts/evaluate_captcha.py --data-dir ./data/captcha-training-rgb --workers 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DATA_DIR = './data/captcha-training'
+MODEL_DIR = './data/captcha-model'
+MODEL_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_final.pth')
+REPORT_DIR = os.path.join(MODEL_DIR, 'benchmarks')
+
+NUM_DIGITS = 6
+NUM_CLASSES = 10
+MAX_PRED_LENGTH = 12   # 길이 분포용 (CTC 예측이 이보다 길면 잘라서 셈)
+BATCH_SIZE = 256
+MAX_WRONG = 20         # shard 마다 기록할 틀린 샘플 수
+
+
+# ============================================================
+# 데이터
+# ============================================================
+def list_labeled(data_dirs, limit=None):
+    """{라벨}[_접미사].png → (경로 리스트, (N, 6) 라벨 배열)"""
+    from captcha_image import labeled_files
+    files = [item for directory in data_dirs for item in labeled_files(directory)]
+    if limit:
+        files = files[:limit]
+    labels = texts_to_digits([label for _, label in files], NUM_DIGITS)
+    return [path for path, _ in files], labels
+
+
+def texts_to_digits(texts, width=MAX_PRED_LENGTH):
+    """문자열 리스트 → (N, width) 숫자 배열, 빈 자리 -1 (width 보다 긴 문자열은 잘림)"""
+    codes = np.array(texts, dtype=f'S{width}').view(np.uint8).reshape(len(texts), width)
+    return np.where(codes > 0, codes.astype(np.int64) - ord('0'), -1)
+
+
+def keras_inputs(paths, size):
+    """train-attention-real.py / test-ctc-model.py 와 같은 입력: (N, H, W, 1) grayscale / 255"""
+    from PIL import Image
+
+    return np.stack([
+        np.asarray(Image.open(p).convert('L').resize(size), dtype=np.float32) / 255.0
+        for p in paths
+    ])[..., np.newaxis]
+
+
+# ============================================================
+# 모델 계열: preprocess(paths) → 배치, predict(배치) → (N, 자리) 숫자 (빈 자리 -1)
+# ============================================================
+class MultiHeadFamily:
+    """CBAM_MultiHead_V2 / TinyMultiHead (.pth)"""
+
+    def __init__(self, path, threads=None):
+        import torch
+        from cbam_multihead_v2 import load_multihead
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.model = load_multihead(path)
+        self.size = (self.model.img_width, self.model.img_height)
+
+    def preprocess(self, paths):
+        from captcha_image import preprocess_batch
+        return preprocess_batch(paths, self.size)
+
+    def predict(self, batch):
+        with self.torch.inference_mode():
+            logits = self.torch.stack(self.model(self.torch.from_numpy(batch)), dim=1)
+        return logits.argmax(-1).numpy()
+
+
+class NumpyFamily(MultiHeadFamily):
+    """NumpyCBAMMultiHead (.npz, numpy_inference.py export)"""
+
+    def __init__(self, path, threads=None):
+        from numpy_inference import NumpyCBAMMultiHead
+
+        self.model = NumpyCBAMMultiHead(path)
+        self.size = (self.model.img_width, self.model.img_height)
+
+    def predict(self, batch):
+        return self.model.predict(batch)
+
+
+class KerasFamily:
+    """Keras .keras 모델 공통 (로드, 입력 크기, 전처리)"""
+
+    def __init__(self, path, threads=None):
+        import tensorflow as tf
+        from tensorflow import keras
+
+        if threads:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(threads)
+            except RuntimeError:
+                pass  # 이미 초기화된 런타임
+        keras.config.enable_unsafe_deserialization()
+        # captcha_attention_best.keras 의 Lambda 가 tf 를 참조 (load-attention-direct.py)
+        self.model = keras.models.load_model(path, compile=False, custom_objects={'tf': tf})
+        height, width = self.model.input_shape[1:3]
+        self.size = (width, height)
+
+    def preprocess(self, paths):
+        return keras_inputs(paths, self.size)
+
+
+class AttentionFamily(KerasFamily):
+    """6개 digit softmax 출력"""
+
+    def __init__(self, path, threads=None):
+        try:
+            super().__init__(path, threads)
+        except (NotImplementedError, TypeError, ValueError):
+            # Lambda 를 역직렬화하지 못하면 load-attention-model.py 처럼 구조 재생성 + 가중치 매핑
+            import importlib.util
+
+            spec = importlib.util.spec_from_file_location(
+                'load_attention_model', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                     'load-attention-model.py'))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.MODEL_PATH = path
+            self.model = module.load_attention_model()
+            self.size = (module.IMG_WIDTH, module.IMG_HEIGHT)
+
+    def predict(self, batch):
+        return np.stack(self.model.predict_on_batch(batch), axis=1).argmax(-1)
+
+
+class CTCFamily(KerasFamily):
+    """(N, T, C) CTC 확률 → greedy 디코딩. C=11 이면 0-9 + blank, 그 외 StringLookup 레이아웃"""
+
+    def predict(self, batch):
+        from ctc_decoder import ctc_greedy_decode
+
+        probs = np.asarray(self.model.predict_on_batch(batch))
+        vocab_offset = 0 if probs.shape[-1] == NUM_CLASSES + 1 else 1
+        texts, _ = ctc_greedy_decode(probs, blank_index=-1, vocab_offset=vocab_offset,
+                                     max_length=MAX_PRED_LENGTH)
+        return texts_to_digits(texts)
+
+
+class UNetCTCFamily(KerasFamily):
+    """unet_ctc_fused.py 통합 모델 ('digits' 출력, 그래프가 6자리로 자르므로 길이는 최대 6)"""
+
+    def __init__(self, path, threads=None):
+        import unet_ctc_fused  # noqa: F401 - CTCGreedyDecode 직렬화 등록
+        super().__init__(path, threads)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch)['digits'])
+
+
+MODEL_FAMILIES = {
+    'multihead': MultiHeadFamily,
+    'numpy': NumpyFamily,
+    'attention': AttentionFamily,
+    'ctc': CTCFamily,
+    'unet_ctc': UNetCTCFamily,
+}
+
+
+def detect_family(path):
+    name = os.path.basename(path).lower()
+    if name.endswith('.pth'):
+        return 'multihead'
+    if name.endswith('.npz'):
+        return 'numpy'
+    if 'unet' in name or 'fused' in name:
+        return 'unet_ctc'
+    if 'ctc' in name:
+        return 'ctc'
+    return 'attention'
+
+
+# ============================================================
+# 지표 (count 만 → shard / 배치끼리 더할 수 있음)
+# ============================================================
+def count_metrics(pred, labels):
+    """
+    Args:
+        pred: (N, W) 예측 숫자, 앞에서부터 채우고 빈 자리 -1
+        labels: (N, 6) 정답 숫자
+
+    Returns:
+        (counts, (N,) 6자리 정답 여부)
+    """
+    pred = np.asarray(pred, dtype=np.int64)
+    if pred.shape[1] < NUM_DIGITS:
+        pred = np.pad(pred, ((0, 0), (0, NUM_DIGITS - pred.shape[1])), constant_values=-1)
+    lengths = (pred >= 0).sum(axis=1)
+    head = pred[:, :NUM_DIGITS]
+    match = head == labels
+    exact = match.all(axis=1) & (lengths == NUM_DIGITS)
+
+    # (자리, 정답, 예측) → 평탄화 인덱스 하나로 bincount
+    valid = head >= 0
+    position = np.broadcast_to(np.arange(NUM_DIGITS), head.shape)
+    index = (position * NUM_CLASSES + labels) * NUM_CLASSES + head
+    confusion = np.bincount(index[valid], minlength=NUM_DIGITS * NUM_CLASSES * NUM_CLASSES)
+
+    counts = {
+        'samples': len(labels),
+        'correct': int(exact.sum()),
+        'position_correct': match.sum(axis=0),
+        'missing': (~valid).sum(axis=0),
+        'lengths': np.bincount(np.minimum(lengths, MAX_PRED_LENGTH), minlength=MAX_PRED_LENGTH + 1),
+        'confusion': confusion.reshape(NUM_DIGITS, NUM_CLASSES, NUM_CLASSES),
+    }
+    return counts, exact
+
+
+def merge_counts(a, b):
+    if a is None:
+        return b
+    return {key: a[key] + b[key] for key in a}
+
+
+def summarize(counts, top=15):
+    """count → 리포트 (비율, 길이 분포, 상위 혼동 패턴)"""
+    n = max(counts['samples'], 1)
+    confusion = counts['confusion']
+    errors = confusion.sum(axis=0) * (1 - np.eye(NUM_CLASSES, dtype=np.int64))  # 자리 합, 대각선 제외
+    order = np.argsort(errors, axis=None)[::-1][:top]
+    return {
+        'samples': counts['samples'],
+        'accuracy': counts['correct'] / n,
+        'position_accuracy': (counts['position_correct'] / n).tolist(),
+        'position_missing': counts['missing'].tolist(),
+        'length_distribution': {int(k): int(v) for k, v in enumerate(counts['lengths']) if v},
+        'top_confusions': [
+            {'true': int(t), 'pred': int(p), 'count': int(errors[t, p])}
+            for t, p in zip(*np.unravel_index(order, errors.shape)) if errors[t, p]
+        ],
+        'confusion': confusion.tolist(),
+    }
+
+
+# ============================================================
+# 평가
+# ============================================================
+def evaluate_shard(family, model_path, paths, labels, batch_size=BATCH_SIZE, threads=None):
+    """
+    한 프로세스에서 paths 전체 평가
+
+    Returns:
+        (counts, 틀린 샘플 예시, {'load', 'preprocess', 'predict'} 초)
+    """
+    start = time.perf_counter()
+    runner = MODEL_FAMILIES[family](model_path, threads=threads)
+    runner.predict(runner.preprocess(paths[:min(8, len(paths))]))  # warmup (graph trace 등)
+    seconds = {'load': time.perf_counter() - start, 'preprocess': 0.0, 'predict': 0.0}
+
+    counts, wrong = None, []
+    for offset in range(0, len(paths), batch_size):
+        start = time.perf_counter()
+        batch = runner.preprocess(paths[offset:offset + batch_size])
+        middle = time.perf_counter()
+        pred = runner.predict(batch)
+        seconds['preprocess'] += middle - start
+        seconds['predict'] += time.perf_counter() - middle
+
+        batch_counts, exact = count_metrics(pred, labels[offset:offset + batch_size])
+        counts = merge_counts(counts, batch_counts)
+        for i in np.flatnonzero(~exact)[:MAX_WRONG - len(wrong)]:
+            wrong.append({
+                'path': paths[offset + i],
+                'label': ''.join(map(str, labels[offset + i])),
+                'pred': ''.join(str(d) for d in pred[i] if d >= 0),
+            })
+    return counts, wrong, seconds
+
+
+def evaluate(family, model_path, paths, labels, workers=1, batch_size=BATCH_SIZE):
+    """workers > 1 이면 연속 구간 shard 를 spawn 프로세스로 (torch / TF 는 fork 안전하지 않음)"""
+    started = time.perf_counter()
+    if workers <= 1 or len(paths) < workers * batch_size:
+        results = [evaluate_shard(family, model_path, paths, labels, batch_size)]
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        bounds = np.linspace(0, len(paths), workers + 1).astype(int)
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(evaluate_shard, family, model_path, paths[lo:hi], labels[lo:hi],
+                                   batch_size, threads)
+                       for lo, hi in zip(bounds[:-1], bounds[1:])]
+            results = [f.result() for f in futures]
+    wall = time.perf_counter() - started
+
+    counts, wrong = None, []
+    seconds = {'load': 0.0, 'preprocess': 0.0, 'predict': 0.0}
+    for shard_counts, shard_wrong, shard_seconds in results:
+        counts = merge_counts(counts, shard_counts)
+        wrong += shard_wrong
+        for key in seconds:
+            seconds[key] += shard_seconds[key]
+
+    report = summarize(counts)
+    n = max(len(paths), 1)
+    report.update({
+        'model': model_path,
+        'family': family,
+        'workers': len(results),
+        'throughput': {
+            'wall_seconds': wall,
+            'images_per_sec': len(paths) / wall,
+            'load_seconds': seconds['load'] / len(results),
+            'preprocess_ms_per_image': seconds['preprocess'] / n * 1000,
+            'predict_ms_per_image': seconds['predict'] / n * 1000,
+        },
+        'wrong_examples': wrong[:MAX_WRONG],
+    })
+    return report
+
+
+def print_report(report):
+    n = report['samples']
+    print(f"\n[{report['family']}] {report['model']}")
+    print(f"  전체 정확도: {round(report['accuracy'] * n)}/{n} ({report['accuracy']*100:.2f}%)")
+    print(f"  자리별 정확도:")
+    for i, acc in enumerate(report['position_accuracy']):
+        bar = '#' * int(acc * 20) + '-' * (20 - int(acc * 20))
+        missing = report['position_missing'][i]
+        print(f"    Position {i+1}: [{bar}] {acc*100:.1f}%" + (f" (빈 자리 {missing})" if missing else ''))
+    print("  예측 길이: " + ', '.join(f'{k}자리 {v}개' for k, v in report['length_distribution'].items()))
+    if report['top_confusions']:
+        print("  주요 혼동: " + ', '.join(f"{c['true']}→{c['pred']} {c['count']}회"
+                                        for c in report['top_confusions'][:8]))
+    for example in report['wrong_examples'][:5]:
+        print(f"    {example['label']} → {example['pred'] or '(없음)'}  {os.path.basename(example['path'])}")
+    t = report['throughput']
+    print(f"  처리량: {t['images_per_sec']:.0f} images/s (wall {t['wall_seconds']:.1f}s, "
+          f"workers {report['workers']}) | 전처리 {t['preprocess_ms_per_image']:.2f}ms, "
+          f"추론 {t['predict_ms_per_image']:.2f}ms /이미지 | 로드 {t['load_seconds']:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='캡챠 모델 통합 배치 평가')
+    parser.add_argument('--model', nargs='+', default=[MODEL_PATH], help='.pth / .npz / .keras (여러 개면 비교)')
+    parser.add_argument('--family', default=None, choices=sorted(MODEL_FAMILIES), help='기본: 경로로 판단')
+    parser.add_argument('--data-dir', nargs='+', default=[DATA_DIR], help='{라벨}_*.png 폴더')
+    parser.add_argument('--limit', type=int, default=None, help='앞에서부터 이 개수만 평가')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help='shard 프로세스 수')
+    parser.add_argument('--output', default=None, help='JSON 리포트 경로')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("캡챠 모델 통합 평가")
+    print("=" * 60)
+
+    paths, labels = list_labeled(args.data_dir, args.limit)
+    if not paths:
+        print(f"라벨된 이미지가 없습니다: {args.data_dir}")
+        return 1
+    print(f"샘플: {len(paths)}개, batch {args.batch_size}, workers {args.workers}")
+
+    reports = []
+    for model_path in args.model:
+        if not os.path.exists(model_path):
+            print(f"\n모델이 없습니다: {model_path}")
+            continue
+        family = args.family or detect_family(model_path)
+        reports.append(evaluate(family, model_path, paths, labels, args.workers, args.batch_size))
+        print_report(reports[-1])
+    if not reports:
+        return 1
+
+    if len(reports) > 1:
+        print(f"\n{'모델':30s} {'정확도':>8s} {'images/s':>10s} {'추론 ms':>8s}")
+        print("-" * 60)
+        for r in reports:
+            print(f"{os.path.basename(r['model'])[:30]:30s} {r['accuracy']*100:7.2f}% "
+                  f"{r['throughput']['images_per_sec']:10.0f} {r['throughput']['predict_ms_per_image']:8.2f}")
+
+    report_path = args.output or os.path.join(REPORT_DIR, f'eval_{datetime.now():%Y%m%d_%H%M%S}.json')
+    os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump({'data_dirs': args.data_dir, 'samples': len(paths), 'reports': reports}, f, indent=2)
+    print(f"\n리포트 저장: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
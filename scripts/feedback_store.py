@@ -0,0 +1,260 @@
+"""
+운영 피드백 저장소: SCOURT 가 받아들인/거절한 캡챠 답
+
+api-client.ts 가 검색 결과로 캡챠 답의 정답 여부를 알게 되면
+(이미지, 예측 텍스트, 자리별 신뢰도, 통과 여부, 모델 버전, 인식기)를 기록한다.
+- 통과(accepted): 예측 텍스트 = 정답 라벨 → 실제 브라우저 캡챠 학습 데이터
+- 거절(rejected): 예측 텍스트가 틀렸다는 것만 앎 → 평가/hard example 후보
+  (재시도 한 번 = SCOURT 왕복 한 번이므로 줄여야 할 대상이 바로 이 샘플들)
+
+저장 형식 (root 아래):
+- shards/feedback-000001.jsonl.gz: 레코드 = JSON 한 줄 (이미지는 PNG base64)
+    flush_every 개씩 모아 gzip member 로 append (여러 member 가 이어진 gzip 도 그대로 읽힘),
+    shard_max_bytes 를 넘으면 다음 shard
+- index.tsv: 이미지 해시(blake2b), 예측, 통과 여부 - 중복 제거용 (같은 이미지/예측/결과는 한 번만)
+- spool.jsonl: 추론 서버 없이 api-client.ts 가 직접 남긴 레코드 (--ingest-spool 로 shard 에 합침)
+
+사용법:
+    python scripts/feedback_store.py                      # 통계
+    python scripts/feedback_store.py --ingest-spool
+    python scripts/feedback_store.py --export ./data/captcha-training-rgb   # 통과한 캡챠 → {라벨}_{해시}.png
+"""
+
+import os
+import sys
+import gzip
+import glob
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+
+FEEDBACK_DIR = './data/captcha-feedback'
+SHARD_MAX_BYTES = 32 * 1024 * 1024
+FLUSH_EVERY = 64
+
+
+def content_hash(data):
+    """이미지 바이트 → 32자리 hex (blake2b 128-bit, 추론 서버 캐시 키와 같은 해시)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class FeedbackStore:
+    """content-addressed, gzip shard append 저장소 (스레드 안전)"""
+
+    def __init__(self, root=FEEDBACK_DIR, shard_max_bytes=SHARD_MAX_BYTES, flush_every=FLUSH_EVERY):
+        self.root = root
+        self.shard_dir = os.path.join(root, 'shards')
+        self.index_path = os.path.join(root, 'index.tsv')
+        self.spool_path = os.path.join(root, 'spool.jsonl')
+        self.shard_max_bytes = shard_max_bytes
+        self.flush_every = flush_every
+        self.pending = []
+        self.lock = threading.Lock()
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+        self.seen = set()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                self.seen.update(line.rstrip('\n') for line in f if line.strip())
+
+    @staticmethod
+    def _dedupe_key(key, predicted, accepted):
+        return f'{key}\t{predicted}\t{int(accepted)}'
+
+    def add(self, image, predicted, accepted, confidences=None, model_version=None, solver='model'):
+        """
+        레코드 추가 (flush_every 개마다 shard 에 기록)
+
+        Returns:
+            False 면 이미 있는 (이미지, 예측, 통과 여부) 라 버림
+        """
+        if not isinstance(image, (bytes, bytearray)) or not image:
+            raise ValueError("이미지 바이트가 없습니다")
+        key = content_hash(image)
+        predicted = str(predicted or '')
+        dedupe_key = self._dedupe_key(key, predicted, accepted)
+
+        with self.lock:
+            if dedupe_key in self.seen:
+                return False
+            self.seen.add(dedupe_key)
+            self.pending.append({
+                'key': key,
+                'predicted': predicted,
+                'accepted': bool(accepted),
+                'confidences': [round(float(c), 4) for c in confidences] if confidences else None,
+                'model_version': model_version,
+                'solver': solver,
+                'ts': round(time.time(), 3),
+                'image': base64.b64encode(image).decode('ascii'),
+            })
+            if len(self.pending) >= self.flush_every:
+                self._flush()
+        return True
+
+    def _current_shard(self):
+        shards = self.shards()
+        if shards and os.path.getsize(shards[-1]) < self.shard_max_bytes:
+            return shards[-1]
+        number = int(os.path.basename(shards[-1])[9:15]) + 1 if shards else 1
+        return os.path.join(self.shard_dir, f'feedback-{number:06d}.jsonl.gz')
+
+    def _flush(self):
+        if not self.pending:
+            return
+        # shard 먼저, index 나중 (중간에 죽어도 index 에만 있는 레코드는 생기지 않음)
+        with gzip.open(self._current_shard(), 'ab') as f:
+            f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in self.pending).encode())
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(self._dedupe_key(r['key'], r['predicted'], r['accepted']) + '\n'
+                            for r in self.pending))
+        self.pending = []
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.seen)
+
+    def shards(self):
+        return sorted(glob.glob(os.path.join(self.shard_dir, 'feedback-*.jsonl.gz')))
+
+    # ------------------------------------------------------------
+    # 읽기
+    # ------------------------------------------------------------
+    def iter_records(self, accepted=None, solver=None, model_version=None):
+        """
+        기록된 레코드 (shard 순서 = 기록 순서). 'image' 는 PNG 바이트로 디코딩해서 반환
+
+        Args:
+            accepted / solver / model_version: None 이 아니면 그 값만
+        """
+        self.flush()
+        for shard in self.shards():
+            try:
+                with gzip.open(shard, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        record = json.loads(line)
+                        if accepted is not None and record['accepted'] != accepted:
+                            continue
+                        if solver is not None and record['solver'] != solver:
+                            continue
+                        if model_version is not None and record['model_version'] != model_version:
+                            continue
+                        record['image'] = base64.b64decode(record['image'])
+                        yield record
+            except (EOFError, gzip.BadGzipFile):
+                # 기록 중 종료되어 잘린 마지막 member: 앞부분만 사용
+                continue
+
+    def iter_labeled(self):
+        """학습용: 통과한 캡챠 (PNG 바이트, 6자리 라벨). 같은 이미지는 한 번만"""
+        keys = set()
+        for record in self.iter_records(accepted=True):
+            label = record['predicted']
+            if len(label) == 6 and label.isdigit() and record['key'] not in keys:
+                keys.add(record['key'])
+                yield record['image'], label
+
+    def iter_rejected(self):
+        """평가/분석용: 거절된 캡챠 (PNG 바이트, 틀린 예측, 레코드)"""
+        for record in self.iter_records(accepted=False):
+            yield record['image'], record['predicted'], record
+
+    def export(self, out_dir):
+        """통과한 캡챠를 {라벨}_{해시 앞 12자}.png 로 저장 (list_samples / --rgb-dirs 형식)"""
+        os.makedirs(out_dir, exist_ok=True)
+        count = 0
+        for image, label in self.iter_labeled():
+            path = os.path.join(out_dir, f'{label}_{content_hash(image)[:12]}.png')
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(image)
+                count += 1
+        return count
+
+    def ingest_spool(self, path=None):
+        """spool.jsonl (api-client.ts 가 직접 기록) → shard. 읽는 동안 새로 쓰이는 줄은 다음 번에"""
+        path = path or self.spool_path
+        if not os.path.exists(path):
+            return 0, 0
+        working = f'{path}.{os.getpid()}.ingest'
+        os.replace(path, working)
+        added = skipped = 0
+        with open(working, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    r = json.loads(line)
+                    ok = self.add(base64.b64decode(r['image']), r.get('text'), r['accepted'],
+                                  r.get('confidences'), r.get('model_version'), r.get('solver', 'model'))
+                except (ValueError, KeyError):
+                    ok = False
+                added += ok
+                skipped += not ok
+        self.flush()
+        os.remove(working)
+        return added, skipped
+
+    def stats(self):
+        """통과율: 전체 / 인식기별 / 모델 버전별"""
+        def bucket():
+            return {'total': 0, 'accepted': 0}
+
+        total, by_solver, by_version = bucket(), {}, {}
+        for record in self.iter_records():
+            for b in (total, by_solver.setdefault(record['solver'], bucket()),
+                      by_version.setdefault(record['model_version'] or 'unknown', bucket())):
+                b['total'] += 1
+                b['accepted'] += record['accepted']
+        for b in [total, *by_solver.values(), *by_version.values()]:
+            b['acceptance_rate'] = b['accepted'] / b['total'] if b['total'] else 0.0
+        return {'records': total, 'by_solver': by_solver, 'by_model_version': by_version,
+                'shards': len(self.shards())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='캡챠 운영 피드백 저장소')
+    parser.add_argument('--root', default=FEEDBACK_DIR)
+    parser.add_argument('--ingest-spool', action='store_true', help='spool.jsonl → shard')
+    parser.add_argument('--export', default=None, help='통과한 캡챠를 학습용 PNG 로 저장할 폴더')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("캡챠 피드백 저장소")
+    print("=" * 60)
+
+    store = FeedbackStore(args.root)
+    if args.ingest_spool:
+        added, skipped = store.ingest_spool()
+        print(f"spool: {added}개 추가, {skipped}개 중복/오류")
+
+    if args.export:
+        print(f"export: {store.export(args.export)}개 → {args.export}")
+
+    stats = store.stats()
+    records = stats['records']
+    print(f"레코드: {records['total']}개 (통과 {records['accepted']}, "
+          f"통과율 {records['acceptance_rate']*100:.1f}%), shard {stats['shards']}개")
+    for title, key in (('인식기', 'by_solver'), ('모델 버전', 'by_model_version')):
+        for name, b in sorted(stats[key].items()):
+            print(f"  {title} {name:14s} {b['total']:6d}개  통과율 {b['acceptance_rate']*100:5.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
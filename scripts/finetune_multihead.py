@@ -0,0 +1,242 @@
+"""
+증분 Fine-tune: 현재 .pth + 새 라벨 캡챠 + 기존 데이터 replay buffer
+
+새 라벨 캡챠가 생길 때마다 처음부터 100 epoch 재학습하지 않고 현재 모델에서 이어서 짧게 학습한다.
+(finetune-attention-real.py 의 Keras 방식을 CBAM_MultiHead_V2 / TinyMultiHead 로)
+
+- 새 샘플: --new-dirs ({라벨}_*.png 폴더) + --feedback-dir (feedback_store.py 의 통과한 캡챠)
+- replay buffer: 기존 데이터(--replay-dirs)를 한 번 훑으며 reservoir sampling
+    전체를 전처리하지 않고 고정 크기만 메모리에 (새 샘플과 같은 이미지는 제외)
+- 학습: 새 샘플(train 부분) + replay buffer, 배치의 새 샘플 비율이 --new-ratio 가 되도록 가중 샘플링
+- LR: 짧은 cosine (warmup 없음, 이미 학습된 가중치이므로 낮은 --lr)
+- held-out: 새 샘플의 --holdout-ratio + replay 와 겹치지 않는 기존 데이터 reservoir
+    두 정확도의 평균이 --patience epoch 동안 좋아지지 않으면 중단, best 가중치 저장
+    fine-tune 전/후 새/기존 held-out 정확도를 함께 출력 (기존 데이터 forgetting 확인)
+- calibration temperature 는 가중치가 바뀌면 맞지 않으므로 제거 → calibrate_multihead.py 다시 실행
+
+사용법:
+    python scripts/finetune_multihead.py --new-dirs ./data/captcha-training-rgb
+    python scripts/finetune_multihead.py --feedback-dir ./data/captcha-feedback --epochs 8
+    python scripts/finetune_multihead.py --model ./data/captcha-model/student_8_16_32_48.pth --new-dirs ./new
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+from datetime import datetime
+
+import numpy as np
+import torch
+import torch.optim as optim
+from torch.utils.data import DataLoader, TensorDataset, WeightedRandomSampler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import load_multihead, save_multihead
+from captcha_image import preprocess_batch, labeled_files
+from feedback_store import FeedbackStore
+from train_multihead_v2 import BATCH_SIZE, DATA_DIR, MODEL_DIR, Trainer
+
+MODEL_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_final.pth')
+OUTPUT_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_finetuned.pth')
+
+
+# ============================================================
+# 데이터
+# ============================================================
+def reservoir_sample(stream, k, seed=42):
+    """길이를 모르는 stream 에서 균등하게 k 개 (Algorithm R, 메모리 O(k))"""
+    rng = np.random.default_rng(seed)
+    reservoir = []
+    for n, item in enumerate(stream):
+        if n < k:
+            reservoir.append(item)
+        else:
+            j = rng.integers(0, n + 1)
+            if j < k:
+                reservoir[j] = item
+    return reservoir
+
+
+def load_new_samples(new_dirs, feedback_dir):
+    """새 샘플 [(PNG 바이트 또는 경로, 라벨)], 같은 이미지는 한 번만"""
+    samples, seen = [], set()
+
+    def add(source, image_bytes, label):
+        key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        if key not in seen:
+            seen.add(key)
+            samples.append((source, label))
+
+    for directory in new_dirs:
+        for img_path, label in labeled_files(directory):
+            with open(img_path, 'rb') as f:
+                add(img_path, f.read(), label)
+    if feedback_dir:
+        for image, label in FeedbackStore(feedback_dir).iter_labeled():
+            add(image, image, label)
+    return samples, seen
+
+
+def iter_old_samples(replay_dirs, exclude):
+    """기존 데이터 stream (새 샘플과 같은 이미지 제외)"""
+    for directory in replay_dirs:
+        for img_path, label in labeled_files(directory):
+            with open(img_path, 'rb') as f:
+                if hashlib.blake2b(f.read(), digest_size=16).digest() not in exclude:
+                    yield img_path, label
+
+
+def to_tensors(samples, img_size):
+    if not samples:
+        return None
+    images = torch.from_numpy(preprocess_batch([s for s, _ in samples], img_size))
+    labels = torch.tensor([[int(c) for c in label] for _, label in samples], dtype=torch.long)
+    return images, labels
+
+
+# ============================================================
+# Fine-tune
+# ============================================================
+def holdout_accuracy(trainer, sets):
+    """{'new': acc, 'old': acc} 와 early stopping 기준 (있는 쪽들의 평균)"""
+    accs = {}
+    for name, data in sets.items():
+        if data is not None:
+            _, accs[name], _ = trainer.validate(DataLoader(TensorDataset(*data), batch_size=BATCH_SIZE * 4))
+    return accs, float(np.mean(list(accs.values())))
+
+
+def finetune(model, new_train, replay, holdout, device, epochs=10, lr=3e-4, patience=3,
+             new_ratio=0.5, seed=42):
+    """
+    Returns:
+        (best 가중치를 로드한 CPU eval 모델, epoch 별 history, fine-tune 전 held-out 정확도)
+    """
+    torch.manual_seed(seed)
+    trainer = Trainer(model, device)
+
+    parts = [p for p in (new_train, replay) if p is not None]
+    images = torch.cat([p[0] for p in parts])
+    labels = torch.cat([p[1] for p in parts])
+    n_new = len(new_train[0]) if new_train is not None else 0
+    n_old = len(images) - n_new
+    if n_new and n_old:
+        # 새 샘플 전체가 new_ratio, replay 전체가 1 - new_ratio 만큼 뽑히도록
+        weights = torch.cat([torch.full((n_new,), new_ratio / n_new),
+                             torch.full((n_old,), (1 - new_ratio) / n_old)])
+        sampler = WeightedRandomSampler(weights.double(), num_samples=len(images), replacement=True,
+                                        generator=torch.Generator().manual_seed(seed))
+        loader = DataLoader(TensorDataset(images, labels), batch_size=BATCH_SIZE, sampler=sampler)
+    else:
+        loader = DataLoader(TensorDataset(images, labels), batch_size=BATCH_SIZE, shuffle=True,
+                            generator=torch.Generator().manual_seed(seed))
+
+    optimizer = optim.AdamW(model.parameters(), lr=lr, weight_decay=1e-4)
+    scheduler = optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=epochs, eta_min=lr * 0.01)
+
+    before, best_score = holdout_accuracy(trainer, holdout)
+    best_state = {k: v.detach().cpu().clone() for k, v in model.state_dict().items()}
+    best_epoch, stale, history = 0, 0, []
+    print(f"  fine-tune 전 held-out: " + ', '.join(f'{k} {v*100:.2f}%' for k, v in before.items()))
+
+    for epoch in range(1, epochs + 1):
+        start = time.perf_counter()
+        train_loss, train_acc = trainer.train_epoch(loader, optimizer, scheduler)
+        accs, score = holdout_accuracy(trainer, holdout)
+        history.append({'epoch': epoch, 'train_loss': train_loss, 'train_acc': train_acc,
+                        'holdout': accs, 'score': score, 'elapsed': time.perf_counter() - start})
+
+        improved = score > best_score
+        if improved:
+            best_score, best_epoch, stale = score, epoch, 0
+            best_state = {k: v.detach().cpu().clone() for k, v in model.state_dict().items()}
+        else:
+            stale += 1
+        print(f"  Epoch {epoch:2d} | Loss: {train_loss:.4f} | held-out "
+              + ', '.join(f'{k} {v*100:.2f}%' for k, v in accs.items())
+              + f" | {history[-1]['elapsed']:.1f}s" + (' *' if improved else ''))
+        if stale >= patience:
+            print(f"  Early stopping (held-out {patience} epoch 동안 개선 없음)")
+            break
+
+    model.load_state_dict(best_state)
+    if best_epoch == 0:
+        print("  held-out 이 fine-tune 전보다 좋아지지 않아 기존 가중치 유지")
+    return model.cpu().eval(), history, before
+
+
+def main():
+    parser = argparse.ArgumentParser(description='replay buffer 증분 fine-tune')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--new-dirs', nargs='*', default=[], help='새 라벨 캡챠 폴더 ({라벨}_*.png)')
+    parser.add_argument('--feedback-dir', default=None, help='feedback_store 폴더 (통과한 캡챠 = 라벨)')
+    parser.add_argument('--replay-dirs', nargs='*', default=[DATA_DIR], help='기존 학습 데이터 폴더')
+    parser.add_argument('--replay-size', type=int, default=2000)
+    parser.add_argument('--holdout-size', type=int, default=500, help='기존 데이터 held-out 개수')
+    parser.add_argument('--holdout-ratio', type=float, default=0.2, help='새 샘플 중 held-out 비율')
+    parser.add_argument('--new-ratio', type=float, default=0.5, help='학습 배치의 새 샘플 비율')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--lr', type=float, default=3e-4)
+    parser.add_argument('--patience', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("증분 Fine-tune (replay buffer)")
+    print("=" * 60)
+
+    if not os.path.exists(args.model):
+        print(f"모델이 없습니다: {args.model}")
+        return 1
+
+    started = time.perf_counter()
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model = load_multihead(args.model)
+    img_size = (model.img_width, model.img_height)
+
+    new_samples, new_keys = load_new_samples(args.new_dirs, args.feedback_dir)
+    if not new_samples:
+        print("새 샘플이 없습니다 (--new-dirs / --feedback-dir)")
+        return 1
+    order = np.random.default_rng(args.seed).permutation(len(new_samples))
+    n_holdout = int(len(new_samples) * args.holdout_ratio)
+    new_holdout = [new_samples[i] for i in order[:n_holdout]]
+    new_train = [new_samples[i] for i in order[n_holdout:]]
+
+    old = reservoir_sample(iter_old_samples(args.replay_dirs, new_keys),
+                           args.replay_size + args.holdout_size, args.seed)
+    old_holdout, replay = old[:args.holdout_size], old[args.holdout_size:]
+    print(f"새 샘플: {len(new_samples)}개 (학습 {len(new_train)}, held-out {len(new_holdout)})")
+    print(f"기존 데이터: replay {len(replay)}개, held-out {len(old_holdout)}개")
+
+    holdout = {'new': to_tensors(new_holdout, img_size), 'old': to_tensors(old_holdout, img_size)}
+    model, history, before = finetune(
+        model, to_tensors(new_train, img_size), to_tensors(replay, img_size), holdout, device,
+        epochs=args.epochs, lr=args.lr, patience=args.patience, new_ratio=args.new_ratio, seed=args.seed
+    )
+    after, _ = holdout_accuracy(Trainer(model, 'cpu'), holdout)
+
+    print(f"\n{'held-out':10s} {'전':>8s} {'후':>8s}")
+    for name in after:
+        print(f"{name:10s} {before[name]*100:7.2f}% {after[name]*100:7.2f}%")
+
+    model.temperatures = None  # 가중치가 바뀌었으므로 다시 calibrate
+    save_multihead(model, args.output, finetune={
+        'base': args.model,
+        'new_samples': len(new_samples),
+        'replay': len(replay),
+        'holdout_before': before,
+        'holdout_after': after,
+        'history': history,
+        'created': datetime.now().isoformat(timespec='seconds'),
+    })
+    print(f"\n저장: {args.output} ({time.perf_counter() - started:.0f}s)")
+    print("신뢰도는 calibrate_multihead.py 로 다시 보정하세요")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+CBAM_MultiHead_V2 NumPy 추론 엔진 (torch 불필요)
+
+torch import 만으로 1~2초, 수백 MB 메모리가 드는 것을 피하기 위해
+export 한 가중치(npz)만으로 NumPy 에서 추론한다.
+
+- Conv: im2col + BLAS GEMM (NHWC 레이아웃 유지, transpose 없음)
+- BatchNorm: export 시 conv 가중치/편향에 folding
+- CBAM (channel / spatial attention), MaxPool, Position-Aware Pooling, 6개 DigitHead
+- backbone spec (채널 폭, depthwise-separable conv, 블록별 CBAM) 은 npz 메타데이터로 복원
+- Dropout 은 추론 시 항등이므로 생략
+- 체크포인트의 preprocess_variant 도 메타데이터로 옮겨 같은 전처리 적용 (변형 전처리는 torch 필요)
+
+사용법:
+    # 1. 가중치 export (torch 필요, 한 번만)
+    python scripts/numpy_inference.py export [model.pth] [model.npz]
+
+    # 2. 추론 (torch 불필요)
+    python scripts/numpy_inference.py image.png [image2.png ...]
+    python scripts/numpy_inference.py --json image.png
+
+    # --source: npz 가 이 .pth 에서 export 된 것이 아니면 (calibration/fine-tune 후 재export 누락)
+    #           추론하지 않고 종료 코드 3 (captcha-solver.ts 는 PyTorch 경로로 fallback)
+    python scripts/numpy_inference.py --json --source model.pth image.png
+"""
+
+import os
+import sys
+import json
+import hashlib
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODEL_PATH = './data/captcha-model/cbam_multihead_v2_final.pth'
+NPZ_PATH = './data/captcha-model/cbam_multihead_v2_final.npz'
+STALE_EXIT_CODE = 3
+
+
+# ============================================================
+# Export (torch 필요)
+# ============================================================
+def _fold_bn(conv, bn):
+    """Conv + BatchNorm(eval) → 하나의 conv 가중치/편향"""
+    scale = bn.weight.detach() / (bn.running_var + bn.eps).sqrt()
+    weight = conv.weight.detach() * scale[:, None, None, None]
+    bias = conv.bias.detach() if conv.bias is not None else 0
+    bias = (bias - bn.running_mean) * scale + bn.bias.detach()
+    return weight.cpu().numpy(), bias.cpu().numpy()
+
+
+def _export_conv(arrays, prefix, conv, bn):
+    if hasattr(conv, 'depthwise'):
+        # SeparableConv2d: depthwise (C, 1, kh, kw) → (kh, kw, C), BN 은 pointwise 에 folding
+        depthwise = conv.depthwise.weight.detach().cpu().numpy()
+        arrays[f'{prefix}.depthwise'] = depthwise[:, 0].transpose(1, 2, 0)
+        conv = conv.pointwise
+    weight, bias = _fold_bn(conv, bn)
+    # (O, C, kh, kw) → (kh * kw * C, O): im2col 열 순서와 동일
+    arrays[f'{prefix}.weight'] = weight.transpose(2, 3, 1, 0).reshape(-1, weight.shape[0])
+    arrays[f'{prefix}.bias'] = bias
+
+
+def source_fingerprint(pth_path):
+    """export 원본 .pth 식별 정보 (크기, mtime, sha256)"""
+    digest = hashlib.sha256()
+    with open(pth_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    stat = os.stat(pth_path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': digest.hexdigest()}
+
+
+def is_stale(meta, pth_path):
+    """npz 메타의 원본과 현재 .pth 가 다른지 (원본 기록이 없는 이전 export 도 stale)"""
+    source = meta.get('source')
+    if not source:
+        return True
+    stat = os.stat(pth_path)
+    if stat.st_size != source['size']:
+        return True
+    if stat.st_mtime == source['mtime']:
+        return False
+    return source_fingerprint(pth_path)['sha256'] != source['sha256']
+
+
+def export_weights(model, npz_path=NPZ_PATH, source=None):
+    """CBAM_MultiHead_V2 → npz (BN folding, NHWC GEMM 레이아웃으로 변환). source: source_fingerprint"""
+    model.eval()
+    arrays = {}
+
+    for name, use_cbam in zip(model.block_names, model.backbone['cbam']):
+        block = getattr(model, name)
+        _export_conv(arrays, f'{name}.conv1', block.conv1, block.bn1)
+        _export_conv(arrays, f'{name}.conv2', block.conv2, block.bn2)
+        if not use_cbam:
+            continue
+
+        fc = block.cbam.channel_attention.fc
+        arrays[f'{name}.ca.fc1'] = fc[0].weight.detach().cpu().numpy().T
+        arrays[f'{name}.ca.fc2'] = fc[2].weight.detach().cpu().numpy().T
+        sa = block.cbam.spatial_attention.conv.weight.detach().cpu().numpy()
+        arrays[f'{name}.sa.weight'] = sa.transpose(2, 3, 1, 0).reshape(-1, 1)
+
+    # 6개 head 를 쌓아서 한 번에 계산: (D, C, hidden), (D, hidden), (D, hidden, classes), (D, classes)
+    heads = model.heads
+    arrays['heads.fc1.weight'] = np.stack([h.fc[0].weight.detach().cpu().numpy().T for h in heads])
+    arrays['heads.fc1.bias'] = np.stack([h.fc[0].bias.detach().cpu().numpy() for h in heads])
+    arrays['heads.fc2.weight'] = np.stack([h.fc[3].weight.detach().cpu().numpy().T for h in heads])
+    arrays['heads.fc2.bias'] = np.stack([h.fc[3].bias.detach().cpu().numpy() for h in heads])
+
+    arrays = {k: np.ascontiguousarray(v, dtype=np.float32) for k, v in arrays.items()}
+    meta = {
+        'img_height': model.img_height,
+        'img_width': model.img_width,
+        'num_digits': model.num_digits,
+        'num_classes': model.num_classes,
+        'blocks': model.block_names,
+        'cbam': model.backbone['cbam'],
+        'spatial_kernel': 7,
+        'temperatures': model.temperatures,
+        'preprocess_variant': model.preprocess_variant,
+        'source': source,
+    }
+    np.savez(npz_path, __meta__=np.array(json.dumps(meta)), **arrays)
+    return npz_path
+
+
+def export_checkpoint(pth_path=MODEL_PATH, npz_path=NPZ_PATH):
+    """.pth → .npz"""
+    from cbam_multihead_v2 import CBAM_MultiHead_V2, load_multihead
+
+    model = load_multihead(pth_path)
+    if not isinstance(model, CBAM_MultiHead_V2):
+        raise ValueError(f"NumPy 엔진은 CBAM_MultiHead_V2 만 지원합니다: {model.config()['arch']}")
+    return export_weights(model, npz_path, source=source_fingerprint(pth_path))
+
+
+# ============================================================
+# NumPy 연산 (NHWC)
+# ============================================================
+def conv2d(x, weight, bias=None, kernel_size=3):
+    """same padding conv (stride 1). x: (N, H, W, C), weight: (k*k*C, O)"""
+    n, h, w, c = x.shape
+    pad = kernel_size // 2
+    padded = np.pad(x, ((0, 0), (pad, pad), (pad, pad), (0, 0)))
+    # (N, H, W, C, kh, kw) view → (N, H, W, kh, kw, C) → im2col 복사 한 번
+    windows = sliding_window_view(padded, (kernel_size, kernel_size), axis=(1, 2))
+    cols = windows.transpose(0, 1, 2, 4, 5, 3).reshape(n * h * w, kernel_size * kernel_size * c)
+    out = cols @ weight
+    if bias is not None:
+        out += bias
+    return out.reshape(n, h, w, -1)
+
+
+def depthwise_conv2d(x, weight):
+    """same padding depthwise conv (stride 1). x: (N, H, W, C), weight: (k, k, C)"""
+    k = weight.shape[0]
+    pad = k // 2
+    padded = np.pad(x, ((0, 0), (pad, pad), (pad, pad), (0, 0)))
+    _, h, w, _ = x.shape
+    out = np.zeros_like(x)
+    for i in range(k):
+        for j in range(k):
+            out += padded[:, i:i + h, j:j + w] * weight[i, j]
+    return out
+
+
+def relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def channel_attention(x, fc1, fc2):
+    n = x.shape[0]
+    pooled = np.concatenate([x.mean(axis=(1, 2)), x.max(axis=(1, 2))])  # (2N, C)
+    hidden = relu(pooled @ fc1)
+    out = hidden @ fc2
+    attention = sigmoid(out[:n] + out[n:])
+    return x * attention[:, np.newaxis, np.newaxis, :]
+
+
+def spatial_attention(x, weight, kernel_size):
+    stats = np.stack([x.mean(axis=3), x.max(axis=3)], axis=-1)  # (N, H, W, 2)
+    attention = sigmoid(conv2d(stats, weight, kernel_size=kernel_size))
+    return x * attention
+
+
+def max_pool2(x):
+    n, h, w, c = x.shape
+    h2, w2 = h // 2, w // 2
+    return x[:, :h2 * 2, :w2 * 2].reshape(n, h2, 2, w2, 2, c).max(axis=(2, 4))
+
+
+def position_pool(x, num_positions):
+    """AdaptiveAvgPool2d((1, D)) → (N, D, C)"""
+    n, h, w, c = x.shape
+    columns = x.mean(axis=1)  # (N, W, C)
+    out = np.empty((n, num_positions, c), dtype=x.dtype)
+    for i in range(num_positions):
+        start = (i * w) // num_positions
+        end = -((-(i + 1) * w) // num_positions)
+        out[:, i] = columns[:, start:end].mean(axis=1)
+    return out
+
+
+def softmax(x, axis=-1):
+    e = np.exp(x - x.max(axis=axis, keepdims=True))
+    return e / e.sum(axis=axis, keepdims=True)
+
+
+# ============================================================
+# 추론 엔진
+# ============================================================
+class NumpyCBAMMultiHead:
+    """npz 가중치로 CBAM_MultiHead_V2 추론"""
+
+    def __init__(self, npz_path=NPZ_PATH):
+        with np.load(npz_path) as data:
+            self.meta = json.loads(str(data['__meta__']))
+            self.params = {k: data[k] for k in data.files if k != '__meta__'}
+        self.num_digits = self.meta['num_digits']
+        self.num_classes = self.meta['num_classes']
+        self.spatial_kernel = self.meta['spatial_kernel']
+        self.img_height = self.meta.get('img_height', 50)
+        self.img_width = self.meta.get('img_width', 160)
+        # 이전 export (backbone spec 없음) 는 기본 4블록 + CBAM
+        self.blocks = self.meta.get('blocks', ['conv1', 'conv2', 'conv3', 'conv4'])
+        self.cbam = self.meta.get('cbam', [True] * len(self.blocks))
+        temperatures = self.meta.get('temperatures')
+        self.temperatures = np.array(temperatures, dtype=np.float32)[:, np.newaxis] if temperatures else None
+        self.preprocess_variant = self.meta.get('preprocess_variant')
+
+    def _conv(self, x, prefix):
+        p = self.params
+        if f'{prefix}.depthwise' in p:
+            x = depthwise_conv2d(x, p[f'{prefix}.depthwise'])
+            n, h, w, c = x.shape
+            out = x.reshape(-1, c) @ p[f'{prefix}.weight'] + p[f'{prefix}.bias']
+            return relu(out.reshape(n, h, w, -1))
+        return relu(conv2d(x, p[f'{prefix}.weight'], p[f'{prefix}.bias']))
+
+    def forward(self, x):
+        """
+        Args:
+            x: (N, 1, H, W) 또는 (N, H, W) float32
+        Returns:
+            logits: (N, num_digits, num_classes)
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 4:
+            x = x[:, 0]
+        x = x[..., np.newaxis]  # NHWC
+        p = self.params
+
+        for name, use_cbam in zip(self.blocks, self.cbam):
+            x = self._conv(x, f'{name}.conv1')
+            x = self._conv(x, f'{name}.conv2')
+            if use_cbam:
+                x = channel_attention(x, p[f'{name}.ca.fc1'], p[f'{name}.ca.fc2'])
+                x = spatial_attention(x, p[f'{name}.sa.weight'], self.spatial_kernel)
+            x = max_pool2(x)
+
+        pooled = position_pool(x, self.num_digits)  # (N, D, C)
+        hidden = np.einsum('ndc,dch->ndh', pooled, p['heads.fc1.weight']) + p['heads.fc1.bias']
+        hidden = relu(hidden)
+        return np.einsum('ndh,dhk->ndk', hidden, p['heads.fc2.weight']) + p['heads.fc2.bias']
+
+    __call__ = forward
+
+    def predict(self, x):
+        """(N, num_digits) 예측 숫자"""
+        return self.forward(x).argmax(axis=-1)
+
+    def predict_with_confidence(self, x):
+        """(N, num_digits) 예측 숫자, (N, num_digits) softmax 최대값 (calibration 적용)"""
+        logits = self.forward(x)
+        if self.temperatures is not None:
+            logits = logits / self.temperatures
+        probs = softmax(logits)
+        return probs.argmax(axis=-1), probs.max(axis=-1)
+
+
+def main():
+    args = sys.argv[1:]
+
+    if args and args[0] == 'export':
+        pth_path = args[1] if len(args) > 1 else MODEL_PATH
+        npz_path = args[2] if len(args) > 2 else NPZ_PATH
+        export_checkpoint(pth_path, npz_path)
+        print(f"✅ export 완료: {pth_path} → {npz_path}")
+        return 0
+
+    as_json = '--json' in args
+    source_path = None
+    if '--source' in args:
+        i = args.index('--source')
+        source_path = args[i + 1] if i + 1 < len(args) else None
+        args = args[:i] + args[i + 2:]
+    paths = [a for a in args if a != '--json']
+    if not paths:
+        print(__doc__)
+        return 1
+
+    from captcha_image import preprocess_batch
+
+    engine = NumpyCBAMMultiHead(NPZ_PATH)
+    if source_path and os.path.exists(source_path) and is_stale(engine.meta, source_path):
+        print(f"STALE: {NPZ_PATH} 는 현재 {source_path} 에서 export 된 것이 아닙니다 "
+              f"(python scripts/numpy_inference.py export 로 다시 export)", file=sys.stderr)
+        return STALE_EXIT_CODE
+    images = preprocess_batch(paths, (engine.img_width, engine.img_height), variant=engine.preprocess_variant)
+    digits, confidences = engine.predict_with_confidence(images)
+    version = None
+    if as_json:
+        from captcha_server import model_version  # 서버 /predict 와 같은 버전 표기 (npz 파일 해시)
+        version = model_version(NPZ_PATH)
+
+    for path, row, conf in zip(paths, digits, confidences):
+        text = ''.join(map(str, row.tolist()))
+        if as_json:
+            print(json.dumps({'path': path, 'text': text,
+                              'confidences': [round(c, 4) for c in conf.tolist()],
+                              'confidence': round(float(np.prod(conf)), 6), 'model_version': version}))
+        else:
+            print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,14 +8,21 @@ CBAM-CRNN 모델을 위한 전처리 파이프라인
 - 모폴로지 기반 노이즈 제거
 - [0, 1] 정규화
 - 데이터 증강 (회전, 밝기)
+- 전처리 변형(variant)을 이름으로 선택 (PREPROCESS_VARIANTS, variant='auto' 면 preprocess_config.json)
 """
 
 import cv2
 import numpy as np
 import torch
 from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, List, Optional, Union
 import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from captcha_image import decode_image, to_gray, text_plane
 
 
 # 설정
@@ -24,6 +31,35 @@ TARGET_HEIGHT = 50
 NORMALIZE_MEAN = 0.5
 NORMALIZE_STD = 0.5
 
+# 배치 전처리 스레드 수 (cv2 연산은 GIL 을 해제하므로 스레드로 병렬화됨)
+BATCH_WORKERS = min(8, os.cpu_count() or 1)
+
+# 서빙 전처리 설정 (benchmark-preprocessing.py 가 선택한 변형과 그 변형으로 학습한 모델을 기록)
+PREPROCESS_CONFIG_PATH = './data/captcha-model/preprocess_config.json'
+
+INTERPOLATIONS = {
+    'linear': cv2.INTER_LINEAR,
+    'area': cv2.INTER_AREA,
+    'nearest': cv2.INTER_NEAREST,
+    'cubic': cv2.INTER_CUBIC,
+}
+
+# 전처리 변형: 이름 → CaptchaPreprocessor 설정
+#   source: 'gray' (grayscale) / 'alpha' (captcha_image.text_plane, 학습 기본)
+#   morphology: None / 'v1' (Otsu + 수평 open/close) / 'v2' (CLAHE + blur + 적응형 임계값)
+PREPROCESS_VARIANTS = {}
+for _source, _morphology in [('alpha', None), ('gray', None), ('gray', 'v1'), ('gray', 'v2')]:
+    for _interp in INTERPOLATIONS:
+        _name = _source + (f'_morph_{_morphology}' if _morphology else '')
+        if _interp != 'linear':
+            _name += f'_{_interp}'
+        PREPROCESS_VARIANTS[_name] = {
+            'source': _source,
+            'morphology': _morphology,
+            'interpolation': _interp,
+        }
+del _source, _morphology, _interp, _name
+
 
 class CaptchaPreprocessor:
     """캡챠 전처리 클래스"""
@@ -33,7 +69,10 @@ class CaptchaPreprocessor:
         target_size: Tuple[int, int] = (TARGET_WIDTH, TARGET_HEIGHT),
         use_morphology: bool = True,
         normalize: bool = True,
-        use_mean_std: bool = False
+        use_mean_std: bool = False,
+        morphology: str = 'v1',
+        interpolation: str = 'linear',
+        source: str = 'gray'
     ):
         """
         Args:
@@ -41,28 +80,62 @@ class CaptchaPreprocessor:
             use_morphology: 모폴로지 연산으로 노이즈 제거 여부
             normalize: [0, 1] 정규화 여부
             use_mean_std: 평균/표준편차 정규화 사용 여부
+            morphology: 'v1' (apply_morphology) 또는 'v2' (apply_morphology_v2)
+            interpolation: 리사이즈 보간 ('linear', 'area', 'nearest', 'cubic')
+            source: 'gray' (grayscale) 또는 'alpha' (Alpha 채널 반전, 학습 기본)
         """
         self.target_size = target_size
         self.use_morphology = use_morphology
         self.normalize = normalize
         self.use_mean_std = use_mean_std
+        self.morphology = morphology
+        self.interpolation = INTERPOLATIONS[interpolation]
+        self.source = source
+
+    @classmethod
+    def from_variant(cls, name: str, **kwargs) -> 'CaptchaPreprocessor':
+        """PREPROCESS_VARIANTS 의 이름으로 생성"""
+        if name not in PREPROCESS_VARIANTS:
+            raise ValueError(f"알 수 없는 전처리 변형: {name} (가능: {list(PREPROCESS_VARIANTS)})")
+        variant = PREPROCESS_VARIANTS[name]
+        return cls(
+            use_morphology=variant['morphology'] is not None,
+            morphology=variant['morphology'] or 'v1',
+            interpolation=variant['interpolation'],
+            source=variant['source'],
+            **kwargs
+        )
 
-    def load_image(self, path: str) -> np.ndarray:
-        """이미지 로드 (grayscale)"""
-        if isinstance(path, str):
-            img = Image.open(path).convert('L')
-            return np.array(img)
+    def load_image(self, path: Union[str, np.ndarray, Image.Image]) -> np.ndarray:
+        """
+        이미지 로드 → (H, W) uint8 (grayscale, source='alpha' 면 Alpha 텍스트 평면)
+
+        ndarray 는 decode_image 결과와 같은 형식 (gray / BGR / BGRA), float 배열은 [0, 1] 로 간주
+        """
+        if isinstance(path, (str, bytes)):
+            img = decode_image(path)
         elif isinstance(path, np.ndarray):
-            return path
+            img = path
+            if img.dtype != np.uint8:
+                if np.issubdtype(img.dtype, np.floating):
+                    img = np.rint(img * 255.0)
+                img = np.clip(img, 0, 255).astype(np.uint8)
         elif isinstance(path, Image.Image):
             return np.array(path.convert('L'))
         else:
             raise ValueError(f"지원하지 않는 입력 타입: {type(path)}")
+        return text_plane(img) if self.source == 'alpha' else to_gray(img)
 
     def resize(self, img: np.ndarray) -> np.ndarray:
         """이미지 리사이즈"""
         width, height = self.target_size
-        return cv2.resize(img, (width, height), interpolation=cv2.INTER_LINEAR)
+        return cv2.resize(img, (width, height), interpolation=self.interpolation)
+
+    def apply_selected_morphology(self, img: np.ndarray) -> np.ndarray:
+        """설정된 버전의 모폴로지 적용"""
+        if self.morphology == 'v2':
+            return self.apply_morphology_v2(img)
+        return self.apply_morphology(img)
 
     def apply_morphology(self, img: np.ndarray) -> np.ndarray:
         """
@@ -141,7 +214,7 @@ class CaptchaPreprocessor:
         img = self.resize(img)
 
         if self.use_morphology:
-            img = self.apply_morphology(img)
+            img = self.apply_selected_morphology(img)
 
         if self.normalize:
             img = self.normalize_image(img)
@@ -150,10 +223,46 @@ class CaptchaPreprocessor:
 
         return tensor
 
-    def process_batch(self, paths: List[str]) -> torch.Tensor:
-        """배치 전처리"""
-        tensors = [self.process(path) for path in paths]
-        return torch.stack(tensors)
+    def process_batch(
+        self,
+        paths: List[Union[str, np.ndarray, Image.Image]],
+        num_workers: Optional[int] = None
+    ) -> torch.Tensor:
+        """
+        배치 전처리
+
+        디코딩 → 리사이즈 → 모폴로지를 스레드 풀에서 실행하고, 결과를 미리 할당한
+        (N, 1, H, W) uint8 버퍼에 바로 기록한다. 정규화는 배치 전체에 한 번만 적용하며
+        반환 텐서는 float32 버퍼를 그대로 감싼다 (추가 복사 없음).
+        """
+        width, height = self.target_size
+        raw = np.empty((len(paths), 1, height, width), dtype=np.uint8)
+
+        def work(i):
+            img = self.load_image(paths[i])  # 항상 (H, W) uint8 → dst 에 그대로 기록됨
+            dst = raw[i, 0]
+            cv2.resize(img, (width, height), dst=dst, interpolation=self.interpolation)
+            if self.use_morphology:
+                dst[...] = self.apply_selected_morphology(dst)
+
+        workers = num_workers or BATCH_WORKERS
+        if workers > 1 and len(paths) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(work, range(len(paths))))
+        else:
+            for i in range(len(paths)):
+                work(i)
+
+        out = np.empty(raw.shape, dtype=np.float32)
+        if self.normalize:
+            np.divide(raw, np.float32(255.0), out=out)
+            if self.use_mean_std:
+                np.subtract(out, np.float32(NORMALIZE_MEAN), out=out)
+                np.divide(out, np.float32(NORMALIZE_STD), out=out)
+        else:
+            out[...] = raw
+
+        return torch.from_numpy(out)
 
     def process_numpy(self, path: Union[str, np.ndarray, Image.Image]) -> np.ndarray:
         """
@@ -163,7 +272,7 @@ class CaptchaPreprocessor:
         img = self.resize(img)
 
         if self.use_morphology:
-            img = self.apply_morphology(img)
+            img = self.apply_selected_morphology(img)
 
         return img
 
@@ -218,28 +327,53 @@ class TrainAugmentation:
         return img
 
 
+def load_preprocess_config(path: str = PREPROCESS_CONFIG_PATH) -> Optional[dict]:
+    """서빙 전처리 설정 로드 (없으면 None)"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
 class InferencePreprocessor:
     """추론용 전처리 (증강 없음)"""
 
     def __init__(
         self,
         target_size: Tuple[int, int] = (TARGET_WIDTH, TARGET_HEIGHT),
-        use_morphology: bool = True
+        use_morphology: bool = True,
+        variant: Optional[str] = None
     ):
-        self.preprocessor = CaptchaPreprocessor(
-            target_size=target_size,
-            use_morphology=use_morphology,
-            normalize=True,
-            use_mean_std=False
-        )
+        """
+        Args:
+            variant: 전처리 변형 이름. None 이면 use_morphology 기준 기본 전처리,
+                     'auto' 면 preprocess_config.json 의 선택 (설정 파일이 없으면 기본 전처리).
+                     변형마다 입력 분포가 다르므로 그 변형으로 학습한 모델(설정의 'model')과 함께 써야 한다
+        """
+        if variant == 'auto':
+            config = load_preprocess_config()
+            variant = config.get('variant') if config else None
+
+        if variant is not None:
+            self.preprocessor = CaptchaPreprocessor.from_variant(
+                variant, target_size=target_size, normalize=True, use_mean_std=False
+            )
+        else:
+            self.preprocessor = CaptchaPreprocessor(
+                target_size=target_size,
+                use_morphology=use_morphology,
+                normalize=True,
+                use_mean_std=False
+            )
+        self.variant = variant
 
     def __call__(self, image_path: str) -> torch.Tensor:
         """단일 이미지 전처리"""
         return self.preprocessor.process(image_path)
 
-    def batch(self, image_paths: List[str]) -> torch.Tensor:
-        """배치 전처리"""
-        return self.preprocessor.process_batch(image_paths)
+    def batch(self, image_paths: List[str], num_workers: Optional[int] = None) -> torch.Tensor:
+        """배치 전처리 (스레드 풀 + 단일 버퍼)"""
+        return self.preprocessor.process_batch(image_paths, num_workers=num_workers)
 
 
 def visualize_preprocessing(image_path: str, output_dir: str = "./temp"):
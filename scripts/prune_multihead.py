@@ -0,0 +1,267 @@
+"""
+CBAM_MultiHead_V2 구조적 채널 pruning
+
+- ConvBlock 채널 중요도: BN gamma 크기 (--criterion bn) 또는
+  BN gamma x CBAM channel attention 평균 (--criterion attention)
+- 블록별 중요도를 블록 평균으로 정규화한 뒤 전 블록에서 하위 채널을 함께 제거
+- 제거 후 더 좁은 backbone spec 으로 모델을 새로 만들어 가중치를 복사 (마스킹이 아닌 dense 모델)
+  CBAM fc 은닉 차원도 channels // reduction 에 맞춰 중요도 순으로 줄임
+- 짧게 fine-tune → 6자리 전체 정확도 하락이 budget 을 넘을 때까지 반복, 마지막으로 통과한 모델 저장
+
+사용법:
+    python scripts/prune_multihead.py
+    python scripts/prune_multihead.py --model ./data/captcha-model/cbam_multihead_v2_final.pth \\
+        --step 0.15 --budget 0.005 --finetune-epochs 3 --criterion attention
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import CBAM_MultiHead_V2, load_multihead, save_multihead
+from captcha_image import preprocess_batch
+from train_multihead_v2 import train_short, list_samples, split_samples, Trainer, DATA_DIR, MODEL_DIR
+from distill_multihead import measure_latency
+
+MODEL_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_final.pth')
+PRUNED_PATH = os.path.join(MODEL_DIR, 'cbam_multihead_v2_pruned.pth')
+MIN_CHANNELS = 8
+
+
+# ============================================================
+# 채널 중요도
+# ============================================================
+def attention_means(model, images, batch_size=256):
+    """블록별 CBAM channel attention 평균 (C,). CBAM 이 없는 블록은 None"""
+    sums = {}
+    hooks = []
+
+    def make_hook(name):
+        def hook(module, inputs, _):
+            x = inputs[0]
+            b, c = x.shape[:2]
+            avg_out = module.fc(x.mean(dim=(2, 3)))
+            max_out = module.fc(x.amax(dim=(2, 3)))
+            attention = torch.sigmoid(avg_out + max_out)
+            sums[name] = sums.get(name, 0) + attention.sum(dim=0)
+        return hook
+
+    for name, use_cbam in zip(model.block_names, model.backbone['cbam']):
+        if use_cbam:
+            module = getattr(model, name).cbam.channel_attention
+            hooks.append(module.register_forward_hook(make_hook(name)))
+
+    model.eval()
+    with torch.no_grad():
+        for batch in torch.split(images, batch_size):
+            model(batch)
+    for hook in hooks:
+        hook.remove()
+    return {name: sums[name] / len(images) if name in sums else None for name in model.block_names}
+
+
+def channel_scores(model, images=None, criterion='bn'):
+    """블록별 (중간 채널 점수, 출력 채널 점수)"""
+    attention = attention_means(model, images) if criterion == 'attention' else {}
+    scores = []
+    for name in model.block_names:
+        block = getattr(model, name)
+        mid = block.bn1.weight.detach().abs()
+        out = block.bn2.weight.detach().abs()
+        if attention.get(name) is not None:
+            out = out * attention[name]
+        scores.append((mid, out))
+    return scores
+
+
+def select_channels(scores, ratio, min_channels=MIN_CHANNELS):
+    """
+    전 블록 출력 채널을 블록 평균으로 정규화한 점수로 함께 정렬해 하위 ratio 만큼 제거.
+    블록의 중간 채널(conv1 출력)은 같은 개수만큼 bn1 gamma 순으로 남긴다.
+
+    Returns:
+        블록별 (남길 중간 채널 index, 남길 출력 채널 index) - 정렬된 LongTensor
+    """
+    normalized = [out / out.mean() for _, out in scores]
+    flat = torch.cat(normalized)
+    num_remove = int(len(flat) * ratio)
+
+    widths = [len(out) for out in normalized]
+    if num_remove > 0:
+        order = flat.argsort()
+        owner = torch.cat([torch.full((w,), i) for i, w in enumerate(widths)])
+        for idx in order.tolist():
+            if num_remove == 0:
+                break
+            block = owner[idx].item()
+            if widths[block] > min_channels:
+                widths[block] -= 1
+                num_remove -= 1
+
+    keep = []
+    for (mid, out), width in zip(scores, widths):
+        keep_mid = mid.argsort(descending=True)[:width].sort().values
+        keep_out = out.argsort(descending=True)[:width].sort().values
+        keep.append((keep_mid, keep_out))
+    return keep
+
+
+# ============================================================
+# Dense 모델 재구성
+# ============================================================
+def _copy_conv(dst, src, out_idx, in_idx):
+    """nn.Conv2d 또는 SeparableConv2d 의 (출력, 입력) 채널 선택 복사"""
+    if hasattr(src, 'depthwise'):
+        dst.depthwise.weight.copy_(src.depthwise.weight[in_idx])
+        src, dst = src.pointwise, dst.pointwise
+    dst.weight.copy_(src.weight[out_idx][:, in_idx])
+    if src.bias is not None:
+        dst.bias.copy_(src.bias[out_idx])
+
+
+def _copy_bn(dst, src, idx):
+    dst.weight.copy_(src.weight[idx])
+    dst.bias.copy_(src.bias[idx])
+    dst.running_mean.copy_(src.running_mean[idx])
+    dst.running_var.copy_(src.running_var[idx])
+    dst.num_batches_tracked.copy_(src.num_batches_tracked)
+
+
+def _copy_channel_attention(dst, src, idx):
+    """fc: Linear(C, hidden) → ReLU → Linear(hidden, C). hidden 은 중요도 순으로 dst 크기만큼 남김"""
+    fc1 = src.fc[0].weight[:, idx]      # (hidden, C')
+    fc2 = src.fc[2].weight[idx]         # (C', hidden)
+    hidden = dst.fc[0].weight.shape[0]
+    importance = fc1.norm(dim=1) * fc2.norm(dim=0)
+    keep = importance.argsort(descending=True)[:hidden].sort().values
+    dst.fc[0].weight.copy_(fc1[keep])
+    dst.fc[2].weight.copy_(fc2[:, keep])
+
+
+def prune_model(model, keep):
+    """keep (select_channels 결과) 에 따라 더 좁은 dense CBAM_MultiHead_V2 생성"""
+    config = model.config()
+    config.pop('arch')
+    config['backbone'] = {**config['backbone'], 'channels': [len(out) for _, out in keep]}
+    pruned = CBAM_MultiHead_V2(**config)
+
+    with torch.no_grad():
+        in_idx = torch.tensor([0])
+        for name, (mid_idx, out_idx), use_cbam in zip(model.block_names, keep, model.backbone['cbam']):
+            src, dst = getattr(model, name), getattr(pruned, name)
+            _copy_conv(dst.conv1, src.conv1, mid_idx, in_idx)
+            _copy_bn(dst.bn1, src.bn1, mid_idx)
+            _copy_conv(dst.conv2, src.conv2, out_idx, mid_idx)
+            _copy_bn(dst.bn2, src.bn2, out_idx)
+            if use_cbam:
+                _copy_channel_attention(dst.cbam.channel_attention, src.cbam.channel_attention, out_idx)
+                dst.cbam.spatial_attention.load_state_dict(src.cbam.spatial_attention.state_dict())
+            in_idx = out_idx
+
+        for dst, src in zip(pruned.heads, model.heads):
+            dst.fc[0].weight.copy_(src.fc[0].weight[:, in_idx])
+            dst.fc[0].bias.copy_(src.fc[0].bias)
+            dst.fc[3].load_state_dict(src.fc[3].state_dict())
+
+    return pruned.eval()
+
+
+def evaluate(model, images, labels, device):
+    from torch.utils.data import TensorDataset, DataLoader
+    loader = DataLoader(TensorDataset(images, labels), batch_size=256, shuffle=False)
+    _, acc, _ = Trainer(model, device).validate(loader)
+    model.cpu()
+    return acc
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CBAM_MultiHead_V2 구조적 채널 pruning')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--output', default=PRUNED_PATH)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--criterion', default='bn', choices=['bn', 'attention'])
+    parser.add_argument('--step', type=float, default=0.1, help='반복마다 제거할 채널 비율')
+    parser.add_argument('--budget', type=float, default=0.01, help='허용 정확도 하락 (절대값)')
+    parser.add_argument('--finetune-epochs', type=int, default=3)
+    parser.add_argument('--lr', type=float, default=3e-4)
+    parser.add_argument('--max-rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CBAM_MultiHead_V2 구조적 채널 Pruning")
+    print("=" * 60)
+
+    if not os.path.exists(args.model):
+        print(f"모델이 없습니다: {args.model}")
+        return 1
+    model = load_multihead(args.model)
+    if not isinstance(model, CBAM_MultiHead_V2):
+        print(f"CBAM_MultiHead_V2 만 지원합니다: {model.config()['arch']}")
+        return 1
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    paths, labels = list_samples(args.data_dir)
+    images = torch.from_numpy(preprocess_batch(paths, (model.img_width, model.img_height)))
+    train_idx, val_idx = split_samples(labels)  # 원본 모델 학습과 같은 검증 샘플
+
+    base_acc = evaluate(model, images[val_idx], labels[val_idx], device)
+    rows = [{'round': 0, 'channels': model.backbone['channels'], 'accuracy': base_acc,
+             'parameters': sum(p.numel() for p in model.parameters()),
+             'latency_ms': measure_latency(model)}]
+    print(f"\n기준: {rows[0]['channels']} | Acc {base_acc*100:.2f}% | "
+          f"{rows[0]['parameters']:,} params | {rows[0]['latency_ms']:.2f} ms")
+
+    best = model
+    for round_idx in range(1, args.max_rounds + 1):
+        keep = select_channels(channel_scores(best, images[train_idx][:1024], args.criterion), args.step)
+        channels = [len(out) for _, out in keep]
+        if channels == best.backbone['channels']:
+            print("\n더 이상 제거할 채널이 없습니다.")
+            break
+
+        candidate = prune_model(best, keep)
+        pruned_acc = evaluate(candidate, images[val_idx], labels[val_idx], device)
+        if args.finetune_epochs > 0:
+            acc, _, candidate = train_short(candidate, images, labels, train_idx, val_idx,
+                                            args.finetune_epochs, device, lr=args.lr)
+        else:
+            acc = pruned_acc
+
+        row = {'round': round_idx, 'channels': channels, 'accuracy': acc, 'pruned_accuracy': pruned_acc,
+               'parameters': sum(p.numel() for p in candidate.parameters()),
+               'latency_ms': measure_latency(candidate)}
+        rows.append(row)
+        print(f"  Round {round_idx:2d}: {channels} | 직후 {pruned_acc*100:5.1f}% → "
+              f"fine-tune {acc*100:5.2f}% | {row['parameters']:,} params | {row['latency_ms']:.2f} ms")
+
+        if base_acc - acc > args.budget:
+            print(f"\n정확도 하락 {(base_acc - acc)*100:.2f}%p > budget {args.budget*100:.2f}%p → 중단")
+            break
+        best = candidate
+
+    final = next(r for r in reversed(rows) if r['channels'] == best.backbone['channels'])
+    print(f"\n결과: {rows[0]['channels']} → {final['channels']}")
+    print(f"  정확도 {base_acc*100:.2f}% → {final['accuracy']*100:.2f}%")
+    print(f"  파라미터 {rows[0]['parameters']:,} → {final['parameters']:,}")
+    print(f"  지연 {rows[0]['latency_ms']:.2f} ms → {final['latency_ms']:.2f} ms "
+          f"({rows[0]['latency_ms'] / final['latency_ms']:.2f}x)")
+
+    if best is not model:
+        save_multihead(best, args.output, val_acc=final['accuracy'], pruned_from=args.model)
+        print(f"\n저장: {args.output}")
+
+    report_path = os.path.join(MODEL_DIR, f'prune_report_{datetime.now():%Y%m%d_%H%M%S}.json')
+    with open(report_path, 'w') as f:
+        json.dump({'model': args.model, 'criterion': args.criterion, 'step': args.step,
+                   'budget': args.budget, 'rows': rows}, f, indent=2)
+    print(f"리포트 저장: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
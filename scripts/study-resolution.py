@@ -0,0 +1,99 @@
+"""
+입력 해상도 study: 정확도 vs CPU 지연
+
+CBAM_MultiHead_V2 의 position_pool 은 adaptive 이므로 해상도만 바꿔도 구조가 동작한다.
+해상도별로 같은 backbone 을 짧게 학습해 검증 정확도, 단일 이미지 지연, 전처리 시간을 비교한다.
+
+사용법:
+    python scripts/study-resolution.py
+    python scripts/study-resolution.py --sizes 160x50,120x40,96x32,80x24 --epochs 30
+    python scripts/study-resolution.py --backbone half_separable --save
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import CBAM_MultiHead_V2, BACKBONE_VARIANTS, save_multihead
+from captcha_image import preprocess_batch
+from train_multihead_v2 import (
+    train_short, list_samples, split_samples, parse_img_size, DATA_DIR, MODEL_DIR, REPORT_DIR,
+    NUM_DIGITS, NUM_CLASSES
+)
+from distill_multihead import measure_latency
+SIZES = '160x50,120x40,96x32,80x24'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='입력 해상도 study')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--sizes', default=SIZES, help='쉼표로 구분한 WxH')
+    parser.add_argument('--backbone', default='default', choices=sorted(BACKBONE_VARIANTS))
+    parser.add_argument('--epochs', type=int, default=20, help='해상도별 학습 epoch (0 이면 지연만)')
+    parser.add_argument('--save', action='store_true', help='해상도별 best 모델 저장')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("입력 해상도 Study")
+    print("=" * 60)
+
+    sizes = [parse_img_size(s) for s in args.sizes.split(',') if s.strip()]
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+    paths, labels = list_samples(args.data_dir)
+    if not paths:
+        print(f"데이터 폴더가 없습니다: {args.data_dir}")
+        return 1
+    train_idx, val_idx = split_samples(labels)
+    print(f"샘플: {len(paths)}개, backbone: {args.backbone}, 학습: {args.epochs} epochs")
+
+    rows = []
+    for width, height in sizes:
+        start = time.perf_counter()
+        images = torch.from_numpy(preprocess_batch(paths, (width, height)))
+        preprocess_ms = (time.perf_counter() - start) * 1000 / len(paths)
+
+        torch.manual_seed(42)  # 해상도마다 같은 seed 로 초기화 (앞 해상도의 학습이 초기 가중치에 영향 없음)
+        model = CBAM_MultiHead_V2(img_height=height, img_width=width, num_digits=NUM_DIGITS,
+                                  num_classes=NUM_CLASSES, backbone=BACKBONE_VARIANTS[args.backbone])
+        row = {'size': f'{width}x{height}', 'pixels': width * height,
+               'preprocess_ms': preprocess_ms, 'accuracy': None, 'pos_accs': None}
+
+        if args.epochs > 0:
+            acc, pos_accs, model = train_short(model, images, labels, train_idx, val_idx,
+                                               args.epochs, device)
+            row['accuracy'], row['pos_accs'] = acc, pos_accs
+            if args.save:
+                row['path'] = os.path.join(MODEL_DIR, f'cbam_multihead_v2_{width}x{height}.pth')
+                save_multihead(model, row['path'], val_acc=acc)
+
+        row['latency_ms'] = measure_latency(model.eval())
+        rows.append(row)
+
+        acc_str = f"{row['accuracy']*100:5.1f}%" if row['accuracy'] is not None else '    -'
+        print(f"  {row['size']:>8s}  {row['latency_ms']:7.3f} ms  전처리 {preprocess_ms:.4f} ms/img  acc {acc_str}")
+
+    base = rows[0]
+    print(f"\n{'해상도':>8s} {'픽셀':>7s} {'지연(ms)':>9s} {'속도비':>7s} {'정확도':>8s}")
+    print("-" * 46)
+    for row in rows:
+        acc_str = f"{row['accuracy']*100:7.2f}%" if row['accuracy'] is not None else '       -'
+        speedup = base['latency_ms'] / row['latency_ms']
+        print(f"{row['size']:>8s} {row['pixels']:>7,} {row['latency_ms']:9.3f} {speedup:6.2f}x {acc_str}")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f'resolution_{datetime.now():%Y%m%d_%H%M%S}.json')
+    with open(report_path, 'w') as f:
+        json.dump({'backbone': args.backbone, 'epochs': args.epochs, 'rows': rows}, f, indent=2)
+    print(f"\n리포트 저장: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Backbone 변형 sweep: 정확도 vs CPU 지연
+
+- BACKBONE_VARIANTS (채널 폭, depthwise-separable, 블록별 CBAM, reduction) 를 각각 짧게 학습
+- 검증 정확도(6자리 전체 일치), 파라미터 수, 단일 스레드 단일 이미지 지연 측정
+- 지연-정확도 산점도(터미널) + Pareto 표 출력, 리포트 JSON 저장
+- --save: 각 변형의 best 모델을 config 포함 체크포인트로 저장 (load_multihead 로 로드)
+
+사용법:
+    python scripts/sweep-backbones.py
+    python scripts/sweep-backbones.py --variants default,separable,half_separable --epochs 30
+    python scripts/sweep-backbones.py --epochs 0        # 지연만 측정
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import CBAM_MultiHead_V2, BACKBONE_VARIANTS, save_multihead
+from captcha_image import preprocess_batch
+from train_multihead_v2 import (
+    train_short, list_samples, split_samples, DATA_DIR, MODEL_DIR, REPORT_DIR, NUM_DIGITS, NUM_CLASSES
+)
+from distill_multihead import measure_latency
+
+
+def pareto_front(rows):
+    """지연이 더 짧으면서 정확도도 같거나 높은 변형이 없는 행"""
+    scored = [r for r in rows if r['accuracy'] is not None]
+    return {
+        r['variant'] for r in scored
+        if not any(
+            o['latency_ms'] <= r['latency_ms'] and o['accuracy'] >= r['accuracy']
+            and (o['latency_ms'] < r['latency_ms'] or o['accuracy'] > r['accuracy'])
+            for o in scored
+        )
+    }
+
+
+def print_chart(rows, width=60, height=15):
+    """지연(x) - 정확도(y) 산점도"""
+    scored = [r for r in rows if r['accuracy'] is not None]
+    if len(scored) < 2:
+        return
+    xs = [r['latency_ms'] for r in scored]
+    ys = [r['accuracy'] for r in scored]
+    x_min, x_max = min(xs), max(xs)
+    y_min, y_max = min(ys), max(ys)
+    x_span = (x_max - x_min) or 1
+    y_span = (y_max - y_min) or 1
+
+    grid = [[' '] * width for _ in range(height)]
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        col = round((x - x_min) / x_span * (width - 1))
+        row = height - 1 - round((y - y_min) / y_span * (height - 1))
+        grid[row][col] = chr(ord('A') + i)
+
+    print(f"\n정확도 {y_max*100:6.2f}% ┐")
+    for line in grid:
+        print("          │" + ''.join(line))
+    print(f"정확도 {y_min*100:6.2f}% └" + "─" * width)
+    print(f"          {x_min:.2f}ms{' ' * (width - 12)}{x_max:.2f}ms")
+    for i, r in enumerate(scored):
+        print(f"  {chr(ord('A') + i)} = {r['variant']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backbone 변형 sweep')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--variants', default=','.join(BACKBONE_VARIANTS),
+                        help='쉼표로 구분한 변형 이름')
+    parser.add_argument('--epochs', type=int, default=20, help='변형별 학습 epoch (0 이면 지연만)')
+    parser.add_argument('--save', action='store_true', help='변형별 best 모델 저장')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Backbone 변형 Sweep")
+    print("=" * 60)
+
+    variants = [v.strip() for v in args.variants.split(',') if v.strip()]
+    unknown = [v for v in variants if v not in BACKBONE_VARIANTS]
+    if unknown:
+        print(f"알 수 없는 변형: {unknown}")
+        return 1
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+    if args.epochs > 0:
+        paths, labels = list_samples(args.data_dir)
+        if not paths:
+            print(f"데이터 폴더가 없습니다: {args.data_dir}")
+            return 1
+        images = torch.from_numpy(preprocess_batch(paths))
+        train_idx, val_idx = split_samples(labels)
+        print(f"샘플: {len(paths)}개 (Train {len(train_idx)}, Val {len(val_idx)}), 학습: {args.epochs} epochs")
+
+    rows = []
+    for name in variants:
+        backbone = BACKBONE_VARIANTS[name]
+        row = {'variant': name, 'accuracy': None, 'pos_accs': None}
+
+        if args.epochs > 0:
+            torch.manual_seed(42)  # 변형마다 같은 seed 로 초기화 (앞 변형의 학습이 초기 가중치에 영향 없음)
+            model = CBAM_MultiHead_V2(num_digits=NUM_DIGITS, num_classes=NUM_CLASSES, backbone=backbone)
+            acc, pos_accs, model = train_short(model, images, labels, train_idx, val_idx,
+                                               args.epochs, device)
+            row['accuracy'], row['pos_accs'] = acc, pos_accs
+            if args.save:
+                row['path'] = os.path.join(MODEL_DIR, f'cbam_multihead_v2_{name}.pth')
+                save_multihead(model, row['path'], val_acc=acc)
+        else:
+            model = CBAM_MultiHead_V2(backbone=backbone).eval()
+
+        row['backbone'] = model.backbone
+        row['parameters'] = sum(p.numel() for p in model.parameters())
+        row['latency_ms'] = measure_latency(model)
+        rows.append(row)
+
+        acc_str = f"{row['accuracy']*100:5.1f}%" if row['accuracy'] is not None else '    -'
+        print(f"  {name:20s} {row['parameters']:>10,} params  {row['latency_ms']:7.3f} ms  acc {acc_str}")
+
+    print_chart(rows)
+
+    front = pareto_front(rows)
+    print(f"\n{'변형':20s} {'파라미터':>10s} {'지연(ms)':>9s} {'정확도':>8s}  Pareto")
+    print("-" * 60)
+    for row in sorted(rows, key=lambda r: r['latency_ms']):
+        acc_str = f"{row['accuracy']*100:7.2f}%" if row['accuracy'] is not None else '       -'
+        mark = '  ★' if row['variant'] in front else ''
+        print(f"{row['variant']:20s} {row['parameters']:>10,} {row['latency_ms']:9.3f} {acc_str}{mark}")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f'backbones_{datetime.now():%Y%m%d_%H%M%S}.json')
+    with open(report_path, 'w') as f:
+        json.dump({'epochs': args.epochs, 'rows': rows, 'pareto': sorted(front)}, f, indent=2)
+    print(f"\n리포트 저장: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+SCOURT 형식 합성 캡챠 스트리밍 생성기
+
+data/captcha-training 의 API 캡챠와 같은 형식으로 6자리 숫자 캡챠를 즉석에서 렌더링한다.
+- 120x40 RGBA, RGB 는 검정, Alpha 에 글씨 + 1px 테두리 (captcha_image.preprocess 로 그대로 전처리)
+- 글씨: 고정 간격 6자리, 자리별 위치/회전/크기 jitter (폰트는 --fonts 또는 시스템 DejaVu)
+- 대각선 잡음: 굵은 2차 곡선 1~2개가 숫자를 가로지름
+- (lined, clean, label): clean 은 같은 글씨에서 잡음 선만 뺀 이미지 → 선 제거 U-Net 학습 쌍
+
+디스크에 미리 렌더링하지 않고 무한 stream 으로 공급:
+- synth_stream: 여러 worker 프로세스가 chunk 단위로 렌더링 → 크기 제한 큐
+- SyntheticCaptchaDataset: PyTorch IterableDataset (epoch, DataLoader worker 별로 다른 seed)
+- tf_pair_dataset: tf.data (lined, clean) 쌍 (train-line-removal-unet.py --synthetic)
+
+사용법:
+    python scripts/synthetic_captcha.py --preview ./temp/synth-preview --count 20
+    python scripts/synthetic_captcha.py --benchmark --workers 4
+
+    from synthetic_captcha import SyntheticCaptchaDataset
+    loader = DataLoader(SyntheticCaptchaDataset(img_size=(160, 50)), batch_size=32, num_workers=4)
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import multiprocessing as mp
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image, ImageDraw, ImageFont
+from torch.utils.data import IterableDataset, get_worker_info
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from captcha_image import IMG_WIDTH, IMG_HEIGHT, preprocess
+
+NUM_DIGITS = 6
+CANVAS_WIDTH = 120
+CANVAS_HEIGHT = 40
+SUPERSAMPLE = 2  # 2배로 그린 뒤 INTER_AREA 축소 → 선/글씨 가장자리 anti-aliasing
+
+FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+]
+
+# 길이/크기는 원본(120x40) 픽셀 기준. 실제 캡챠: 글자 간격 ~15.5px, 숫자 ~12x24px, 획/선 굵기 ~3px
+DEFAULT_CONFIG = {
+    'fonts': None,                 # None 이면 FONT_CANDIDATES 중 있는 것
+    'font_size': (30, 34),
+    'x_scale': (0.7, 0.8),         # 가로 압축 (실제 숫자가 일반 폰트보다 좁음)
+    'start_x': (6, 9),
+    'pitch': (15.0, 16.0),
+    'baseline_y': (4, 7),          # 숫자 윗변 위치
+    'jitter_xy': (1.0, 1.5),       # 자리별 x, y 흔들림 (±)
+    'rotation': 6.0,               # 자리별 회전 (±도)
+    'lines': (1, 2),
+    'line_width': (2.5, 4.0),
+    'line_curve': 8.0,             # 곡선 제어점 흔들림 (±px)
+    'frame': True,
+}
+
+
+def _find_fonts(fonts):
+    paths = [f for f in (fonts or FONT_CANDIDATES) if os.path.exists(f)]
+    if fonts and len(paths) < len(fonts):
+        missing = sorted(set(fonts) - set(paths))
+        raise FileNotFoundError(f"폰트 파일이 없습니다: {', '.join(missing)}")
+    return paths
+
+
+class CaptchaSynthesizer:
+    """seed 가 같으면 같은 순서의 캡챠를 렌더링 (worker 별 seed 로 재현 가능)"""
+
+    def __init__(self, seed=None, **config):
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"알 수 없는 설정: {', '.join(sorted(unknown))}")
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.rng = np.random.default_rng(seed)
+        self.font_paths = _find_fonts(self.config['fonts'])
+        self._fonts = {}
+
+    def _font(self, path, size):
+        key = (path, size)
+        if key not in self._fonts:
+            self._fonts[key] = (ImageFont.truetype(path, size) if path
+                                else ImageFont.load_default(size))
+        return self._fonts[key]
+
+    def _uniform(self, bounds):
+        return float(self.rng.uniform(*bounds))
+
+    def _digits(self, label):
+        """숫자만 그린 Alpha 평면 (SUPERSAMPLE 배 해상도, uint8)"""
+        c, s = self.config, SUPERSAMPLE
+        canvas = np.zeros((CANVAS_HEIGHT * s, CANVAS_WIDTH * s), dtype=np.uint8)
+        path = self.font_paths[self.rng.integers(len(self.font_paths))] if self.font_paths else None
+        font = self._font(path, int(round(self._uniform(c['font_size']) * s)))
+        x, pitch, top = self._uniform(c['start_x']), self._uniform(c['pitch']), self._uniform(c['baseline_y'])
+
+        for i, digit in enumerate(label):
+            left, upper, right, lower = font.getbbox(digit)
+            glyph = Image.new('L', (right - left + 8 * s, lower - upper + 8 * s), 0)
+            ImageDraw.Draw(glyph).text((4 * s - left, 4 * s - upper), digit, fill=255, font=font)
+            width = max(1, int(round(glyph.width * self._uniform(c['x_scale']))))
+            glyph = glyph.resize((width, glyph.height), resample=Image.BILINEAR)
+            right = left + (width - 8 * s)
+            if c['rotation']:
+                glyph = glyph.rotate(self._uniform((-c['rotation'], c['rotation'])),
+                                     resample=Image.BILINEAR, expand=True)
+            glyph = np.asarray(glyph)
+
+            gx = int(round((x + i * pitch + self._uniform((-c['jitter_xy'][0], c['jitter_xy'][0]))) * s))
+            gy = int(round((top + self._uniform((-c['jitter_xy'][1], c['jitter_xy'][1]))) * s))
+            gx -= (glyph.shape[1] - (right - left)) // 2
+            gy -= (glyph.shape[0] - (lower - upper)) // 2
+            _paste_max(canvas, glyph, gx, gy)
+        return canvas
+
+    def _noise_lines(self, shape):
+        """대각선 잡음 Alpha 평면 (SUPERSAMPLE 배 해상도)"""
+        c, s = self.config, SUPERSAMPLE
+        layer = Image.new('L', (shape[1], shape[0]), 0)
+        draw = ImageDraw.Draw(layer)
+        for _ in range(int(self.rng.integers(c['lines'][0], c['lines'][1] + 1))):
+            # 왼쪽 → 오른쪽으로 숫자 영역을 가로지르는 2차 Bezier
+            p0 = np.array([self._uniform((4, 40)), self._uniform((8, 36))])
+            p2 = np.array([self._uniform((80, 116)), self._uniform((8, 36))])
+            p1 = (p0 + p2) / 2 + self.rng.uniform(-c['line_curve'], c['line_curve'], 2)
+            t = np.linspace(0, 1, 24)[:, None]
+            points = (1 - t) ** 2 * p0 + 2 * (1 - t) * t * p1 + t ** 2 * p2
+            width = max(1, int(round(self._uniform(c['line_width']) * s)))
+            draw.line([tuple(p) for p in points * s], fill=255, width=width, joint='curve')
+        return np.asarray(layer)
+
+    def render(self, label=None):
+        """
+        Returns:
+            (lined, clean, label): (40, 120, 4) uint8 RGBA 두 장과 6자리 문자열
+        """
+        if label is None:
+            label = ''.join(map(str, self.rng.integers(0, 10, NUM_DIGITS)))
+        digits = self._digits(label)
+        lined = np.maximum(digits, self._noise_lines(digits.shape))
+        return _to_rgba(lined, self.config['frame']), _to_rgba(digits, self.config['frame']), label
+
+
+def _paste_max(canvas, glyph, x, y):
+    """canvas 범위 밖은 잘라서 max 합성"""
+    h, w = glyph.shape
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, canvas.shape[1]), min(y + h, canvas.shape[0])
+    if x0 < x1 and y0 < y1:
+        region = canvas[y0:y1, x0:x1]
+        np.maximum(region, glyph[y0 - y:y1 - y, x0 - x:x1 - x], out=region)
+
+
+def _to_rgba(alpha, frame):
+    """SUPERSAMPLE 배 Alpha → 원본 크기 RGBA (RGB 검정, API 캡챠와 같은 형식)"""
+    alpha = cv2.resize(alpha, (CANVAS_WIDTH, CANVAS_HEIGHT), interpolation=cv2.INTER_AREA)
+    if frame:
+        alpha[[0, -1], :] = 255
+        alpha[:, [0, -1]] = 255
+    rgba = np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH, 4), dtype=np.uint8)
+    rgba[:, :, 3] = alpha
+    return rgba
+
+
+# ============================================================
+# 스트림
+# ============================================================
+def _worker(out_queue, stop, seed, worker_id, chunk_size, config):
+    synth = CaptchaSynthesizer(seed=(seed, worker_id), **config)
+    while not stop.is_set():
+        chunk = [synth.render() for _ in range(chunk_size)]
+        while not stop.is_set():
+            try:
+                out_queue.put(chunk, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+
+
+def synth_stream(workers=None, seed=0, chunk_size=64, prefetch=8, **config):
+    """
+    무한 (lined, clean, label) stream
+
+    Args:
+        workers: 렌더링 프로세스 수 (0 이면 현재 프로세스에서 렌더링)
+        prefetch: 큐에 미리 쌓아둘 chunk 수 (메모리 상한)
+    """
+    workers = min(8, os.cpu_count() or 1) if workers is None else workers
+    if workers == 0:
+        synth = CaptchaSynthesizer(seed=seed, **config)
+        while True:
+            yield synth.render()
+
+    ctx = mp.get_context('spawn')
+    out_queue, stop = ctx.Queue(maxsize=prefetch), ctx.Event()
+    processes = [ctx.Process(target=_worker, args=(out_queue, stop, seed, i, chunk_size, config), daemon=True)
+                 for i in range(workers)]
+    for p in processes:
+        p.start()
+    try:
+        while True:
+            yield from out_queue.get()
+    finally:
+        stop.set()
+        for p in processes:
+            p.join(timeout=2)
+            if p.is_alive():
+                p.terminate()
+
+
+def to_planes(lined, clean, size=(CANVAS_WIDTH, CANVAS_HEIGHT)):
+    """RGBA 쌍 → 모델 입력과 같은 텍스트 평면 (H, W) float32 [0, 1] (글씨 0, 배경 1)"""
+    return preprocess(lined, size), preprocess(clean, size)
+
+
+
+class SyntheticCaptchaDataset(IterableDataset):
+    """
+    PyTorch 무한 합성 데이터셋. epoch(= __iter__ 호출)과 DataLoader worker 마다 다른 seed 로 렌더링.
+    (worker: DataLoader 가 epoch 마다 새로 뽑는 worker seed, num_workers=0: 호출 횟수)
+
+    target='digits': (lined (1, H, W), label (6,))           - CBAM_MultiHead_V2 / TinyMultiHead
+    target='clean':  (lined (1, H, W), clean (1, H, W))       - 선 제거 모델
+    """
+
+    def __init__(self, img_size=(IMG_WIDTH, IMG_HEIGHT), target='digits', seed=0, **config):
+        if target not in ('digits', 'clean'):
+            raise ValueError(f"target 은 'digits' 또는 'clean': {target}")
+        self.img_size = tuple(img_size)
+        self.target = target
+        self.seed = seed
+        self.config = config
+        self._iterations = 0
+
+    def __iter__(self):
+        info = get_worker_info()
+        if info is not None:
+            stream_seed = info.seed  # base_seed(epoch 마다 다름) + worker id
+        else:
+            stream_seed = self._iterations
+            self._iterations += 1
+        synth = CaptchaSynthesizer(seed=(self.seed, stream_seed), **self.config)
+        while True:
+            lined, clean, label = synth.render()
+            image = torch.from_numpy(preprocess(lined, self.img_size))[None]
+            if self.target == 'digits':
+                yield image, torch.tensor([int(c) for c in label], dtype=torch.long)
+            else:
+                yield image, torch.from_numpy(preprocess(clean, self.img_size))[None]
+
+
+def tf_pair_dataset(batch_size=32, workers=None, seed=0, size=(CANVAS_WIDTH, CANVAS_HEIGHT), **config):
+    """
+    tf.data 무한 (lined, clean) 배치, 각 (batch, H, W, 1) float32 - train-line-removal-unet.py 입력 형식
+    렌더링은 synth_stream 의 worker 프로세스에서 (tf.data 그래프 밖)
+    """
+    import tensorflow as tf
+
+    width, height = size
+
+    def generator():
+        for lined, clean, _ in synth_stream(workers=workers, seed=seed, **config):
+            x, y = to_planes(lined, clean, size)
+            yield x[..., None], y[..., None]
+
+    spec = tf.TensorSpec(shape=(height, width, 1), dtype=tf.float32)
+    dataset = tf.data.Dataset.from_generator(generator, output_signature=(spec, spec))
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SCOURT 형식 합성 캡챠 생성기')
+    parser.add_argument('--preview', default=None, help='샘플 PNG 저장 폴더 ({라벨}_{번호}.png, clean/ 하위)')
+    parser.add_argument('--count', type=int, default=20)
+    parser.add_argument('--benchmark', action='store_true', help='worker 수별 처리량 측정')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--fonts', nargs='*', default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("합성 캡챠 생성기")
+    print("=" * 60)
+
+    config = {'fonts': args.fonts} if args.fonts else {}
+    synth = CaptchaSynthesizer(seed=args.seed, **config)
+    print(f"폰트: {', '.join(synth.font_paths) or 'PIL 기본 폰트'}")
+
+    if args.preview:
+        os.makedirs(os.path.join(args.preview, 'clean'), exist_ok=True)
+        for i in range(args.count):
+            lined, clean, label = synth.render()
+            cv2.imwrite(os.path.join(args.preview, f'{label}_{i:03d}.png'), lined)
+            cv2.imwrite(os.path.join(args.preview, 'clean', f'{label}_{i:03d}.png'), clean)
+        print(f"미리보기 {args.count}개 저장: {args.preview}")
+
+    if args.benchmark:
+        counts = [0] + sorted({1, args.workers or min(8, os.cpu_count() or 1)})
+        print(f"\n{'workers':>8s} {'개/초':>10s}")
+        for workers in counts:
+            stream = synth_stream(workers=workers, seed=args.seed, **config)
+            for _ in range(64):  # 프로세스 시작 / 첫 chunk 제외
+                next(stream)
+            n, start = 2000, time.perf_counter()
+            for _ in range(n):
+                next(stream)
+            print(f"{workers:8d} {n / (time.perf_counter() - start):10.0f}")
+            stream.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
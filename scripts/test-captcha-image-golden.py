@@ -0,0 +1,154 @@
+"""
+captcha_image 전처리 Golden 테스트
+
+CBAM_MultiHead_V2 가 학습된 전처리(원래 train_multihead_v2.preprocess_image 의 PIL 구현)와
+captcha_image.preprocess 의 출력이 비트 단위로 동일한지 확인한다.
+
+학습 데이터는 전부 RGBA 이므로 RGB / L fixture 를 (흰 배경 합성으로) 따로 만들어 확인한다.
+- RGB / L 은 의도적으로 반전하지 않는다: preprocess(canonical=False) ≈ 1 - 원래 전처리
+  (PIL / cv2 grayscale 반올림 차이와 리사이즈 반올림으로 2/255 까지 허용)
+- to_gray 는 PIL convert('L') 과 ±1 이내
+
+사용법:
+    python scripts/test-captcha-image-golden.py [샘플 수]
+"""
+
+import os
+import sys
+import glob
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image as PILImage
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from captcha_image import (
+    preprocess, preprocess_batch, decode_image, render_on_white, to_gray, IMG_WIDTH, IMG_HEIGHT
+)
+
+DATA_DIR = "./data/captcha-training"
+
+
+def reference_preprocess(image_path):
+    """학습 당시 전처리 (train_multihead_v2.py 원본 그대로)"""
+    pil_img = PILImage.open(str(image_path))
+
+    if pil_img.mode == 'RGBA':
+        _, _, _, alpha = pil_img.split()
+        img = np.array(alpha)
+    elif pil_img.mode == 'LA':
+        _, alpha = pil_img.split()
+        img = np.array(alpha)
+    else:
+        img = np.array(pil_img.convert('L'))
+
+    inverted = 255 - img
+    resized = cv2.resize(inverted, (IMG_WIDTH, IMG_HEIGHT))
+    normalized = resized.astype(np.float32) / 255.0
+
+    return normalized
+
+
+def write_fixtures(paths, out_dir):
+    """RGBA 샘플 → 흰 배경 RGB / L PNG fixture 경로 {'RGB': [...], 'L': [...]}"""
+    fixtures = {'RGB': [], 'L': []}
+    rng = np.random.default_rng(0)
+    for path in paths:
+        name = os.path.basename(path)
+        img = decode_image(path).copy()
+        # 글씨에 임의의 색 (브라우저 캡챠처럼 채널마다 다른 값 → grayscale 반올림 차이가 드러남)
+        img[:, :, :3] = np.maximum(img[:, :, :3], rng.integers(0, 160, 3, dtype=np.uint8))
+        rgb = render_on_white(img)
+        rgb_path = os.path.join(out_dir, f'rgb_{name}')
+        cv2.imwrite(rgb_path, rgb)
+        l_path = os.path.join(out_dir, f'l_{name}')
+        PILImage.open(rgb_path).convert('L').save(l_path)
+        fixtures['RGB'].append(rgb_path)
+        fixtures['L'].append(l_path)
+    return fixtures
+
+
+def check_non_alpha(paths):
+    """RGB / L fixture 검사 → 실패 메시지 리스트"""
+    failures = []
+    tolerance = 2 / 255 + 1e-6
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fixtures = write_fixtures(paths, tmpdir)
+        for mode, fixture_paths in fixtures.items():
+            worst, gray_diff, gray_pixels = 0.0, 0, 0
+            for path in fixture_paths:
+                assert PILImage.open(path).mode == mode
+                inverted = 1.0 - reference_preprocess(path)
+                actual = preprocess(path, canonical=False)
+                worst = max(worst, float(np.abs(actual - inverted).max()))
+
+                diff = np.abs(to_gray(decode_image(path)).astype(int)
+                              - np.array(PILImage.open(path).convert('L')).astype(int))
+                if diff.max() > 1:
+                    failures.append(f"{mode} {os.path.basename(path)}: to_gray 차이 {diff.max()}")
+                gray_diff += int((diff > 0).sum())
+                gray_pixels += diff.size
+
+            batch = preprocess_batch(fixture_paths, canonical=False)
+            singles = np.stack([preprocess(p, canonical=False) for p in fixture_paths])[:, np.newaxis]
+            print(f"{mode:4s} fixture {len(fixture_paths)}개: 1 - 원래 전처리 대비 max diff {worst * 255:.1f}/255, "
+                  f"to_gray ≠ PIL 'L' {gray_diff / gray_pixels * 100:.2f}% 픽셀")
+            if worst > tolerance:
+                failures.append(f"{mode}: 반전하지 않은 평면과 max diff {worst * 255:.1f}/255")
+            if not np.array_equal(batch, singles):
+                failures.append(f"{mode}: 배치 전처리 불일치")
+    return failures
+
+
+def main():
+    print("=" * 60)
+    print("captcha_image Golden 테스트")
+    print("=" * 60)
+
+    max_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    paths = sorted(glob.glob(f"{DATA_DIR}/*.png"))[:max_samples]
+    if not paths:
+        print(f"데이터 폴더가 없습니다: {DATA_DIR}")
+        return 1
+
+    failures = []
+    modes = {}
+    for path in paths:
+        mode = PILImage.open(path).mode
+        modes[mode] = modes.get(mode, 0) + 1
+
+        expected = reference_preprocess(path)
+        with open(path, 'rb') as f:
+            from_bytes = preprocess(f.read())
+        from_path = preprocess(path)
+
+        for name, actual in (('bytes', from_bytes), ('path', from_path)):
+            if actual.dtype != expected.dtype or not np.array_equal(actual, expected):
+                diff = np.abs(actual.astype(np.float64) - expected).max()
+                failures.append((os.path.basename(path), name, diff))
+
+    # 배치 경로도 단일 경로와 동일해야 함
+    batch = preprocess_batch(paths)
+    singles = np.stack([reference_preprocess(p) for p in paths])[:, np.newaxis]
+    batch_ok = np.array_equal(batch, singles)
+
+    print(f"\n샘플: {len(paths)}개 {modes}")
+    print(f"단일 전처리 불일치: {len(failures)}개")
+    for name, kind, diff in failures[:10]:
+        print(f"  ❌ {name} ({kind}): max diff {diff:.6f}")
+    print(f"배치 전처리: {'✅ 일치' if batch_ok else '❌ 불일치'}")
+
+    rgba_paths = [p for p in paths if PILImage.open(p).mode == 'RGBA'][:50]
+    print()
+    non_alpha_failures = check_non_alpha(rgba_paths)
+    for message in non_alpha_failures:
+        print(f"  ❌ {message}")
+
+    ok = not failures and batch_ok and not non_alpha_failures
+    print(f"\n{'✅ PASS' if ok else '❌ FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
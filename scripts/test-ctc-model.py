@@ -1,16 +1,23 @@
 """
 CTC 모델 테스트 스크립트
 추론 모델로 정확도 측정 및 문제 분석
+
+--cleaned: U-Net 선 제거 캐시(unet_clean_cache.py)로 평가
 """
 
 import os
+import sys
 import glob
+import time
 import numpy as np
 from PIL import Image
-import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ctc_decoder import ctc_greedy_decode, ctc_beam_search_fixed_length
+from evaluate_captcha import texts_to_digits, count_metrics, summarize
+
 # 설정
 MODEL_PATH = "./data/captcha-model/captcha_ctc_inference.keras"
 DATA_DIR = "./data/captcha-training"
@@ -28,21 +35,22 @@ num_to_char = layers.StringLookup(
 
 
 def decode_batch_predictions(pred):
-    """CTC 디코딩 (Greedy Search)"""
-    input_len = np.ones(pred.shape[0]) * pred.shape[1]
+    """CTC 디코딩 (Greedy Search)
 
-    # CTC decode
-    results = keras.backend.ctc_decode(pred, input_length=input_len, greedy=True)[0][0]
-    results = results[:, :MAX_LENGTH]
+    StringLookup 레이아웃: [UNK]=0, '0'-'9'=1-10, blank=마지막 클래스
+    """
+    output_text, _ = ctc_greedy_decode(
+        pred, blank_index=-1, vocab_offset=1, characters=CHARACTERS, max_length=MAX_LENGTH
+    )
+    return output_text
 
-    # 숫자 → 문자 변환
-    output_text = []
-    for res in results:
-        res = tf.strings.reduce_join(num_to_char(res)).numpy().decode("utf-8")
-        res = res.replace("[UNK]", "")
-        output_text.append(res)
 
-    return output_text
+def decode_batch_beam_search(pred, beam_width=16, top_k=3):
+    """CTC 디코딩 (6자리 고정 Beam Search)"""
+    return ctc_beam_search_fixed_length(
+        pred, length=MAX_LENGTH, beam_width=beam_width, top_k=top_k,
+        blank_index=-1, vocab_offset=1, characters=CHARACTERS
+    )
 
 
 def load_test_data(data_dir, max_samples=None):
@@ -95,51 +103,33 @@ def analyze_predictions(model, images, labels, num_samples=200):
     # CTC 디코딩
     pred_texts = decode_batch_predictions(preds)
 
-    # 정확도 계산
-    correct = 0
-    char_correct = [0] * MAX_LENGTH
-    confusion = {}
-    wrong_samples = []
-
-    for pred, true in zip(pred_texts, test_labels):
-        if pred == true:
-            correct += 1
-        else:
-            wrong_samples.append((true, pred))
-
-        # 자리별 분석
-        for i in range(min(len(pred), len(true), MAX_LENGTH)):
-            if i < len(pred) and i < len(true):
-                if pred[i] == true[i]:
-                    char_correct[i] += 1
-                else:
-                    key = f"{true[i]}→{pred[i]}"
-                    confusion[key] = confusion.get(key, 0) + 1
+    # 정확도 계산 (evaluate_captcha 와 같은 배열 연산 지표)
+    digits = texts_to_digits(pred_texts)
+    counts, exact = count_metrics(digits, texts_to_digits(test_labels, MAX_LENGTH))
+    summary = summarize(counts)
+    correct = counts['correct']
+    wrong_samples = [(test_labels[i], pred_texts[i]) for i in np.flatnonzero(~exact)]
 
     # 결과 출력
     accuracy = correct / num_samples * 100
     print(f"\n전체 정확도: {correct}/{num_samples} ({accuracy:.1f}%)")
 
     print(f"\n자리별 정확도:")
-    for i in range(MAX_LENGTH):
-        char_acc = char_correct[i] / num_samples * 100
+    for i, char_acc in enumerate(summary['position_accuracy']):
+        char_acc *= 100
         bar = '█' * int(char_acc // 5) + '░' * (20 - int(char_acc // 5))
         print(f"  {i+1}번째 자리: {bar} {char_acc:.1f}%")
 
     # 예측 길이 분포
-    pred_lengths = [len(p) for p in pred_texts]
     print(f"\n예측 길이 분포:")
-    for length in range(0, 10):
-        count = pred_lengths.count(length)
-        if count > 0:
-            print(f"  길이 {length}: {count}개 ({count/len(pred_lengths)*100:.1f}%)")
+    for length, count in summary['length_distribution'].items():
+        print(f"  길이 {length}: {count}개 ({count/num_samples*100:.1f}%)")
 
     # 상위 혼동 패턴
-    if confusion:
+    if summary['top_confusions']:
         print(f"\n주요 혼동 패턴 (상위 15개):")
-        sorted_confusion = sorted(confusion.items(), key=lambda x: x[1], reverse=True)[:15]
-        for pattern, count in sorted_confusion:
-            print(f"  {pattern}: {count}회")
+        for c in summary['top_confusions']:
+            print(f"  {c['true']}→{c['pred']}: {c['count']}회")
 
     # 틀린 샘플 예시
     if wrong_samples:
@@ -160,9 +150,49 @@ def analyze_predictions(model, images, labels, num_samples=200):
             probs = [f"{num_to_char(idx).numpy().decode('utf-8')}({pred[t][idx]:.2f})" for idx in top_indices]
             print(f"    t={t}: {', '.join(probs)}")
 
+    compare_greedy_and_beam(preds, test_labels, pred_texts)
+
     return accuracy
 
 
+def compare_greedy_and_beam(preds, labels, greedy_texts, beam_width=16, top_k=3):
+    """Greedy vs 6자리 고정 Beam Search 비교"""
+    print(f"\n{'='*60}")
+    print(f"Greedy vs 6자리 Beam Search (beam={beam_width}, top-{top_k})")
+    print(f"{'='*60}")
+
+    start = time.perf_counter()
+    beam_texts, beam_scores = decode_batch_beam_search(preds, beam_width, top_k)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    # 요청 1건 기준 지연 (샘플 하나씩 디코딩)
+    single_runs = min(20, len(preds))
+    start = time.perf_counter()
+    for i in range(single_runs):
+        decode_batch_beam_search(preds[i:i + 1], beam_width, top_k)
+    single_ms = (time.perf_counter() - start) * 1000 / max(single_runs, 1)
+
+    labels = np.array(labels)
+    greedy = np.array(greedy_texts)
+    beam_top1 = np.array([c[0] if c else '' for c in beam_texts])
+    beam_topk = np.array([label in c for label, c in zip(labels, beam_texts)])
+
+    greedy_ok = greedy == labels
+    beam_ok = beam_top1 == labels
+    wrong_length = np.array([len(t) != MAX_LENGTH for t in greedy_texts])
+
+    total = len(labels)
+    print(f"\n  Greedy 정확도:      {greedy_ok.sum()}/{total} ({greedy_ok.mean()*100:.1f}%)")
+    print(f"  Beam top-1 정확도:  {beam_ok.sum()}/{total} ({beam_ok.mean()*100:.1f}%)")
+    print(f"  Beam top-{top_k} 포함:    {beam_topk.sum()}/{total} ({beam_topk.mean()*100:.1f}%)")
+    print(f"\n  Greedy 길이 오류: {wrong_length.sum()}개 → Beam 으로 정답: {(wrong_length & beam_ok).sum()}개")
+    print(f"  Greedy 정답 → Beam 오답: {(greedy_ok & ~beam_ok).sum()}개")
+    print(f"\n  디코딩 시간: 배치 {batch_ms:.1f}ms ({batch_ms/total:.2f}ms/샘플), "
+          f"단일 요청 {single_ms:.2f}ms")
+
+    return beam_ok.mean() * 100
+
+
 def main():
     print("=" * 60)
     print("CTC 모델 테스트")
@@ -174,8 +204,14 @@ def main():
     model.summary()
 
     # 데이터 로드
-    print(f"\n데이터 로드: {DATA_DIR}")
-    images, labels = load_test_data(DATA_DIR)
+    if '--cleaned' in sys.argv:
+        from unet_clean_cache import load_cache, to_model_input
+        print("\nU-Net 선 제거 캐시 로드")
+        cached, labels = load_cache()
+        images = to_model_input(cached)
+    else:
+        print(f"\n데이터 로드: {DATA_DIR}")
+        images, labels = load_test_data(DATA_DIR)
     print(f"총 {len(images)}개 이미지")
 
     # 테스트
@@ -0,0 +1,129 @@
+"""
+NumPy 추론 엔진 parity 테스트
+
+CBAM_MultiHead_V2 (torch) 와 numpy_inference.NumpyCBAMMultiHead 의 출력을 비교한다.
+- 학습된 모델(.pth)이 있으면 그 가중치, 없으면 BN 통계를 무작위로 채운 모델 사용
+- 랜덤 입력 + 실제 캡챠 이미지로 logits 최대 오차와 예측 일치율 확인
+- BACKBONE_VARIANTS 의 모든 backbone spec 도 랜덤 입력으로 확인
+- 단일 이미지 추론 시간 비교
+
+사용법:
+    python scripts/test-numpy-inference.py [model.pth]
+"""
+
+import os
+import sys
+import glob
+import time
+import tempfile
+import subprocess
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cbam_multihead_v2 import CBAM_MultiHead_V2, BACKBONE_VARIANTS, load_multihead
+from numpy_inference import NumpyCBAMMultiHead, export_weights, MODEL_PATH
+from captcha_image import preprocess_batch
+
+DATA_DIR = "./data/captcha-training"
+TOLERANCE = 1e-3
+
+
+def random_model(backbone=None):
+    """BN folding 이 실제로 검증되도록 BN 통계를 채운 무작위 모델"""
+    torch.manual_seed(0)
+    model = CBAM_MultiHead_V2(backbone=backbone)
+    for m in model.modules():
+        if isinstance(m, torch.nn.BatchNorm2d):
+            m.running_mean.uniform_(-0.5, 0.5)
+            m.running_var.uniform_(0.5, 2.0)
+            m.weight.data.uniform_(0.5, 1.5)
+            m.bias.data.uniform_(-0.2, 0.2)
+    return model.eval()
+
+
+def build_reference_model(pth_path):
+    """비교 기준 torch 모델"""
+    if os.path.exists(pth_path):
+        print(f"모델: {pth_path}")
+        return load_multihead(pth_path)
+    print("모델: 무작위 초기화 (학습된 .pth 없음)")
+    return random_model()
+
+
+def compare(model, engine, x):
+    """(logits 최대 오차, 예측 일치율)"""
+    with torch.no_grad():
+        expected = torch.stack(model(torch.from_numpy(x)), dim=1).numpy()
+    actual = engine.forward(x)
+    return np.abs(actual - expected).max(), (actual.argmax(-1) == expected.argmax(-1)).mean()
+
+
+def time_single(fn, x, runs=50):
+    fn(x)  # warm-up
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(x)
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def time_import(module):
+    """새 프로세스에서 import 시간 (ms)"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f'import {module}'], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print("=" * 60)
+    print("NumPy 추론 엔진 Parity 테스트")
+    print("=" * 60)
+
+    pth_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    model = build_reference_model(pth_path)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        npz_path = export_weights(model, os.path.join(tmpdir, 'model.npz'))
+        engine = NumpyCBAMMultiHead(npz_path)
+
+    inputs = [('random', np.random.rand(16, 1, 50, 160).astype(np.float32))]
+    paths = sorted(glob.glob(f"{DATA_DIR}/*.png"))[:64]
+    if paths:
+        inputs.append(('captcha', preprocess_batch(paths)))
+
+    ok = True
+    for name, x in inputs:
+        max_diff, agree = compare(model, engine, x)
+        passed = max_diff < TOLERANCE and agree == 1.0
+        ok &= passed
+        print(f"\n  [{name}] {len(x)}개: logits 최대 오차 {max_diff:.2e}, "
+              f"예측 일치 {agree*100:.1f}% {'✅' if passed else '❌'}")
+
+    # backbone 변형
+    print("\n  backbone 변형:")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, spec in BACKBONE_VARIANTS.items():
+            variant = random_model(spec)
+            variant_engine = NumpyCBAMMultiHead(export_weights(variant, os.path.join(tmpdir, f'{name}.npz')))
+            max_diff, agree = compare(variant, variant_engine, inputs[0][1])
+            passed = max_diff < TOLERANCE and agree == 1.0
+            ok &= passed
+            print(f"    {name:20s} 최대 오차 {max_diff:.2e}, 일치 {agree*100:.1f}% {'✅' if passed else '❌'}")
+
+    # 단일 이미지 지연
+    single = inputs[-1][1][:1]
+    torch.set_num_threads(1)
+    with torch.no_grad():
+        torch_ms = time_single(lambda t: model(t), torch.from_numpy(single))
+    numpy_ms = time_single(engine.forward, single)
+    print(f"\n  단일 이미지: torch {torch_ms:.2f}ms, numpy {numpy_ms:.2f}ms")
+    print(f"  프로세스 시작 + import: torch {time_import('torch'):.0f}ms, "
+          f"numpy {time_import('numpy'):.0f}ms")
+
+    print(f"\n{'✅ PASS' if ok else '❌ FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+CaptchaPreprocessor.process_batch 일치 테스트
+
+process_batch 가 같은 입력의 process 결과를 쌓은 것과 비트 단위로 동일한지 확인한다.
+입력 형식: 파일 경로, decode_image 배열(BGRA / BGR / gray uint8), float32 gray [0, 1], PIL 이미지
+
+사용법:
+    python scripts/test-preprocess-batch.py [샘플 수]
+"""
+
+import os
+import sys
+import glob
+
+import numpy as np
+import torch
+from PIL import Image as PILImage
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from captcha_image import decode_image, to_gray
+from preprocess_v2 import CaptchaPreprocessor
+
+DATA_DIR = "./data/captcha-training"
+
+
+def make_inputs(paths):
+    """입력 형식 이름 → 입력 리스트"""
+    decoded = [decode_image(p) for p in paths]
+    return {
+        'path': paths,
+        'ndarray_bgra': decoded,
+        'ndarray_bgr': [img[:, :, :3].copy() for img in decoded],
+        'ndarray_gray': [to_gray(img) for img in decoded],
+        'ndarray_float': [to_gray(img).astype(np.float32) / 255.0 for img in decoded],
+        'pil': [PILImage.open(p) for p in paths],
+    }
+
+
+def main():
+    print("=" * 60)
+    print("process_batch 일치 테스트")
+    print("=" * 60)
+
+    max_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    paths = sorted(glob.glob(f"{DATA_DIR}/*.png"))[:max_samples]
+    if not paths:
+        print(f"데이터 폴더가 없습니다: {DATA_DIR}")
+        return 1
+
+    inputs = make_inputs(paths)
+    failures = []
+    for config in (dict(source='gray', use_morphology=False), dict(source='gray', use_morphology=True),
+                   dict(source='alpha', use_morphology=False)):
+        preprocessor = CaptchaPreprocessor(**config)
+        for kind, items in inputs.items():
+            expected = torch.stack([preprocessor.process(item) for item in items])
+            for workers in (1, 4):
+                actual = preprocessor.process_batch(items, num_workers=workers)
+                if actual.shape != expected.shape or not torch.equal(actual, expected):
+                    failures.append((config, kind, workers))
+
+    print(f"\n샘플: {len(paths)}개, 입력 형식: {', '.join(inputs)}")
+    for config, kind, workers in failures:
+        print(f"  ❌ {config} {kind} (workers={workers})")
+
+    ok = not failures
+    print(f"\n{'✅ PASS' if ok else '❌ FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
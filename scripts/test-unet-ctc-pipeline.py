@@ -1,5 +1,8 @@
 """
 U-Net + CTC 모델 통합 테스트
+
+unet_ctc_fused.py 로 만든 통합 모델을 사용한다.
+(통합 모델 파일이 없으면 두 모델을 불러와 메모리에서 합성)
 """
 
 import os
@@ -9,75 +12,58 @@ from PIL import Image
 import tensorflow as tf
 from tensorflow import keras
 
-keras.config.enable_unsafe_deserialization()
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from unet_ctc_fused import (
+    UNET_PATH, CTC_PATH, FUSED_PATH,
+    build_fused_model, load_fused_model, digits_to_strings
+)
+from unet_clean_cache import load_image
 
-# 모델 경로
-UNET_PATH = "./data/captcha-model/line_removal_unet_best.keras"
-CTC_PATH = "./data/captcha-model/captcha_ctc_inference.keras"
+keras.config.enable_unsafe_deserialization()
 
 # 설정
-IMG_WIDTH = 120
-IMG_HEIGHT = 40
 CHARACTERS = "0123456789 -"  # CTC blank 포함
 
 
 def load_models():
-    """모델 로드"""
+    """통합 모델 로드"""
     print("모델 로딩 중...")
-    unet = keras.models.load_model(UNET_PATH, compile=False)
-    ctc = keras.models.load_model(CTC_PATH, compile=False)
+    if os.path.exists(FUSED_PATH):
+        model = load_fused_model(FUSED_PATH)
+    else:
+        unet = keras.models.load_model(UNET_PATH, compile=False)
+        ctc = keras.models.load_model(CTC_PATH, compile=False)
+        model = build_fused_model(unet, ctc)
     print("✅ 모델 로딩 완료")
-    return unet, ctc
+    return model
 
 
 def preprocess(image_path):
-    """이미지 전처리"""
-    img = Image.open(image_path).convert('L')
-    img = img.resize((IMG_WIDTH, IMG_HEIGHT))
-    img_array = np.array(img) / 255.0
+    """이미지 전처리 (UNET_PATH 의 입력 형식, unet_clean_cache.load_image)"""
+    img_array = load_image(image_path, UNET_PATH) / 255.0
     return img_array[np.newaxis, ..., np.newaxis].astype(np.float32)
 
 
-def ctc_decode(prediction):
-    """CTC 디코딩"""
-    # Greedy decoding
-    pred_indices = np.argmax(prediction[0], axis=-1)
-
-    # 중복 제거 및 blank 제거 (마지막 인덱스가 blank)
-    result = []
-    prev = -1
-    blank_idx = 10  # 0-9 다음이 blank
-
-    for idx in pred_indices:
-        if idx != prev and idx < blank_idx:
-            result.append(str(idx))
-        prev = idx
-
-    return ''.join(result)
-
-
-def predict(unet, ctc, image_path):
-    """예측 실행"""
-    # 전처리
+def predict(model, image_path):
+    """예측 실행 (선 제거 → 인식 → 디코딩을 한 번에)"""
     img = preprocess(image_path)
+    outputs = model.predict(img, verbose=0)
+    result = digits_to_strings(outputs['digits'])[0]
+    return result, outputs['cleaned'][0, :, :, 0]
 
-    # U-Net으로 선 제거
-    cleaned = unet.predict(img, verbose=0)
-
-    # CTC 모델로 인식
-    pred = ctc.predict(cleaned, verbose=0)
 
-    # 디코딩
-    result = ctc_decode(pred)
-
-    return result, cleaned[0, :, :, 0]
+def predict_batch(model, image_paths, batch_size=256):
+    """배치 예측"""
+    images = np.concatenate([preprocess(p) for p in image_paths])
+    outputs = model.predict(images, batch_size=batch_size, verbose=0)
+    return digits_to_strings(outputs['digits'])
 
 
 def test_with_samples():
     """샘플 이미지로 테스트"""
     import glob
 
-    unet, ctc = load_models()
+    model = load_models()
 
     # 테스트 이미지 찾기
     test_images = glob.glob("data/captcha-training/*.png")[:10]
@@ -89,14 +75,13 @@ def test_with_samples():
     print(f"\n{len(test_images)}개 샘플 테스트:")
     print("-" * 50)
 
+    preds = predict_batch(model, test_images)
+
     correct = 0
-    for img_path in test_images:
+    for img_path, pred in zip(test_images, preds):
         # 파일명에서 정답 추출
         label = os.path.basename(img_path).split('.')[0]
 
-        # 예측
-        pred, _ = predict(unet, ctc, img_path)
-
         # 결과
         match = "✅" if pred == label else "❌"
         if pred == label:
@@ -109,8 +94,8 @@ def test_with_samples():
 
 def test_single(image_path):
     """단일 이미지 테스트"""
-    unet, ctc = load_models()
-    result, cleaned = predict(unet, ctc, image_path)
+    model = load_models()
+    result, cleaned = predict(model, image_path)
     print(f"인식 결과: {result}")
 
     # 정리된 이미지 저장
@@ -1,8 +1,11 @@
 """
 실제 캡차 데이터로 처음부터 학습 (From Scratch)
+
+--cleaned: U-Net 선 제거 캐시(unet_clean_cache.py)로 학습
 """
 
 import os
+import sys
 import glob
 import numpy as np
 from PIL import Image
@@ -24,6 +27,8 @@ EPOCHS = 100
 CHARACTERS = "0123456789"
 char_to_num = {char: i for i, char in enumerate(CHARACTERS)}
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
 
 # 커스텀 레이어
 class ChannelAvgPool(layers.Layer):
@@ -161,6 +166,13 @@ def load_data():
     return images, labels
 
 
+def load_cleaned_data():
+    """U-Net 선 제거 캐시에서 로드 (U-Net 재실행 없음)"""
+    from unet_clean_cache import load_cache, to_model_input
+    images, labels = load_cache()
+    return to_model_input(images), labels
+
+
 def encode_labels(labels):
     encoded = []
     for label in labels:
@@ -175,8 +187,12 @@ def main():
     print("=" * 60)
 
     # 데이터 로드
-    print(f"\n실제 데이터 로드: {REAL_DATA_DIR}")
-    images, labels = load_data()
+    if '--cleaned' in sys.argv:
+        print("\nU-Net 선 제거 캐시 로드")
+        images, labels = load_cleaned_data()
+    else:
+        print(f"\n실제 데이터 로드: {REAL_DATA_DIR}")
+        images, labels = load_data()
     print(f"총 {len(images)}개 이미지")
 
     # 데이터 분할
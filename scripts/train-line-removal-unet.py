@@ -5,16 +5,27 @@ U-Net 기반 선 제거 모델
 출력: 깨끗한 CAPTCHA (40x120x1)
 
 Loss: L1 + SSIM (구조적 유사도)
+
+--synthetic: captcha-pairs 폴더 대신 synthetic_captcha.py 가 (대각선 있는, 깨끗한) 쌍을 무한 생성
+    (worker 프로세스 렌더링 → tf.data, 검증은 다른 seed 로 고정 생성)
+    입력이 captcha_image.preprocess 평면(배경 1, 글씨 0)이라 PIL 'L' 입력 모델과 섞이지 않도록
+    line_removal_unet_synthetic_*.keras 로 따로 저장
+체크포인트마다 입력 형식을 {이름}.json sidecar 로 저장 (unet_clean_cache.load_image 가 읽어 선택)
 """
 
 import os
+import sys
 import glob
+import argparse
 import numpy as np
 from PIL import Image
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers, Model
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from unet_clean_cache import save_unet_meta
+
 # 설정
 CLEAN_DIR = "./data/captcha-pairs/clean"
 LINED_DIR = "./data/captcha-pairs/lined"
@@ -148,30 +159,55 @@ class CombinedLoss(keras.losses.Loss):
         return self.alpha * l1 + (1 - self.alpha) * ssim_loss
 
 
+def load_synthetic_pairs(count, seed):
+    """합성 (대각선, 깨끗한) 쌍을 한 번에 생성 (검증용 고정 세트)"""
+    from synthetic_captcha import CaptchaSynthesizer, to_planes
+
+    synth = CaptchaSynthesizer(seed=seed)
+    pairs = [to_planes(*synth.render()[:2], (IMG_WIDTH, IMG_HEIGHT)) for _ in range(count)]
+    X = np.stack([lined for lined, _ in pairs])[..., np.newaxis]
+    Y = np.stack([clean for _, clean in pairs])[..., np.newaxis]
+    return X, Y
+
+
 def main():
+    parser = argparse.ArgumentParser(description='U-Net 선 제거 모델 학습')
+    parser.add_argument('--synthetic', action='store_true', help='합성 쌍 무한 stream 으로 학습')
+    parser.add_argument('--steps-per-epoch', type=int, default=200, help='--synthetic 의 epoch 당 배치 수')
+    parser.add_argument('--val-size', type=int, default=1000, help='--synthetic 검증 쌍 개수')
+    parser.add_argument('--workers', type=int, default=None, help='--synthetic 렌더링 프로세스 수')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("U-Net Line Removal Model Training")
     print("=" * 60)
 
     # 데이터 로드
     print("\n데이터 로드 중...")
-    X, Y = load_pair_data(CLEAN_DIR, LINED_DIR)
-    print(f"총 {len(X)}개 쌍 데이터")
-    print(f"입력 shape: {X.shape}")
-    print(f"출력 shape: {Y.shape}")
+    if args.synthetic:
+        from synthetic_captcha import tf_pair_dataset
 
-    # 데이터 분할
-    np.random.seed(42)
-    indices = np.random.permutation(len(X))
-    split_idx = int(len(X) * 0.9)
+        train_data = tf_pair_dataset(BATCH_SIZE, workers=args.workers, seed=0, size=(IMG_WIDTH, IMG_HEIGHT))
+        X_val, Y_val = load_synthetic_pairs(args.val_size, seed=1)
+        print(f"합성 쌍 stream: epoch 당 {args.steps_per_epoch * BATCH_SIZE}개, 검증: {len(X_val)}개")
+    else:
+        X, Y = load_pair_data(CLEAN_DIR, LINED_DIR)
+        print(f"총 {len(X)}개 쌍 데이터")
+        print(f"입력 shape: {X.shape}")
+        print(f"출력 shape: {Y.shape}")
 
-    train_idx = indices[:split_idx]
-    val_idx = indices[split_idx:]
+        # 데이터 분할
+        np.random.seed(42)
+        indices = np.random.permutation(len(X))
+        split_idx = int(len(X) * 0.9)
 
-    X_train, Y_train = X[train_idx], Y[train_idx]
-    X_val, Y_val = X[val_idx], Y[val_idx]
+        train_idx = indices[:split_idx]
+        val_idx = indices[split_idx:]
 
-    print(f"학습: {len(X_train)}개, 검증: {len(X_val)}개")
+        X_train, Y_train = X[train_idx], Y[train_idx]
+        X_val, Y_val = X[val_idx], Y[val_idx]
+
+        print(f"학습: {len(X_train)}개, 검증: {len(X_val)}개")
 
     # 모델 빌드
     print("\n모델 빌드 중...")
@@ -185,6 +221,12 @@ def main():
         metrics=['mae']
     )
 
+    # --synthetic 은 입력 형식이 달라 기본 체크포인트를 덮어쓰지 않음
+    name = 'line_removal_unet_synthetic' if args.synthetic else 'line_removal_unet'
+    input_format = 'preprocess' if args.synthetic else 'pil_l'
+    for suffix in ('best', 'final'):
+        save_unet_meta(f"{MODEL_DIR}/{name}_{suffix}.keras", input_format)
+
     # 콜백
     callbacks = [
         keras.callbacks.EarlyStopping(
@@ -201,7 +243,7 @@ def main():
             verbose=1
         ),
         keras.callbacks.ModelCheckpoint(
-            f"{MODEL_DIR}/line_removal_unet_best.keras",
+            f"{MODEL_DIR}/{name}_best.keras",
             monitor='val_loss',
             save_best_only=True,
             verbose=1
@@ -213,18 +255,28 @@ def main():
     print(f"학습 시작 (최대 {EPOCHS} epochs)")
     print("=" * 60)
 
-    history = model.fit(
-        X_train, Y_train,
-        validation_data=(X_val, Y_val),
-        batch_size=BATCH_SIZE,
-        epochs=EPOCHS,
-        callbacks=callbacks,
-        verbose=1
-    )
+    if args.synthetic:
+        history = model.fit(
+            train_data,
+            steps_per_epoch=args.steps_per_epoch,
+            validation_data=(X_val, Y_val),
+            epochs=EPOCHS,
+            callbacks=callbacks,
+            verbose=1
+        )
+    else:
+        history = model.fit(
+            X_train, Y_train,
+            validation_data=(X_val, Y_val),
+            batch_size=BATCH_SIZE,
+            epochs=EPOCHS,
+            callbacks=callbacks,
+            verbose=1
+        )
 
     # 최종 모델 저장
-    model.save(f"{MODEL_DIR}/line_removal_unet_final.keras")
-    print(f"\n모델 저장 완료: {MODEL_DIR}/line_removal_unet_final.keras")
+    model.save(f"{MODEL_DIR}/{name}_final.keras")
+    print(f"\n모델 저장 완료: {MODEL_DIR}/{name}_final.keras")
 
     # 검증 성능
     print("\n" + "=" * 60)
@@ -1,26 +1,44 @@
 """
 CBAM Multi-Head V2 학습 스크립트
 Position-Aware Pooling 모델 - 실제 데이터만 사용
+
+입력 해상도(--img-size, 기본 160x50)는 전처리·데이터셋 캐시·체크포인트 config 에 함께 기록된다.
+
+Domain 혼합 학습 (--rgb-dirs / --synth-rgb):
+- 'rgba' (API 응답 캡챠, 기본 학습 데이터) + 'rgb' (브라우저 화면 캡챠) 를 함께 학습
+- 전처리는 domain 별 (captcha_image.preprocess: RGBA 는 Alpha 반전, RGB 는 canonicalize 로 같은 텍스트 평면)
+- 배치의 domain 비율이 같도록 샘플링, 검증 정확도는 domain 별로 따로 보고
+- --synth-rgb: RGBA 학습 데이터를 흰 배경에 합성해 RGB 샘플 생성 (원본과 같은 split 에 배치)
+- 결과는 model_info.json 에 기록 → captcha-solver.ts 가 RGB 정확도 기준을 넘으면 Vision API 대신 모델 사용
+
+Hard example mining (--hard-mining):
+- 샘플별 loss(EMA)와 틀린 자리 수로 어려운 캡챠를 더 자주 뽑고, 학습 후반으로 갈수록 uniform 으로
+- 비교: scripts/benchmark-curriculum.py --runs baseline hard-mining (uniform 대비 목표 정확도 도달 epoch/시간)
 """
 
 import os
 import sys
 import json
 import time
+import hashlib
 from pathlib import Path
 from datetime import datetime
 
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
-from PIL import Image as PILImage
+from torch.utils.data import Dataset, DataLoader, TensorDataset, Subset, Sampler, WeightedRandomSampler
 import numpy as np
-import cv2
 
 # 프로젝트 경로 추가
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from cbam_multihead_v2 import CBAM_MultiHead_V2, MultiHeadLoss, calculate_accuracy, decode_predictions
+from cbam_multihead_v2 import (
+    CBAM_MultiHead_V2, MultiHeadLoss, calculate_accuracy, decode_predictions, save_multihead
+)
+from captcha_image import (
+    DOMAINS, preprocess, preprocess_batch, decode_image, has_alpha, image_domain, labeled_files,
+    render_on_white
+)
 
 # ============================================================
 # 설정
@@ -31,67 +49,290 @@ NUM_CLASSES = 10
 NUM_DIGITS = 6
 BATCH_SIZE = 32
 
+# 검증 split (validation_mask): 학습과 보정/가지치기/cascade 등 모든 도구가 같은 검증 샘플을 쓴다
+VAL_RATIO = 0.15
+SPLIT_SEED = 42
+
 DATA_DIR = './data/captcha-training'
 MODEL_DIR = './data/captcha-model'
 CHECKPOINT_DIR = os.path.join(MODEL_DIR, 'checkpoints')
+REPORT_DIR = os.path.join(MODEL_DIR, 'benchmarks')
+MODEL_INFO_PATH = os.path.join(MODEL_DIR, 'model_info.json')
+
+# Progressive resizing: 학습 초반은 저해상도 + 큰 배치로 숫자 윤곽을 빠르게 학습하고
+# 목표 해상도로 올라간다. until 은 전체 epoch 대비 비율 (마지막 단계는 항상 목표 해상도).
+PROGRESSIVE_SCHEDULE = [
+    {'until': 0.3, 'img_size': (80, 24), 'batch_size': 128},
+    {'until': 0.6, 'img_size': (120, 40), 'batch_size': 64},
+    {'until': 1.0, 'img_size': (IMG_WIDTH, IMG_HEIGHT), 'batch_size': BATCH_SIZE},
+]
+
+# Hard example mining (HardExampleSampler)
+HARD_MINING = {
+    'momentum': 0.5,       # 샘플별 loss EMA (뽑힐 때마다 갱신)
+    'error_boost': 0.5,    # 틀린 자리 하나당 난이도 +50%
+    'max_ratio': 5.0,      # 한 샘플의 확률은 uniform 의 5배까지 (라벨 오류 샘플 독점 방지)
+    'anneal_until': 0.8,   # 전체 epoch 대비 이 비율에서 uniform 으로
+}
 
 
 # ============================================================
 # 전처리 함수 (Alpha 채널 추출)
 # ============================================================
-def preprocess_image(image_path):
-    """이미지 전처리 - Alpha 채널에서 글씨 추출"""
-    pil_img = PILImage.open(str(image_path))
-
-    if pil_img.mode == 'RGBA':
-        # Alpha 채널 추출 (글씨가 여기 저장됨)
-        _, _, _, alpha = pil_img.split()
-        img = np.array(alpha)
-    elif pil_img.mode == 'LA':
-        # Grayscale + Alpha
-        _, alpha = pil_img.split()
-        img = np.array(alpha)
+def preprocess_image(image_path, img_size=(IMG_WIDTH, IMG_HEIGHT)):
+    """이미지 전처리 - Alpha 채널에서 글씨 추출 (captcha_image.preprocess 와 동일)"""
+    return preprocess(image_path, img_size)
+
+
+def progressive_phase(schedule, epoch, epochs, img_size=(IMG_WIDTH, IMG_HEIGHT)):
+    """epoch (1부터) 에 해당하는 (img_size, batch_size). 마지막 단계는 목표 해상도로 고정"""
+    progress = (epoch - 1) / epochs
+    for i, phase in enumerate(schedule):
+        if progress < phase['until'] or i == len(schedule) - 1:
+            size = tuple(img_size) if i == len(schedule) - 1 else tuple(phase['img_size'])
+            return size, phase['batch_size']
+
+
+def build_scheduler(optimizer, lr, epochs):
+    """
+    OneCycle LR. Trainer.train_epoch 는 epoch 마다 한 번 step 하므로 epoch 단위로 스케줄한다.
+    (배치 크기가 단계별로 바뀌는 progressive resizing 에서도 LR 곡선이 그대로 유지됨)
+    """
+    return optim.lr_scheduler.OneCycleLR(
+        optimizer, max_lr=lr, epochs=epochs, steps_per_epoch=1,
+        pct_start=0.1, anneal_strategy='cos'
+    )
+
+
+def parse_img_size(text):
+    """'120x40' → (120, 40)"""
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def validation_mask(labels, val_ratio=VAL_RATIO, seed=SPLIT_SEED):
+    """
+    검증 split 여부 (N,) bool
+
+    라벨(6자리) 해시로 정하므로 파일 목록의 순서/구성(glob 순서, _NNN 재수집본 포함 여부, --limit)과
+    관계없이 같은 캡챠는 학습과 모든 도구에서 항상 같은 쪽에 들어간다.
+    (같은 라벨의 재수집본, 합성 RGB 도 원본과 같은 쪽)
+
+    Args:
+        labels: 6자리 라벨 문자열 리스트 또는 (N, 6) 숫자 텐서/배열 (라벨 없음 -1 → 학습 쪽)
+    """
+    if isinstance(labels, (torch.Tensor, np.ndarray)):
+        digits = np.asarray(labels)
+        labeled = (digits >= 0).all(axis=1)
+        codes = np.ascontiguousarray((np.clip(digits, 0, 9) + ord('0')).astype(np.uint8))
+        labels = [s.decode('ascii') for s in codes.view(f'S{digits.shape[1]}').ravel()]
     else:
-        # Grayscale로 변환
-        img = np.array(pil_img.convert('L'))
+        labeled = np.ones(len(labels), dtype=bool)
+    keys = np.array([
+        int.from_bytes(hashlib.blake2b(f'{seed}:{label}'.encode(), digest_size=8).digest(), 'big')
+        for label in labels
+    ], dtype=np.uint64)
+    return labeled & (keys.astype(np.float64) / 2.0 ** 64 < val_ratio)
+
+
+def split_samples(labels, val_ratio=VAL_RATIO, seed=SPLIT_SEED):
+    """validation_mask → (train 인덱스, val 인덱스) LongTensor"""
+    mask = validation_mask(labels, val_ratio, seed)
+    return torch.from_numpy(np.flatnonzero(~mask)), torch.from_numpy(np.flatnonzero(mask))
+
+
+def list_samples(data_dir, unlabeled_dir=None):
+    """(경로, (N, 6) 라벨 텐서) - 라벨 없는 이미지(unlabeled_dir)는 -1"""
+    files = labeled_files(data_dir)
+    paths = [p for p, _ in files]
+    labels = [[int(c) for c in label] for _, label in files]
+
+    if unlabeled_dir and os.path.isdir(unlabeled_dir):
+        for img_path in sorted(Path(unlabeled_dir).glob('*.png')):
+            paths.append(str(img_path))
+            labels.append([-1] * NUM_DIGITS)
 
-    # 반전: Alpha에서 흰색(255)=글씨 → 검정(0)=글씨로 변환
-    inverted = 255 - img
+    return paths, torch.tensor(labels, dtype=torch.long).reshape(-1, NUM_DIGITS)
 
-    # 리사이즈
-    resized = cv2.resize(inverted, (IMG_WIDTH, IMG_HEIGHT))
 
-    # 정규화
-    normalized = resized.astype(np.float32) / 255.0
+def time_to_target(history, target_acc):
+    """처음 목표 정확도에 도달한 (epoch, 누적 학습 시간). history 는 train_short 형식"""
+    for row in history:
+        if row['val_acc'] >= target_acc:
+            return row['epoch'], row['elapsed']
+    return None, None
 
-    return normalized
+
+def domain_weights(domains):
+    """domain 별 샘플 수와 관계없이 각 domain 이 같은 비율이 되는 샘플 가중치"""
+    domains = np.asarray(domains)
+    counts = np.bincount(domains, minlength=len(DOMAINS))
+    return torch.from_numpy(1.0 / counts[domains])
+
+
+def domain_balanced_sampler(domains, seed=42):
+    """domain 별 샘플 수와 관계없이 각 domain 이 같은 비율로 뽑히는 sampler"""
+    return WeightedRandomSampler(
+        domain_weights(domains), num_samples=len(domains), replacement=True,
+        generator=torch.Generator().manual_seed(seed)
+    )
+
+
+class HardExampleSampler(Sampler):
+    """
+    어려운/틀린 샘플을 더 자주 뽑고 학습 후반에는 uniform 으로 돌아가는 sampler
+
+    - 난이도 = 샘플별 loss EMA × (1 + error_boost × 틀린 자리 수), 아직 안 뽑힌 샘플은 평균 난이도
+    - 확률 = (1 - strength) × base + strength × (base × 난이도 비례, uniform 의 max_ratio 배까지)
+    - strength: 첫 epoch 은 0 (loss 를 모름), 이후 1 에서 anneal_until 까지 선형으로 0
+    - strength 0 이고 base 가 uniform 이면 shuffle 과 같은 permutation
+    - Trainer.train_epoch 가 배치마다 update() (배치 단위 텐서 연산, 샘플별 Python 루프 없음)
+      배치 ↔ 샘플 대응은 epoch 순서(last_indices) 기준 → DataLoader 는 순서를 유지해야 함
+    """
+
+    def __init__(self, num_samples, epochs, base_weights=None, seed=42, **config):
+        config = {**HARD_MINING, **config}
+        self.num_samples = num_samples
+        self.epochs = epochs
+        self.momentum = config['momentum']
+        self.error_boost = config['error_boost']
+        self.max_ratio = config['max_ratio']
+        self.anneal_until = config['anneal_until']
+
+        self.uniform = base_weights is None
+        base = torch.ones(num_samples, dtype=torch.float64) if self.uniform else \
+            torch.as_tensor(base_weights, dtype=torch.float64)
+        self.base = base / base.sum()
+        self.loss = torch.zeros(num_samples, dtype=torch.float64)
+        self.errors = torch.zeros(num_samples, dtype=torch.float64)
+        self.seen = torch.zeros(num_samples, dtype=torch.bool)
+        self.strength = 0.0
+        self.last_indices = None
+        self.generator = torch.Generator().manual_seed(seed)
+
+    def __len__(self):
+        return self.num_samples
+
+    def set_epoch(self, epoch):
+        """epoch (1부터) 시작 전에 호출 → strength"""
+        progress = (epoch - 1) / self.epochs
+        self.strength = max(0.0, 1.0 - progress / self.anneal_until) if epoch > 1 and self.seen.any() else 0.0
+        return self.strength
+
+    def probabilities(self):
+        if self.strength <= 0:
+            return self.base
+        hardness = self.loss * (1 + self.error_boost * self.errors)
+        hardness[~self.seen] = hardness[self.seen].mean()
+        hard = self.base * hardness.clamp_min(1e-8)
+        hard = torch.minimum(hard / hard.sum(), self.base * self.max_ratio)
+        hard /= hard.sum()
+        return (1 - self.strength) * self.base + self.strength * hard
+
+    def __iter__(self):
+        if self.strength <= 0 and self.uniform:
+            self.last_indices = torch.randperm(self.num_samples, generator=self.generator)
+        else:
+            self.last_indices = torch.multinomial(self.probabilities(), self.num_samples,
+                                                  replacement=True, generator=self.generator)
+        return iter(self.last_indices.tolist())
+
+    def update(self, start, losses, errors):
+        """
+        epoch 순서의 start 번째부터 배치 하나의 결과 반영
+
+        Args:
+            losses: (B,) 샘플별 loss (자리별 cross entropy 합)
+            errors: (B,) 틀린 자리 수
+        """
+        idx = self.last_indices[start:start + len(losses)]
+        losses = losses.detach().to('cpu', torch.float64)
+        momentum = self.seen[idx].double() * self.momentum  # 처음 뽑힌 샘플은 loss 그대로
+        self.loss[idx] = momentum * self.loss[idx] + (1 - momentum) * losses
+        self.errors[idx] = errors.detach().to('cpu', torch.float64)
+        self.seen[idx] = True
+
+    def stats(self):
+        """strength, 이번 epoch 에 뽑힌 고유 샘플 비율, 틀린 샘플 비율"""
+        unique = len(torch.unique(self.last_indices)) / self.num_samples if self.last_indices is not None else 0.0
+        wrong = (self.errors[self.seen] > 0).double().mean().item() if self.seen.any() else 0.0
+        return {'strength': self.strength, 'unique': unique, 'wrong': wrong}
 
 
 # ============================================================
 # 데이터셋
 # ============================================================
 class CaptchaDataset(Dataset):
-    def __init__(self, data_dir, augment=False):
+    def __init__(self, data_dir, augment=False, img_size=(IMG_WIDTH, IMG_HEIGHT),
+                 rgb_dirs=(), synth_rgb=False):
         self.data_dir = Path(data_dir)
         self.augment = augment
-        self.samples = []
-
-        # 파일 로드
-        for img_path in self.data_dir.glob('*.png'):
-            label = img_path.stem  # 파일명이 레이블
-            if len(label) == 6 and label.isdigit():
+        self.img_size = tuple(img_size)
+        # 파일 로드 ({라벨}[_접미사].png, list_samples 와 같은 목록/순서)
+        self.samples = labeled_files(self.data_dir)
+
+        # domain 혼합 모드에서만 domain 라벨 / split 그룹 / 합성 여부를 가진다
+        self.domains = None
+        sources = [p for p, _ in self.samples]
+        if rgb_dirs or synth_rgb:
+            sources = self._load_domains(rgb_dirs, synth_rgb)
+
+        # 해상도별 전처리 결과를 한 번만 계산해 메모리에 캐시 (epoch 마다 디코딩/리사이즈 없음)
+        self.images = preprocess_batch(sources, self.img_size)[:, 0]
+
+        print(f"  로드: {len(self.samples)}개 ({data_dir}, {self.img_size[0]}x{self.img_size[1]})")
+        if self.domains is not None:
+            counts = np.bincount(self.domains, minlength=len(DOMAINS))
+            print("  Domain: " + ', '.join(f'{name} {count}개' for name, count in zip(DOMAINS, counts))
+                  + f" (합성 RGB {int(self.synthetic.sum())}개)")
+
+    def _load_domains(self, rgb_dirs, synth_rgb):
+        """RGB 폴더 / 합성 RGB 샘플 추가 후 디코딩된 이미지 목록 반환 (domain 은 이미지 채널로 판단)"""
+        images = [decode_image(p) for p, _ in self.samples]
+        synthetic = [False] * len(images)
+
+        for rgb_dir in rgb_dirs:
+            for img_path, label in labeled_files(rgb_dir):
                 self.samples.append((img_path, label))
-
-        print(f"  로드: {len(self.samples)}개 ({data_dir})")
+                images.append(decode_image(img_path))
+                synthetic.append(False)
+
+        if synth_rgb:
+            for i in range(len(images)):
+                if has_alpha(images[i]) and not synthetic[i]:
+                    self.samples.append(self.samples[i])  # 원본과 같은 라벨 → 같은 split
+                    images.append(render_on_white(images[i]))
+                    synthetic.append(True)
+
+        self.domains = np.array([DOMAINS.index(image_domain(img)) for img in images])
+        self.synthetic = np.array(synthetic)
+        return images
+
+    def domain_split(self, val_ratio=VAL_RATIO, seed=SPLIT_SEED):
+        """
+        train/val 인덱스 (validation_mask). 합성 RGB 는 원본 RGBA 와 같은 쪽에 들어간다.
+        실제 RGB 샘플이 있으면 RGB 검증은 실제 샘플로만 (합성 샘플은 val 에서 제외).
+        """
+        is_val = validation_mask([label for _, label in self.samples], val_ratio, seed)
+        real_rgb = ((self.domains == DOMAINS.index('rgb')) & ~self.synthetic).any()
+        val_mask = is_val & ~(self.synthetic & real_rgb)
+        return np.nonzero(~is_val)[0].tolist(), np.nonzero(val_mask)[0].tolist()
+
+    def rgb_source(self, indices):
+        """검증 RGB 샘플 출처: 'real' / 'synthetic' / None"""
+        rgb = [i for i in indices if self.domains[i] == DOMAINS.index('rgb')]
+        if not rgb:
+            return None
+        return 'synthetic' if self.synthetic[rgb].all() else 'real'
 
     def __len__(self):
         return len(self.samples)
 
     def __getitem__(self, idx):
-        img_path, label = self.samples[idx]
+        _, label = self.samples[idx]
 
-        # 이미지 로드 및 전처리
-        img = preprocess_image(img_path)
+        # 캐시된 전처리 이미지
+        img = self.images[idx]
 
         # 데이터 증강
         if self.augment:
@@ -136,6 +377,8 @@ class Trainer:
         total_loss = 0
         total_correct = 0
         total_samples = 0
+        # HardExampleSampler 면 샘플별 loss / 틀린 자리 수를 배치 단위로 전달
+        hard_sampler = dataloader.sampler if isinstance(dataloader.sampler, HardExampleSampler) else None
 
         for batch_idx, (images, labels) in enumerate(dataloader):
             images = images.to(self.device)
@@ -146,6 +389,13 @@ class Trainer:
             loss, _ = self.criterion(outputs, labels)
             loss.backward()
 
+            if hard_sampler is not None:
+                with torch.no_grad():
+                    logits = torch.stack(outputs, dim=2)  # (batch, 10, 6)
+                    per_sample = nn.functional.cross_entropy(logits, labels, reduction='none').sum(1)
+                    errors = (logits.argmax(1) != labels).sum(1)
+                hard_sampler.update(batch_idx * dataloader.batch_size, per_sample, errors)
+
             # Gradient clipping
             torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=5.0)
             optimizer.step()
@@ -193,9 +443,21 @@ class Trainer:
 
         return avg_loss, avg_acc, avg_pos_accs
 
+    def validate_domains(self, dataset, indices):
+        """domain 별 {'accuracy', 'pos_accs', 'samples'} (혼합 모드 데이터셋)"""
+        result = {}
+        for d, name in enumerate(DOMAINS):
+            idx = [i for i in indices if dataset.domains[i] == d]
+            if idx:
+                loader = DataLoader(Subset(dataset, idx), batch_size=BATCH_SIZE, shuffle=False)
+                _, acc, pos_accs = self.validate(loader)
+                result[name] = {'accuracy': acc, 'pos_accs': pos_accs, 'samples': len(idx)}
+        return result
+
     def save_checkpoint(self, path, epoch, optimizer, scheduler=None):
         checkpoint = {
             'epoch': epoch,
+            'config': self.model.config(),
             'model_state_dict': self.model.state_dict(),
             'optimizer_state_dict': optimizer.state_dict(),
             'best_val_loss': self.best_val_loss,
@@ -216,7 +478,70 @@ class Trainer:
 # ============================================================
 # 메인 학습 함수
 # ============================================================
-def train(epochs=100, patience=20, lr=1e-3):
+def train_short(model, images, labels, train_idx, val_idx, epochs, device, lr=1e-3, seed=42,
+                schedule=None, history=None, hard_mining=False):
+    """
+    비교 실험용 짧은 학습 (sweep / 해상도 study / curriculum / hard mining 벤치마크)
+
+    Args:
+        images: (N, 1, H, W) 텐서. schedule 이 있으면 {(W, H): 텐서} (목표 해상도 포함)
+        schedule: PROGRESSIVE_SCHEDULE 형식 (없으면 목표 해상도 + BATCH_SIZE 고정)
+        history: list 를 주면 epoch 별 {'epoch', 'elapsed', 'val_acc', 'img_size', 'batch_size'} 추가
+        hard_mining: shuffle 대신 HardExampleSampler (history 에 'hard_mining' stats 추가)
+
+    Returns:
+        (best 검증 정확도, 자리별 정확도, best 가중치를 로드한 CPU eval 모델)
+    """
+    torch.manual_seed(seed)
+    trainer = Trainer(model, device)
+    target_size = (model.img_width, model.img_height)
+    if not isinstance(images, dict):
+        images = {target_size: images}
+    generator = torch.Generator().manual_seed(seed)
+
+    val_loader = DataLoader(
+        TensorDataset(images[target_size][val_idx], labels[val_idx]),
+        batch_size=BATCH_SIZE * 4, shuffle=False
+    )
+    optimizer = optim.AdamW(model.parameters(), lr=lr, weight_decay=1e-4)
+    scheduler = build_scheduler(optimizer, lr, epochs)
+
+    hard_sampler = HardExampleSampler(len(train_idx), epochs, seed=seed) if hard_mining else None
+
+    best_acc, best_pos, best_state = -1.0, None, None
+    phase, train_loader, elapsed = None, None, 0.0
+    for epoch in range(1, epochs + 1):
+        current = progressive_phase(schedule, epoch, epochs, target_size) if schedule else (target_size, BATCH_SIZE)
+        if current != phase:
+            phase = current
+            train_loader = DataLoader(
+                TensorDataset(images[phase[0]][train_idx], labels[train_idx]),
+                batch_size=phase[1], shuffle=hard_sampler is None, sampler=hard_sampler,
+                generator=generator
+            )
+        if hard_sampler is not None:
+            hard_sampler.set_epoch(epoch)
+
+        start = time.perf_counter()
+        trainer.train_epoch(train_loader, optimizer, scheduler)
+        elapsed += time.perf_counter() - start
+
+        _, val_acc, pos_accs = trainer.validate(val_loader)
+        if history is not None:
+            history.append({'epoch': epoch, 'elapsed': elapsed, 'val_acc': val_acc,
+                            'img_size': list(phase[0]), 'batch_size': phase[1]})
+            if hard_sampler is not None:
+                history[-1]['hard_mining'] = hard_sampler.stats()
+        if val_acc >= best_acc:
+            best_acc, best_pos = val_acc, pos_accs
+            best_state = {k: v.detach().cpu().clone() for k, v in model.state_dict().items()}
+
+    model.load_state_dict(best_state)
+    return best_acc, best_pos, model.cpu().eval()
+
+
+def train(epochs=100, patience=20, lr=1e-3, backbone=None, img_size=(IMG_WIDTH, IMG_HEIGHT),
+          progressive=False, target_acc=None, rgb_dirs=(), synth_rgb=False, hard_mining=False):
     print("=" * 60)
     print("CBAM Multi-Head V2 (Position-Aware) 학습")
     print("=" * 60)
@@ -237,55 +562,78 @@ def train(epochs=100, patience=20, lr=1e-3):
     os.makedirs(CHECKPOINT_DIR, exist_ok=True)
 
     # 모델
+    img_width, img_height = img_size
     model = CBAM_MultiHead_V2(
-        img_height=IMG_HEIGHT,
-        img_width=IMG_WIDTH,
+        img_height=img_height,
+        img_width=img_width,
         num_digits=NUM_DIGITS,
-        num_classes=NUM_CLASSES
+        num_classes=NUM_CLASSES,
+        backbone=backbone
     )
+    print(f"Backbone: {model.backbone}")
     print(f"Parameters: {sum(p.numel() for p in model.parameters()):,}")
 
     # Trainer
     trainer = Trainer(model, device)
 
     # 데이터 로드
-    full_dataset = CaptchaDataset(DATA_DIR, augment=False)
-
-    # Train/Val 분할 (85/15)
-    total = len(full_dataset)
-    val_size = int(total * 0.15)
-    train_size = total - val_size
-
-    train_dataset, val_dataset = torch.utils.data.random_split(
-        full_dataset,
-        [train_size, val_size],
-        generator=torch.Generator().manual_seed(42)
-    )
+    mixed = bool(rgb_dirs or synth_rgb)
+    domain_args = {'rgb_dirs': rgb_dirs, 'synth_rgb': synth_rgb}
+    full_dataset = CaptchaDataset(DATA_DIR, augment=False, img_size=img_size, **domain_args)
+
+    # Train/Val 분할 (라벨 해시 85/15, 보정/가지치기/cascade 도구와 같은 검증 샘플)
+    # 혼합 모드는 합성 RGB 가 원본과 같은 쪽, 실제 RGB 가 있으면 합성 RGB 는 검증에서 제외
+    if mixed:
+        train_idx, val_idx = full_dataset.domain_split()
+    else:
+        train_idx, val_idx = (idx.tolist() for idx in split_samples([l for _, l in full_dataset.samples]))
+    train_dataset = Subset(full_dataset, train_idx)
+    val_dataset = Subset(full_dataset, val_idx)
+    train_size, val_size = len(train_dataset), len(val_dataset)
 
     # 학습 데이터에만 augmentation 적용
     train_dataset.dataset.augment = True
 
-    train_loader = DataLoader(
-        train_dataset, batch_size=BATCH_SIZE, shuffle=True,
-        num_workers=0, pin_memory=True
-    )
+    # Hard example mining: progressive 단계가 바뀌어도 같은 train 인덱스이므로 sampler(난이도) 유지
+    hard_sampler = None
+    if hard_mining:
+        base_weights = domain_weights(full_dataset.domains[train_dataset.indices]) if mixed else None
+        hard_sampler = HardExampleSampler(len(train_dataset), epochs, base_weights=base_weights)
+
+    def make_train_loader(dataset, batch_size):
+        # 혼합 모드: domain 균형 샘플링 (shuffle 대신 sampler)
+        if hard_sampler is not None:
+            sampler = hard_sampler
+        else:
+            sampler = domain_balanced_sampler(full_dataset.domains[dataset.indices]) if mixed else None
+        return DataLoader(
+            dataset, batch_size=batch_size, shuffle=sampler is None, sampler=sampler,
+            num_workers=0, pin_memory=True
+        )
+
+    train_loader = make_train_loader(train_dataset, BATCH_SIZE)
     val_loader = DataLoader(
         val_dataset, batch_size=BATCH_SIZE, shuffle=False,
         num_workers=0, pin_memory=True
     )
 
     print(f"  Train: {train_size}, Val: {val_size}")
+    if hard_sampler is not None:
+        print(f"  Hard example mining: {HARD_MINING}")
+
+    # Progressive resizing: 단계별 해상도 데이터셋 (같은 train 인덱스 사용)
+    phase_datasets = {tuple(img_size): train_dataset}
+    if progressive:
+        for phase in PROGRESSIVE_SCHEDULE[:-1]:
+            size = tuple(phase['img_size'])
+            if size not in phase_datasets:
+                dataset = CaptchaDataset(DATA_DIR, augment=True, img_size=size, **domain_args)
+                phase_datasets[size] = torch.utils.data.Subset(dataset, train_dataset.indices)
+        print(f"  Progressive resizing: {[p['img_size'] for p in PROGRESSIVE_SCHEDULE[:-1]]} → {img_size}")
 
     # Optimizer & Scheduler
     optimizer = optim.AdamW(model.parameters(), lr=lr, weight_decay=1e-4)
-    scheduler = optim.lr_scheduler.OneCycleLR(
-        optimizer,
-        max_lr=lr,
-        epochs=epochs,
-        steps_per_epoch=len(train_loader),
-        pct_start=0.1,
-        anneal_strategy='cos'
-    )
+    scheduler = build_scheduler(optimizer, lr, epochs)
 
     print(f"\n  학습 시작 (최대 {epochs} epochs, patience={patience})")
     print("-" * 60)
@@ -293,8 +641,21 @@ def train(epochs=100, patience=20, lr=1e-3):
     best_epoch = 0
     no_improve = 0
     history = []
+    phase = (tuple(img_size), BATCH_SIZE)
+    train_time = 0.0
+    target_time = None
 
     for epoch in range(1, epochs + 1):
+        if progressive:
+            current = progressive_phase(PROGRESSIVE_SCHEDULE, epoch, epochs, img_size)
+            if current != phase:
+                phase = current
+                train_loader = make_train_loader(phase_datasets[phase[0]], phase[1])
+                print(f"  [단계] {phase[0][0]}x{phase[0][1]}, batch {phase[1]}")
+
+        if hard_sampler is not None:
+            hard_sampler.set_epoch(epoch)
+
         start_time = time.time()
 
         # Train
@@ -305,6 +666,10 @@ def train(epochs=100, patience=20, lr=1e-3):
 
         elapsed = time.time() - start_time
         current_lr = optimizer.param_groups[0]['lr']
+        train_time += elapsed
+        if target_acc is not None and target_time is None and val_acc >= target_acc:
+            target_time = train_time
+            print(f"         -> 목표 정확도 {target_acc*100:.1f}% 도달: {train_time:.1f}s")
 
         # Position accuracy 평균
         avg_pos_acc = sum(pos_accs) / len(pos_accs)
@@ -312,6 +677,18 @@ def train(epochs=100, patience=20, lr=1e-3):
         print(f"  Epoch {epoch:3d} | Loss: {val_loss:.4f} | Acc: {val_acc*100:5.1f}% | "
               f"Pos: {avg_pos_acc*100:4.1f}% | LR: {current_lr:.2e} | {elapsed:.1f}s")
 
+        domain_accs = None
+        if mixed:
+            domain_accs = {name: r['accuracy'] for name, r in
+                           trainer.validate_domains(full_dataset, val_dataset.indices).items()}
+            print("         Domain: " + ', '.join(f'{name} {acc*100:.1f}%' for name, acc in domain_accs.items()))
+
+        hard_stats = None
+        if hard_sampler is not None:
+            hard_stats = hard_sampler.stats()
+            print(f"         Hard mining: strength {hard_stats['strength']:.2f}, "
+                  f"고유 샘플 {hard_stats['unique']*100:.0f}%, 틀린 샘플 {hard_stats['wrong']*100:.1f}%")
+
         # Best model 저장
         if val_loss < trainer.best_val_loss:
             trainer.best_val_loss = val_loss
@@ -343,10 +720,15 @@ def train(epochs=100, patience=20, lr=1e-3):
         # History 저장
         history.append({
             'epoch': epoch,
+            'img_size': list(phase[0]),
+            'batch_size': phase[1],
+            'elapsed': train_time,
             'train_loss': train_loss,
             'val_loss': val_loss,
             'val_acc': val_acc,
             'pos_accs': pos_accs,
+            'domain_accs': domain_accs,
+            'hard_mining': hard_stats,
             'lr': current_lr
         })
 
@@ -357,6 +739,8 @@ def train(epochs=100, patience=20, lr=1e-3):
 
     print(f"\n  학습 완료! Best Epoch: {best_epoch}, "
           f"Val Loss: {trainer.best_val_loss:.4f}, Acc: {trainer.best_val_acc*100:.1f}%")
+    print(f"  학습 시간: {train_time:.1f}s" + (
+        f", 목표 정확도 도달: {target_time:.1f}s" if target_time is not None else ''))
 
     # 최종 평가
     print("\n" + "=" * 60)
@@ -376,11 +760,37 @@ def train(epochs=100, patience=20, lr=1e-3):
         bar = '#' * int(acc * 20) + '-' * (20 - int(acc * 20))
         print(f"    Position {i+1}: [{bar}] {acc*100:.1f}%")
 
+    # 검증 split 의 domain 별 정확도
+    if mixed:
+        domain_results = trainer.validate_domains(full_dataset, val_dataset.indices)
+        rgb_source = full_dataset.rgb_source(val_dataset.indices)
+    else:
+        _, val_acc, val_pos_accs = trainer.validate(val_loader)
+        domain_results = {'rgba': {'accuracy': val_acc, 'pos_accs': val_pos_accs, 'samples': val_size}}
+        rgb_source = None
+
+    print(f"\n  Domain 별 검증 정확도:")
+    for name, result in domain_results.items():
+        source = f" ({rgb_source})" if name == 'rgb' else ''
+        print(f"    {name:5s}{source}: {result['accuracy']*100:.2f}% ({result['samples']}개)")
+
     # 최종 모델 저장
     final_path = os.path.join(MODEL_DIR, 'cbam_multihead_v2_final.pth')
-    torch.save(model.state_dict(), final_path)
+    save_multihead(model, final_path)
     print(f"\n  최종 모델 저장: {final_path}")
 
+    # 서빙 측(captcha-solver.ts)이 domain 별로 모델/Vision API 를 고르는 기준
+    # (RGB 검증이 없는 학습이면 rgb 항목이 없어 RGB 캡챠는 계속 Vision API)
+    with open(MODEL_INFO_PATH, 'w') as f:
+        json.dump({
+            'model': final_path,
+            'img_size': list(img_size),
+            'domains': domain_results,
+            'rgb_source': rgb_source,
+            'created': datetime.now().isoformat(timespec='seconds'),
+        }, f, indent=2)
+    print(f"  모델 정보 저장: {MODEL_INFO_PATH}")
+
     # 학습 로그 저장
     log_path = os.path.join(MODEL_DIR, f'training_log_v2_{datetime.now():%Y%m%d_%H%M%S}.json')
     with open(log_path, 'w') as f:
@@ -393,4 +803,20 @@ def train(epochs=100, patience=20, lr=1e-3):
 
 
 if __name__ == "__main__":
-    train(epochs=100, patience=20, lr=1e-3)
+    import argparse
+    from cbam_multihead_v2 import BACKBONE_VARIANTS
+
+    parser = argparse.ArgumentParser(description='CBAM Multi-Head V2 학습')
+    parser.add_argument('--backbone', default='default', choices=sorted(BACKBONE_VARIANTS))
+    parser.add_argument('--img-size', default=f'{IMG_WIDTH}x{IMG_HEIGHT}', help='입력 해상도 WxH')
+    parser.add_argument('--progressive', action='store_true', help='progressive resizing curriculum')
+    parser.add_argument('--target-acc', type=float, default=None, help='도달 시간을 기록할 검증 정확도')
+    parser.add_argument('--rgb-dirs', nargs='*', default=[], help='라벨된 RGB(브라우저) 캡챠 폴더')
+    parser.add_argument('--synth-rgb', action='store_true', help='RGBA 학습 데이터로 RGB 샘플 합성')
+    parser.add_argument('--hard-mining', action='store_true', help='어려운/틀린 샘플 가중 샘플링')
+    args = parser.parse_args()
+
+    train(epochs=100, patience=20, lr=1e-3, backbone=BACKBONE_VARIANTS[args.backbone],
+          img_size=parse_img_size(args.img_size), progressive=args.progressive,
+          target_acc=args.target_acc, rgb_dirs=args.rgb_dirs, synth_rgb=args.synth_rgb,
+          hard_mining=args.hard_mining)
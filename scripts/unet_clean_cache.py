@@ -0,0 +1,202 @@
+"""
+U-Net 선 제거 결과 캐시
+
+line_removal_unet_best.keras 를 data/captcha-training 전체에 대해 큰 배치로 한 번만 돌리고
+결과(선이 제거된 이미지)를 저장한다. 학습/평가 스크립트는 U-Net 을 다시 돌리지 않고
+캐시를 바로 읽어 쓴다.
+
+캐시 위치: data/captcha-cache/unet-clean/{U-Net 체크포인트 SHA-256 앞 16자리}/
+    images.npy  (N, 40, 120) uint8, 선 제거 결과 (0-255)
+    labels.npy  (N,) 6자리 문자열
+    meta.json   체크포인트 경로/해시, 데이터 폴더, 파일 목록, 생성 시각
+
+체크포인트가 바뀌면 해시가 달라지므로 새 캐시가 만들어지고, 이전 캐시는 그대로 남는다.
+
+입력 형식 (load_image): 체크포인트 옆 {이름}.json 의 'input' (train-line-removal-unet.py 가 저장)
+    'pil_l'       PIL convert('L') (captcha-pairs 학습, sidecar 가 없는 이전 체크포인트)
+    'preprocess'  captcha_image.preprocess 평면 (train-line-removal-unet.py --synthetic)
+
+사용법:
+    python scripts/unet_clean_cache.py [--force] [--unet ./data/captcha-model/line_removal_unet_synthetic_best.keras]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from captcha_image import labeled_files, preprocess
+
+# 설정
+UNET_PATH = "./data/captcha-model/line_removal_unet_best.keras"
+DATA_DIR = "./data/captcha-training"
+CACHE_ROOT = "./data/captcha-cache/unet-clean"
+
+IMG_WIDTH = 120
+IMG_HEIGHT = 40
+BATCH_SIZE = 512
+
+INPUT_FORMATS = ('pil_l', 'preprocess')
+
+
+def checkpoint_hash(path, chunk_size=1 << 20):
+    """체크포인트 파일 내용 해시 (SHA-256 앞 16자리)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def cache_dir_for(unet_path=UNET_PATH, cache_root=CACHE_ROOT):
+    """체크포인트에 해당하는 캐시 폴더 경로"""
+    return os.path.join(cache_root, checkpoint_hash(unet_path))
+
+
+def unet_meta_path(unet_path):
+    """체크포인트 sidecar 메타데이터 경로 (foo_best.keras → foo_best.json)"""
+    return os.path.splitext(unet_path)[0] + '.json'
+
+
+def save_unet_meta(unet_path, input_format):
+    """체크포인트 학습 입력 형식을 sidecar JSON 으로 저장"""
+    if input_format not in INPUT_FORMATS:
+        raise ValueError(f"알 수 없는 입력 형식: {input_format} (가능: {INPUT_FORMATS})")
+    with open(unet_meta_path(unet_path), 'w') as f:
+        json.dump({'input': input_format}, f, indent=2)
+
+
+@lru_cache(maxsize=None)
+def unet_input_format(unet_path):
+    """체크포인트 학습 입력 형식 (sidecar 가 없으면 'pil_l')"""
+    meta_path = unet_meta_path(unet_path)
+    if not os.path.exists(meta_path):
+        return 'pil_l'
+    with open(meta_path) as f:
+        input_format = json.load(f).get('input', 'pil_l')
+    if input_format not in INPUT_FORMATS:
+        raise ValueError(f"알 수 없는 입력 형식: {input_format} ({meta_path})")
+    return input_format
+
+
+def load_image(path, unet_path=UNET_PATH):
+    """U-Net 입력 전처리 (unet_path 의 학습 입력 형식, uint8 유지)"""
+    if unet_input_format(unet_path) == 'preprocess':
+        plane = preprocess(path, (IMG_WIDTH, IMG_HEIGHT))
+        return np.rint(plane * 255.0).astype(np.uint8)
+    img = Image.open(path).convert('L')
+    img = img.resize((IMG_WIDTH, IMG_HEIGHT))
+    return np.asarray(img, dtype=np.uint8)
+
+
+def build_cache(unet_path=UNET_PATH, data_dir=DATA_DIR, cache_root=CACHE_ROOT,
+                batch_size=BATCH_SIZE, force=False):
+    """U-Net 을 전체 데이터에 적용하고 캐시로 저장. 캐시 폴더 경로 반환."""
+    from tensorflow import keras
+    keras.config.enable_unsafe_deserialization()
+
+    out_dir = cache_dir_for(unet_path, cache_root)
+    samples = labeled_files(data_dir)
+    files = [os.path.basename(p) for p, _ in samples]
+
+    meta_path = os.path.join(out_dir, 'meta.json')
+    if not force and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('files') == files:
+            print(f"캐시 최신 상태: {out_dir} ({len(files)}개)")
+            return out_dir
+        print("데이터 폴더가 변경되어 캐시를 다시 만듭니다.")
+
+    print(f"U-Net 로드: {unet_path}")
+    unet = keras.models.load_model(unet_path, compile=False)
+
+    # 입력은 uint8 로 모아두고 배치 단위로만 float 변환
+    inputs = np.empty((len(samples), IMG_HEIGHT, IMG_WIDTH), dtype=np.uint8)
+    for i, (path, _) in enumerate(samples):
+        inputs[i] = load_image(path, unet_path)
+
+    cleaned = np.empty_like(inputs)
+    start = time.time()
+    for begin in range(0, len(samples), batch_size):
+        end = min(begin + batch_size, len(samples))
+        batch = inputs[begin:end, :, :, np.newaxis].astype(np.float32) / 255.0
+        pred = unet.predict_on_batch(batch)
+        pred = np.asarray(pred)[..., 0]
+        cleaned[begin:end] = np.clip(np.rint(pred * 255.0), 0, 255).astype(np.uint8)
+        print(f"  {end}/{len(samples)}", end='\r')
+    elapsed = time.time() - start
+    print(f"\n  U-Net 처리: {len(samples)}개, {elapsed:.1f}s "
+          f"({len(samples) / max(elapsed, 1e-9):.0f}개/s)")
+
+    # 임시 폴더에 쓴 뒤 교체 (읽는 쪽이 반쯤 쓰인 캐시를 보지 않도록)
+    tmp_dir = out_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'images.npy'), cleaned)
+    np.save(os.path.join(tmp_dir, 'labels.npy'), np.array([l for _, l in samples]))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({
+            'unet_path': unet_path,
+            'unet_hash': os.path.basename(out_dir),
+            'input': unet_input_format(unet_path),
+            'data_dir': data_dir,
+            'img_width': IMG_WIDTH,
+            'img_height': IMG_HEIGHT,
+            'count': len(samples),
+            'files': files,
+            'created_at': datetime.now().isoformat(),
+        }, f, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    print(f"✅ 캐시 저장: {out_dir}")
+    return out_dir
+
+
+def load_cache(unet_path=UNET_PATH, cache_root=CACHE_ROOT, mmap=True):
+    """
+    캐시 로드
+
+    Returns:
+        images: (N, H, W) uint8 (mmap=True 면 메모리 맵)
+        labels: 6자리 문자열 리스트
+    """
+    out_dir = cache_dir_for(unet_path, cache_root)
+    if not os.path.exists(os.path.join(out_dir, 'meta.json')):
+        raise FileNotFoundError(
+            f"U-Net 캐시가 없습니다: {out_dir} (python scripts/unet_clean_cache.py 로 생성)"
+        )
+    images = np.load(os.path.join(out_dir, 'images.npy'), mmap_mode='r' if mmap else None)
+    labels = np.load(os.path.join(out_dir, 'labels.npy')).tolist()
+    return images, labels
+
+
+def to_model_input(images):
+    """uint8 캐시 → 모델 입력 (N, H, W, 1) float32 [0, 1]"""
+    return (np.asarray(images, dtype=np.float32) / 255.0)[..., np.newaxis]
+
+
+def main():
+    print("=" * 60)
+    print("U-Net 선 제거 캐시 생성")
+    print("=" * 60)
+
+    force = '--force' in sys.argv
+    unet_path = sys.argv[sys.argv.index('--unet') + 1] if '--unet' in sys.argv else UNET_PATH
+    build_cache(unet_path, force=force)
+
+    images, labels = load_cache(unet_path)
+    print(f"\n캐시: {images.shape}, 라벨 {len(labels)}개")
+
+
+if __name__ == "__main__":
+    main()
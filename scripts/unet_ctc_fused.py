@@ -0,0 +1,154 @@
+"""
+U-Net + CTC 단일 추론 그래프 빌더
+
+line_removal_unet_best.keras (선 제거) 와 captcha_ctc_inference.keras (인식) 를
+하나의 Keras 모델로 합치고, Greedy CTC 디코딩까지 그래프 안에서 수행한다.
+
+- U-Net 출력이 호스트(NumPy)로 복사되지 않고 곧바로 CTC 모델로 전달됨
+- predict 한 번으로 선 제거 → 인식 → 디코딩 완료 (단일/배치 공통)
+- 결과는 하나의 .keras 파일로 저장
+- 입력 형식은 U-Net 체크포인트를 따름 (unet_clean_cache.load_image(path, UNET_PATH))
+
+출력:
+    digits:     (batch, MAX_LENGTH) int32, 빈 자리는 -1
+    confidence: (batch, MAX_LENGTH) float32, 각 글자의 확률 (빈 자리는 0)
+    cleaned:    (batch, H, W, 1) U-Net 선 제거 결과
+"""
+
+import sys
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers, Model
+
+keras.config.enable_unsafe_deserialization()
+
+# 모델 경로
+UNET_PATH = "./data/captcha-model/line_removal_unet_best.keras"
+CTC_PATH = "./data/captcha-model/captcha_ctc_inference.keras"
+FUSED_PATH = "./data/captcha-model/unet_ctc_fused.keras"
+
+# 설정
+IMG_WIDTH = 120
+IMG_HEIGHT = 40
+MAX_LENGTH = 6
+NUM_CHARS = 10       # 0-9
+BLANK_INDEX = 10     # captcha_ctc_inference.keras: 0-9 다음이 blank
+VOCAB_OFFSET = 0     # 숫자 0 의 클래스 인덱스
+
+
+@keras.utils.register_keras_serializable(package="captcha")
+class CTCGreedyDecode(layers.Layer):
+    """
+    그래프 내 Greedy CTC 디코딩 레이어
+
+    argmax → 연속 중복 제거 → blank/비숫자 제거 → MAX_LENGTH 로 패딩/절단
+    """
+
+    def __init__(self, blank_index=BLANK_INDEX, vocab_offset=VOCAB_OFFSET,
+                 num_chars=NUM_CHARS, max_length=MAX_LENGTH, **kwargs):
+        super().__init__(**kwargs)
+        self.blank_index = blank_index
+        self.vocab_offset = vocab_offset
+        self.num_chars = num_chars
+        self.max_length = max_length
+
+    def call(self, probs):
+        indices = tf.argmax(probs, axis=-1, output_type=tf.int32)  # (batch, T)
+        step_conf = tf.reduce_max(probs, axis=-1)                   # (batch, T)
+
+        # 이전 timestep 과 같은 인덱스는 같은 글자의 연속
+        prev = tf.pad(indices[:, :-1], [[0, 0], [1, 0]], constant_values=-1)
+        blank = self.blank_index
+        if blank < 0:
+            blank = tf.shape(probs)[-1] + blank
+        keep = (
+            tf.not_equal(indices, prev)
+            & tf.not_equal(indices, blank)
+            & (indices >= self.vocab_offset)
+            & (indices < self.vocab_offset + self.num_chars)
+        )
+
+        shape = [None, self.max_length]
+        digits = tf.ragged.boolean_mask(indices - self.vocab_offset, keep)
+        digits = digits.to_tensor(default_value=-1, shape=shape)
+        confidence = tf.ragged.boolean_mask(step_conf, keep)
+        confidence = confidence.to_tensor(default_value=0.0, shape=shape)
+        return digits, confidence
+
+    def compute_output_shape(self, input_shape):
+        shape = (input_shape[0], self.max_length)
+        return shape, shape
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({
+            'blank_index': self.blank_index,
+            'vocab_offset': self.vocab_offset,
+            'num_chars': self.num_chars,
+            'max_length': self.max_length,
+        })
+        return config
+
+
+def build_fused_model(unet, ctc, blank_index=BLANK_INDEX, vocab_offset=VOCAB_OFFSET):
+    """U-Net + CTC + 디코딩을 하나의 모델로 합성"""
+    inputs = layers.Input(shape=(IMG_HEIGHT, IMG_WIDTH, 1), name='image')
+    cleaned = unet(inputs)
+    probs = ctc(cleaned)
+    digits, confidence = CTCGreedyDecode(
+        blank_index=blank_index,
+        vocab_offset=vocab_offset,
+        name='ctc_greedy_decode'
+    )(probs)
+
+    outputs = {
+        'digits': layers.Identity(name='digits')(digits),
+        'confidence': layers.Identity(name='confidence')(confidence),
+        'cleaned': layers.Identity(name='cleaned')(cleaned),
+    }
+    return Model(inputs, outputs, name='UNetCTCFused')
+
+
+def load_fused_model(path=FUSED_PATH):
+    """저장된 통합 모델 로드"""
+    return keras.models.load_model(path, compile=False)
+
+
+def digits_to_strings(digits):
+    """(batch, MAX_LENGTH) 숫자 배열 → 문자열 리스트 (-1 은 무시)"""
+    digits = np.asarray(digits)
+    codes = np.where(digits >= 0, digits + ord('0'), 0).astype(np.uint8)
+    codes = np.ascontiguousarray(codes)
+    return [s.decode('ascii') for s in codes.view(f'S{codes.shape[1]}').ravel()]
+
+
+def main():
+    print("=" * 60)
+    print("U-Net + CTC 통합 모델 빌드")
+    print("=" * 60)
+
+    print(f"\nU-Net 로드: {UNET_PATH}")
+    unet = keras.models.load_model(UNET_PATH, compile=False)
+    print(f"CTC 로드: {CTC_PATH}")
+    ctc = keras.models.load_model(CTC_PATH, compile=False)
+
+    fused = build_fused_model(unet, ctc)
+    fused.summary()
+
+    # 저장 전후 출력이 동일한지 확인
+    sample = np.random.rand(4, IMG_HEIGHT, IMG_WIDTH, 1).astype(np.float32)
+    before = fused.predict(sample, verbose=0)
+
+    fused.save(FUSED_PATH)
+    print(f"\n✅ 통합 모델 저장: {FUSED_PATH}")
+
+    after = load_fused_model(FUSED_PATH).predict(sample, verbose=0)
+    same = np.array_equal(before['digits'], after['digits'])
+    print(f"저장/로드 검증: {'일치' if same else '불일치'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        FUSED_PATH = sys.argv[1]
+    main()
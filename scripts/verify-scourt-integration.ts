@@ -73,14 +73,13 @@ import numpy as np
 from PIL import Image
 import cv2
 import os
-from cbam_multihead_v2 import CBAM_MultiHead_V2
+from cbam_multihead_v2 import load_multihead
 
 MODEL_PATH = '${modelPath}'
 TRAINING_DIR = '${path.join(process.cwd(), 'data', 'captcha-training')}'
 
 # 모델 로드
-model = CBAM_MultiHead_V2()
-model.load_state_dict(torch.load(MODEL_PATH, map_location='cpu', weights_only=True))
+model = load_multihead(MODEL_PATH)
 model.eval()
 
 # 샘플 테스트
@@ -100,7 +99,7 @@ for file in files:
         img = np.array(pil_img.convert('L'))
 
     inverted = 255 - img
-    resized = cv2.resize(inverted, (160, 50))
+    resized = cv2.resize(inverted, (model.img_width, model.img_height))
     normalized = resized.astype(np.float32) / 255.0
     tensor = torch.FloatTensor(normalized).unsqueeze(0).unsqueeze(0)
 